@@ -0,0 +1,162 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from gstr1_converter import (AMENDMENT_FIELDS, SCHEMAS_BY_KEY, document_column, get_all_sections_from_json,
+                             recategorize, schema_columns, write_excel)
+
+# Amendment column of the net effective sheets
+AMENDMENT_COLUMN = "Amendment"
+ORIGINAL = "Original"
+AMENDED = "Amended"
+AMENDED_UNMATCHED = "Amended (original not found)"
+
+# Column naming the document an amended row replaces
+AMENDS_COLUMN = "Amends"
+
+# Suffix of the before/after difference column of each amount
+CHANGE_SUFFIX = " Change"
+
+
+def net_sheet_name(schema):
+    """Returns the sheet name of the net effective view of a section (e.g. B2B Net Effective)"""
+    return f"{schema.label} Net Effective"
+
+
+def _join_keys(schema, df, numbers):
+    """Returns the (recipient GSTIN, document number) join keys of a section frame as a DataFrame"""
+    keys = pd.DataFrame({"number": np.asarray(numbers, dtype=object)})
+    if schema.parent_fields and schema.parent_fields[0][0] == "Recipient GSTIN":
+        keys.insert(0, "gstin", df["Recipient GSTIN"].to_numpy(dtype=object))
+    return keys
+
+
+def _match(amended_keys, original_keys):
+    """
+    Hash-joins amendment keys onto original keys.
+    Returns the position of each amendment's original, or -1 when it has none
+    (the first of duplicate originals wins).
+    """
+    if not len(original_keys) or not len(amended_keys):
+        return np.full(len(amended_keys), -1, dtype=np.int64)
+    originals = original_keys.assign(_position=np.arange(len(original_keys)))
+    originals = originals.drop_duplicates(list(original_keys.columns), keep="first")
+    joined = amended_keys.merge(originals, how="left", on=list(original_keys.columns), sort=False)
+    return joined["_position"].fillna(-1).to_numpy(dtype=np.int64)
+
+
+def resolve_section(schema, originals, amendments, history=None):
+    """
+    Builds the net effective view of one section: its original records with every
+    amended record in place of the one it replaces, matched on (recipient GSTIN,
+    original document number) with a hash join. Amendments of documents that are not
+    in this return are looked up in history (the same section from earlier returns)
+    and appended. Each row gets an Amendment status, the number of the document it
+    amends, and the change of every amount from the replaced record.
+    """
+    columns = schema_columns(schema)
+    number_column = document_column(schema)
+    original_number_column = AMENDMENT_FIELDS[schema.key][0][0]
+    amounts = [column for column, _ in schema.totals] + [schema.value[0]]
+    originals = originals if originals is not None else pd.DataFrame(columns=columns)
+    amendments = amendments if amendments is not None else pd.DataFrame(columns=columns + [original_number_column])
+
+    # oinum/ont_num when given, otherwise the amendment keeps the original's number
+    targets = amendments[original_number_column].astype(object)
+    targets = targets.where(targets.notna(), amendments[number_column].astype(object)).to_numpy()
+    amended_keys = _join_keys(schema, amendments, targets)
+    in_return = _match(amended_keys, _join_keys(schema, originals, originals[number_column]))
+
+    # A document amended more than once takes its last amendment
+    amended_positions = np.flatnonzero(in_return >= 0)
+    replaced, last = np.unique(in_return[amended_positions][::-1], return_index=True)
+    replacing = amended_positions[::-1][last]
+    extra = np.flatnonzero(in_return < 0)
+    extra = extra[~amended_keys.iloc[extra].duplicated(keep="last").to_numpy()]
+
+    in_history = np.full(len(extra), -1, dtype=np.int64)
+    if history is not None and len(history) and len(extra):
+        in_history = _match(amended_keys.iloc[extra].reset_index(drop=True),
+                            _join_keys(schema, history, history[number_column]))
+
+    # Rows: originals (amended ones taken from the amendments), then the other amendments
+    positions = np.arange(len(originals), dtype=np.int64)
+    positions[replaced] = len(originals) + replacing
+    positions = np.concatenate([positions, len(originals) + extra])
+    combined = pd.concat([originals[columns], amendments[columns]], ignore_index=True)
+    resolved = combined.take(positions).reset_index(drop=True)
+
+    status = np.full(len(resolved), ORIGINAL, dtype=object)
+    status[replaced] = AMENDED
+    status[len(originals):] = np.where(in_history >= 0, AMENDED, AMENDED_UNMATCHED)
+    amends = np.full(len(resolved), None, dtype=object)
+    amends[replaced] = targets[replacing]
+    amends[len(originals):] = targets[extra]
+
+    previous = np.full((len(resolved), len(amounts)), np.nan)
+    if len(replaced):
+        previous[replaced] = originals[amounts].to_numpy(dtype=np.float64)[replaced]
+    found = np.flatnonzero(in_history >= 0)
+    if len(found):
+        previous[len(originals) + found] = history[amounts].to_numpy(dtype=np.float64)[in_history[found]]
+
+    resolved[AMENDMENT_COLUMN] = status
+    resolved[AMENDS_COLUMN] = amends
+    current = resolved[amounts].to_numpy(dtype=np.float64)
+    for offset, column in enumerate(amounts):
+        resolved[column + CHANGE_SUFFIX] = current[:, offset] - previous[:, offset]
+    return recategorize(resolved)
+
+
+def resolve_amendments(dfs, history=()):
+    """
+    Applies the amend_* sections of a return (the DataFrames returned by
+    get_all_sections_from_json) to their originals.
+    history is an optional sequence of such dicts from earlier returns, searched
+    for the originals of amendments that are not in this return.
+    Returns: {net effective sheet name: DataFrame} for every section with records or amendments
+    """
+    views = {}
+    for key in AMENDMENT_FIELDS:
+        schema = SCHEMAS_BY_KEY[key]
+        originals = dfs.get(schema.sheet_name)
+        amendments = dfs.get(SCHEMAS_BY_KEY[f"amend_{key}"].sheet_name)
+        if originals is None and amendments is None:
+            continue
+        earlier = [sections[schema.sheet_name] for sections in history if schema.sheet_name in sections]
+        earlier = pd.concat(earlier[::-1], ignore_index=True) if earlier else None  # Latest return first
+        views[net_sheet_name(schema)] = resolve_section(schema, originals, amendments, earlier)
+    return views
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply the amendments of a GSTR-1 return to the original documents.")
+    parser.add_argument("input", help="GSTR-1 JSON file")
+    parser.add_argument("--history", nargs="*", default=[],
+                        help="Earlier returns (oldest first) holding originals amended in INPUT")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Excel output path (default: INPUT with .net.xlsx)")
+    args = parser.parse_args(argv)
+
+    dfs = get_all_sections_from_json(Path(args.input))
+    history = [get_all_sections_from_json(Path(path)) for path in args.history]
+    views = resolve_amendments(dfs, history)
+    output_path = args.output or os.path.splitext(args.input)[0] + ".net.xlsx"
+    with open(output_path, "wb") as output:
+        write_excel(views, output=output)
+
+    for sheet_name, view in views.items():
+        counts = view[AMENDMENT_COLUMN].value_counts()
+        print(f"{sheet_name}: {len(view):,} rows, {counts.get(AMENDED, 0):,} amended, "
+              f"{counts.get(AMENDED_UNMATCHED, 0):,} with the original not found")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gstr1_converter import (EXCEL_ENGINES, OUTPUT_FORMATS, VALIDATION_MODES, convert_gstr1_json_to_excel_bytes,
+                             merge_returns, write_dataset)
+
+MANIFEST_FIELDS = ["input", "output", "status", "seconds", "error"]
+
+
+# --- Input Discovery ---
+
+def find_input_files(inputs):
+    """Expands directories (all *.json files inside) and glob patterns into a sorted list of files"""
+    files = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            files.update(glob.glob(os.path.join(pattern, "*.json")))
+        else:
+            files.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(files)
+
+
+def assign_output_names(files):
+    """Maps each input file to a unique output base name (its file name without extension)"""
+    names = {}
+    used = set()
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, counter = stem, 1
+        while name in used:
+            counter += 1
+            name = f"{stem}_{counter}"
+        used.add(name)
+        names[path] = name
+    return names
+
+
+# --- Conversion ---
+
+def convert_file(input_path, output_dir, name, engine=None, output_format="xlsx", item_level=False,
+                 validation=None):
+    """
+    Converts one GSTR-1 JSON file to OUTPUT_DIR/NAME.xlsx, or adds it to the
+    per-section datasets under OUTPUT_DIR as NAME.parquet/.arrow/.csv.gz files.
+    With item_level=True the workbook also gets the invoice-rate and pivot sheets.
+    validation is an optional validation mode ("strict" or "lenient").
+    Never raises: failures are reported in the returned manifest entry.
+    """
+    start = time.perf_counter()
+    if output_format == "xlsx":
+        output_path = os.path.join(output_dir, name + ".xlsx")
+    else:
+        output_path = output_dir
+    entry = {"input": input_path, "output": output_path, "status": "ok", "error": ""}
+    try:
+        with open(input_path, "rb") as source:
+            if output_format == "xlsx":
+                with open(output_path, "wb") as output:
+                    convert_gstr1_json_to_excel_bytes(source, engine=engine, output=output, item_level=item_level,
+                                                      validation=validation)
+            else:
+                write_dataset(merge_returns([source], validation=validation), output_format, output_dir,
+                              basename=name)
+    except Exception as e:
+        entry.update(status="error", output="", error=str(e))
+        if output_format == "xlsx" and os.path.exists(output_path):
+            os.remove(output_path)
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+def convert_files(files, output_dir, workers=None, engine=None, manifest_path=None, output_format="xlsx",
+                  item_level=False, validation=None):
+    """
+    Converts files in parallel over a process pool.
+    Manifest entries are written to manifest_path (CSV) as each file finishes.
+    Returns: list of manifest entries in completion order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    names = assign_output_names(files)
+    if manifest_path is None:
+        manifest_path = os.path.join(output_dir, "manifest.csv")
+
+    entries = []
+    with open(manifest_path, "w", newline="") as manifest, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(manifest, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        futures = {pool.submit(convert_file, path, output_dir, names[path], engine, output_format,
+                               item_level, validation): path
+                   for path in files}
+        for future in as_completed(futures):
+            try:
+                entry = future.result()
+            except Exception as e:  # The worker process itself died
+                entry = {"input": futures[future], "output": "", "status": "error", "seconds": "", "error": str(e)}
+            writer.writerow(entry)
+            manifest.flush()
+            print(f"[{entry['status']}] {entry['input']} ({entry['seconds']}s)")
+            entries.append(entry)
+    return entries
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert many GSTR-1 JSON files to Excel in parallel.")
+    parser.add_argument("inputs", nargs="+", help="JSON files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="converted", help="Directory for the Excel files")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--engine", choices=sorted(EXCEL_ENGINES), default=None,
+                        help="Excel writer engine (default: chosen by row count)")
+    parser.add_argument("-f", "--format", dest="output_format", choices=list(OUTPUT_FORMATS), default="xlsx",
+                        help="Output format; columnar formats write one dataset per section under OUTPUT_DIR")
+    parser.add_argument("--manifest", default=None,
+                        help="Path of the status/timing manifest CSV (default: OUTPUT_DIR/manifest.csv)")
+    parser.add_argument("--item-level", action="store_true",
+                        help="Add invoice-rate sheets and rate-, POS- and GSTIN-wise pivots to each workbook")
+    parser.add_argument("--validate", choices=VALIDATION_MODES, default=None,
+                        help="Validate each return first: strict fails files with invalid records, lenient "
+                             "lists them on a Validation Errors sheet and converts the rest")
+    args = parser.parse_args(argv)
+
+    files = find_input_files(args.inputs)
+    if not files:
+        print("No JSON files found.")
+        return 1
+
+    start = time.perf_counter()
+    entries = convert_files(files, args.output_dir, workers=args.workers, engine=args.engine,
+                            manifest_path=args.manifest, output_format=args.output_format,
+                            item_level=args.item_level, validation=args.validate)
+    failed = sum(1 for entry in entries if entry["status"] != "ok")
+    print(f"Converted {len(entries) - failed}/{len(entries)} files in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
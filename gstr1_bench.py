@@ -0,0 +1,196 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import gstr1_converter
+from gstr1_converter import decode_json, extract_sections, write_excel, write_optimized_excel
+from gstr1_synthetic import generate_gstr1
+
+# Benchmark scales (total B2B invoices) and how they are shaped
+DEFAULT_SCALES = [10000, 100000, 1000000]
+INVOICES_PER_SUPPLIER = 50
+
+# The per-section extractors, timed one by one
+EXTRACTORS = [
+    gstr1_converter.extract_b2b_data, gstr1_converter.extract_b2cl_data,
+    gstr1_converter.extract_b2cs_data, gstr1_converter.extract_export_data,
+    gstr1_converter.extract_cdnr_data, gstr1_converter.extract_cdunr_data,
+    gstr1_converter.extract_hsn_data, gstr1_converter.extract_doc_issued_data,
+    gstr1_converter.extract_nil_rated_data, gstr1_converter.extract_amended_b2b_data,
+    gstr1_converter.extract_amended_b2cl_data, gstr1_converter.extract_amended_export_data,
+    gstr1_converter.extract_amended_cdnr_data, gstr1_converter.extract_amended_cdunr_data,
+    gstr1_converter.extract_amended_hsn_data, gstr1_converter.extract_amended_doc_issued_data,
+    gstr1_converter.extract_amended_nil_rated_data,
+]
+
+# Stages that make up an actual conversion (the extract_*_data timings are diagnostic)
+PIPELINE_STAGES = ["parse", "extract_sections", "dataframes", "excel"]
+
+# Deflate levels and string modes compared by xlsx_tradeoffs
+XLSX_LEVELS = (1, 6, 9)
+XLSX_STRING_MODES = ("inline", "shared", "auto")
+
+
+# --- Measurement ---
+
+def measure(stages, name, func, *args, trace_memory=True):
+    """Runs func, records its wall time and peak Python allocation under stages[name]"""
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    stages[name] = {"seconds": round(seconds, 4), "peak_bytes": peak}
+    return result
+
+
+def run_benchmark(invoices, engine=None, items_per_invoice=3, trace_memory=True, seed=0, xlsx_report=False):
+    """
+    Benchmarks one synthetic return of about `invoices` B2B invoices.
+    Stages: JSON parse, each extract_*_data function, the single-pass engine,
+    DataFrame build and Excel write. With xlsx_report=True the result also holds the
+    size and write time of every xlsx writer option (see xlsx_tradeoffs).
+    """
+    suppliers = max(1, invoices // INVOICES_PER_SUPPLIER)
+    document = generate_gstr1(suppliers, min(invoices, INVOICES_PER_SUPPLIER), items_per_invoice, seed=seed)
+    payload = json.dumps(document).encode("utf-8")
+    del document
+
+    stages = {}
+    data = measure(stages, "parse", decode_json, payload, trace_memory=trace_memory)
+    for extract in EXTRACTORS:
+        measure(stages, extract.__name__, extract, data, trace_memory=trace_memory)
+    buffers = measure(stages, "extract_sections", extract_sections, data, trace_memory=trace_memory)
+    dfs = measure(stages, "dataframes",
+                  lambda: {name: buffer.to_frame() for name, buffer in buffers.items() if len(buffer)},
+                  trace_memory=trace_memory)
+    output = measure(stages, "excel", write_excel, dfs, None, engine, trace_memory=trace_memory)
+
+    result = {
+        "invoices": sum(len(supplier["inv"]) for supplier in data["b2b"]),
+        "items": int(len(buffers["B2B Invoices"].item_index)),
+        "json_bytes": len(payload),
+        "xlsx_bytes": len(output.getvalue()),
+        "engine": engine or gstr1_converter.select_excel_engine(sum(len(df) for df in dfs.values())),
+        "stages": stages,
+        "total_seconds": round(sum(stages[name]["seconds"] for name in PIPELINE_STAGES), 4),
+    }
+    if xlsx_report:
+        result["xlsx"] = xlsx_tradeoffs(dfs)
+    return result
+
+
+def xlsx_tradeoffs(dfs, levels=XLSX_LEVELS, string_modes=XLSX_STRING_MODES):
+    """
+    Writes the same sections with every library engine and with the optimized writer
+    at each string mode and compression level.
+    Returns: list of {"engine", "strings", "compression_level", "bytes", "seconds"}
+    """
+    runs = [(engine, None, None) for engine in gstr1_converter.EXCEL_ENGINES if engine != "optimized"]
+    runs += [("optimized", strings, level) for strings in string_modes for level in levels]
+    report = []
+    for engine, strings, level in runs:
+        if engine.startswith("xlsxwriter") and gstr1_converter.xlsxwriter is None:
+            continue
+        gc.collect()
+        start = time.perf_counter()
+        if strings is None:
+            output = write_excel(dfs, None, engine)
+        else:
+            output = write_optimized_excel(dfs, None, strings, level)
+        report.append({"engine": engine, "strings": strings, "compression_level": level,
+                       "bytes": len(output.getvalue()), "seconds": round(time.perf_counter() - start, 4)})
+    return report
+
+
+def print_xlsx_tradeoffs(report, file=sys.stderr):
+    baseline = max(run["bytes"] for run in report)
+    for run in report:
+        options = f"{run['strings']}, level {run['compression_level']}" if run["strings"] else ""
+        print(f"  {run['engine']:<22} {options:<18} {run['bytes']:>13,} bytes "
+              f"({run['bytes'] / baseline:6.1%}) {run['seconds']:>8.3f}s", file=file)
+
+
+def environment():
+    """Describes the machine and library versions the results were taken on"""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "orjson": gstr1_converter.orjson.__version__ if gstr1_converter.orjson is not None else None,
+    }
+
+
+# --- Comparison ---
+
+def compare(baseline, current):
+    """Prints per-stage time ratios (current / baseline) for the scales present in both results"""
+    previous = {result["invoices"]: result for result in baseline["results"]}
+    for result in current["results"]:
+        before = previous.get(result["invoices"])
+        if before is None:
+            continue
+        print(f"{result['invoices']:,} invoices")
+        for name, stage in result["stages"].items():
+            old = before["stages"].get(name)
+            if old and old["seconds"]:
+                print(f"  {name:<35} {old['seconds']:>9.3f}s -> {stage['seconds']:>9.3f}s "
+                      f"({stage['seconds'] / old['seconds']:.2f}x)")
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark GSTR-1 conversion on synthetic returns.")
+    parser.add_argument("--invoices", default=",".join(str(scale) for scale in DEFAULT_SCALES),
+                        help="Comma-separated B2B invoice counts to benchmark")
+    parser.add_argument("--items-per-invoice", type=int, default=3)
+    parser.add_argument("--engine", choices=sorted(gstr1_converter.EXCEL_ENGINES), default=None)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip tracemalloc peak tracking (it slows every stage down)")
+    parser.add_argument("-o", "--output", default=None, help="Write the JSON results to this file")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--xlsx-report", action="store_true",
+                        help="Also compare xlsx size and write time across engines, string modes "
+                             "and compression levels")
+    args = parser.parse_args(argv)
+
+    results = {"environment": environment(), "results": []}
+    for invoices in [int(scale) for scale in args.invoices.split(",") if scale.strip()]:
+        result = run_benchmark(invoices, args.engine, args.items_per_invoice, not args.no_memory,
+                               xlsx_report=args.xlsx_report)
+        print(f"{result['invoices']:,} invoices: {result['total_seconds']:.2f}s", file=sys.stderr)
+        if args.xlsx_report:
+            print_xlsx_tradeoffs(result["xlsx"])
+        results["results"].append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
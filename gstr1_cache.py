@@ -0,0 +1,164 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Defaults, overridable through the environment of the Streamlit server
+DEFAULT_MEMORY_MB = int(os.environ.get("GSTR1_CACHE_MB", "256"))
+DEFAULT_DISK_DIR = os.environ.get("GSTR1_CACHE_DIR") or None
+DEFAULT_DISK_MB = int(os.environ.get("GSTR1_CACHE_DISK_MB", "2048"))
+
+
+def content_digest(data):
+    """Returns the SHA-256 hex digest of uploaded bytes (bytes, bytearray or memoryview)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def sizeof(value):
+    """Estimates the memory held by a cached value in bytes"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    import pandas as pd  # Loaded already when frames are cached; not at server startup
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sum(sizeof(item) for item in value.values())
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ConversionCache:
+    """
+    Size-bounded LRU cache of conversion results, keyed by (content digest, kind),
+    e.g. the parsed sections of an upload or its xlsx/zip output.
+    Entries evicted from memory stay available from the optional on-disk tier,
+    which is bounded and evicted least-recently-used as well.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_MB * 1024 * 1024, disk_dir=DEFAULT_DISK_DIR,
+                 max_disk_bytes=DEFAULT_DISK_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()  # (digest, kind) -> (value, size)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """Bytes currently held in memory"""
+        return self._size
+
+    def get(self, digest, kind):
+        """Returns the cached value, or None when neither tier has it"""
+        key = (digest, kind)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+        value = self._load_from_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store_in_memory(key, value, sizeof(value))
+        return value
+
+    def put(self, digest, kind, value):
+        """Stores a value in memory (if it fits) and in the disk tier"""
+        key = (digest, kind)
+        with self._lock:
+            self._store_in_memory(key, value, sizeof(value))
+        self._save_to_disk(key, value)
+
+    def get_or_create(self, digest, kind, create):
+        """Returns the cached value, computing and storing it with create() on a miss"""
+        value = self.get(digest, kind)
+        if value is None:
+            value = create()
+            self.put(digest, kind, value)
+        return value
+
+    def clear(self):
+        """Empties the memory tier (the disk tier is kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    # --- Memory tier ---
+
+    def _store_in_memory(self, key, value, size):
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return  # Too large to keep in memory at all
+        self._entries[key] = (value, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+
+    # --- Disk tier ---
+
+    def _disk_path(self, key):
+        digest, kind = key
+        safe_kind = "".join(c if c.isalnum() else "_" for c in kind)
+        return os.path.join(self.disk_dir, f"{digest}.{safe_kind}.pkl")
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # Mark as recently used
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _save_to_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            # Write to a temporary file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError as e:
+            print(f"Error writing conversion cache entry: {e}")
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -1,655 +1,1819 @@
+import importlib
+import importlib.util
 import json
-import pandas as pd
-from io import BytesIO
+import mmap
+import os
+import re
+import zipfile
+import numpy as np
+from array import array
+from collections import namedtuple
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import partial
+from io import BytesIO, TextIOBase, UnsupportedOperation
 
-# --- Extraction Functions ---
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON decoder, json is the fallback
+    orjson = None
 
-def extract_b2b_data(data):
-    """Extracts B2B invoice data with calculated Invoice Value"""
-    b2b_data = []
+
+class _LazyModule:
+    """
+    Stands in for a heavy module until it is first used, so that importing this module
+    (e.g. only to extract sections) does not pay for pandas and the writers. The first
+    attribute access imports the module and rebinds the global name to it.
+    """
+
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+
+    def __getattr__(self, attribute):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attribute)
+
+
+def _optional_module(name, alias):
+    """Returns a _LazyModule for an installed package, or None when it is not installed"""
+    if importlib.util.find_spec(name.split(".")[0]) is None:
+        return None
+    return _LazyModule(name, alias)
+
+
+pd = _LazyModule("pandas", "pd")
+ijson = _optional_module("ijson", "ijson")  # Optional: only needed for streaming mode
+xlsxwriter = _optional_module("xlsxwriter", "xlsxwriter")  # Optional: faster Excel writer, openpyxl is the fallback
+pa = _optional_module("pyarrow", "pa")  # Optional: only needed for Parquet/Arrow output
+pq = _optional_module("pyarrow.parquet", "pq")
+
+# --- Section Schemas ---
+
+# One declarative schema per GSTR-1 section:
+#   key            top-level JSON key of the section
+#   container      key of the record list when the section is an object (hsn, doc_issue)
+#   records        key of the child list when records are grouped (b2b[].inv, doc_det[].docs)
+#   parent_fields  (column, source key, default) taken from the grouping object
+#   fields         (column, source key, default) taken from each record
+#   totals         (column, itm_det key) summed over the record's items
+#   value          (column, source key) declared value, falling back to the sum of totals
+#   trailing_fields  (column, source key, default) taken from each record, placed after the value
+SectionSchema = namedtuple(
+    "SectionSchema",
+    ["sheet_name", "label", "key", "container", "records", "parent_fields", "fields", "totals", "value",
+     "trailing_fields"],
+    defaults=[()],
+)
+
+_RECIPIENT = (("Recipient GSTIN", "ctin", None),)
+
+_INVOICE_FIELDS = (
+    ("Invoice Number", "inum", None),
+    ("Invoice Date", "idt", None),
+    ("Place of Supply", "pos", None),
+)
+
+_EXPORT_FIELDS = (
+    ("Invoice Number", "inum", None),
+    ("Invoice Date", "idt", None),
+    ("Port Code", "pcode", None),
+    ("Shipping Bill Number", "sbnum", None),
+    ("Shipping Bill Date", "sbdt", None),
+)
+
+_NOTE_FIELDS = (
+    ("Note Number", "nt_num", None),
+    ("Note Date", "nt_dt", None),
+    ("Note Type", "ntty", None),
+    ("Original Invoice Number", "oinum", None),
+    ("Original Invoice Date", "oidt", None),
+    ("Place of Supply", "pos", None),
+    ("Reason", "rsn", None),
+)
+
+_RATE_SUMMARY_FIELDS = (
+    ("Place of Supply", "pos", None),
+    ("Taxable Value", "txval", None),
+    ("Rate", "rt", None),
+    ("IGST", "iamt", 0),
+    ("CGST", "camt", 0),
+    ("SGST", "samt", 0),
+    ("CESS", "csamt", 0),
+)
+
+_HSN_FIELDS = (
+    ("HSN Code", "hsn_sc", None),
+    ("Description", "desc", None),
+    ("UQC", "uqc", None),
+    ("Quantity", "qty", 0),
+    ("Total Value", "val", 0),
+    ("Taxable Value", "txval", 0),
+    ("IGST", "iamt", 0),
+    ("CGST", "camt", 0),
+    ("SGST", "samt", 0),
+    ("CESS", "csamt", 0),
+)
+
+_DOC_FIELDS = (
+    ("Serial Number From", "from", None),
+    ("Serial Number To", "to", None),
+    ("Total Issued", "totnum", None),
+    ("Cancelled", "cancel", None),
+    ("Net Issued", "net_issue", None),
+)
+
+_ALL_TAX_TOTALS = (
+    ("Taxable Value", "txval"),
+    ("Total IGST", "iamt"),
+    ("Total CGST", "camt"),
+    ("Total SGST", "samt"),
+    ("Total CESS", "csamt"),
+)
+
+_IGST_TOTALS = (
+    ("Taxable Value", "txval"),
+    ("Total IGST", "iamt"),
+)
+
+_UNREG_NOTE_TOTALS = (
+    ("Taxable Value", "txval"),
+    ("Total IGST", "iamt"),
+    ("Total CESS", "csamt"),
+)
+
+
+SECTION_SCHEMAS = [
+    SectionSchema("B2B Invoices", "B2B", "b2b", None, "inv",
+                  _RECIPIENT, _INVOICE_FIELDS + (("Reverse Charge", "rchrg", None),),
+                  _ALL_TAX_TOTALS, ("Invoice Value", "val")),
+    SectionSchema("B2C Large Invoices", "B2CL", "b2cl", None, None,
+                  (), _INVOICE_FIELDS, _IGST_TOTALS, ("Invoice Value", "val")),
+    SectionSchema("B2C Small Summary", "B2CS", "b2cs", None, None,
+                  (), _RATE_SUMMARY_FIELDS, (), None),
+    SectionSchema("Exports", "Export", "exp", None, None,
+                  (), _EXPORT_FIELDS, _IGST_TOTALS, ("Invoice Value", "val")),
+    SectionSchema("Credit Debit Notes (Reg)", "CDNR", "cdnr", None, "nt",
+                  _RECIPIENT, _NOTE_FIELDS, _ALL_TAX_TOTALS, ("Note Value", "val")),
+    SectionSchema("Credit Debit Notes (Unreg)", "CDUNR", "cdunr", None, None,
+                  (), _NOTE_FIELDS, _UNREG_NOTE_TOTALS, ("Note Value", "val")),
+    SectionSchema("HSN Summary", "HSN", "hsn", "data", None,
+                  (), _HSN_FIELDS, (), None),
+    SectionSchema("Document Issued Summary", "Document Issued", "doc_issue", "doc_det", "docs",
+                  (("Document Type Index", "doc_num", 0),), _DOC_FIELDS, (), None),
+    SectionSchema("Nil Rated Supplies", "Nil Rated", "nil", None, None,
+                  (), _RATE_SUMMARY_FIELDS, (), None),
+]
+
+# Fields identifying the record an amendment replaces, by section key
+AMENDMENT_FIELDS = {
+    "b2b": (("Original Invoice Number", "oinum", None), ("Original Invoice Date", "oidt", None)),
+    "b2cl": (("Original Invoice Number", "oinum", None), ("Original Invoice Date", "oidt", None)),
+    "exp": (("Original Invoice Number", "oinum", None), ("Original Invoice Date", "oidt", None)),
+    "cdnr": (("Original Note Number", "ont_num", None), ("Original Note Date", "ont_dt", None)),
+    "cdunr": (("Original Note Number", "ont_num", None), ("Original Note Date", "ont_dt", None)),
+}
+
+# Every section except B2CS has an amended twin with the same layout, followed
+# by the original document's number and date for invoices and notes
+SECTION_SCHEMAS += [
+    schema._replace(sheet_name=f"Amended {schema.sheet_name}",
+                    label=f"Amended {schema.label}",
+                    key=f"amend_{schema.key}",
+                    trailing_fields=AMENDMENT_FIELDS.get(schema.key, ()))
+    for schema in SECTION_SCHEMAS if schema.key != "b2cs"
+]
+
+SCHEMAS_BY_KEY = {schema.key: schema for schema in SECTION_SCHEMAS}
+SCHEMAS_BY_SHEET = {schema.sheet_name: schema for schema in SECTION_SCHEMAS}
+
+
+def schema_columns(schema):
+    """Returns the sheet columns of a section in output order"""
+    columns = [column for column, _, _ in schema.parent_fields + schema.fields]
+    columns += [column for column, _ in schema.totals]
+    if schema.value is not None:
+        columns.append(schema.value[0])
+    columns += [column for column, _, _ in schema.trailing_fields]
+    return columns
+
+
+def _record_field(column):
+    """Returns the record attribute name of a column, e.g. "Recipient GSTIN" -> recipient_gstin"""
+    return re.sub(r"[^0-9a-z]+", "_", column.lower()).strip("_")
+
+
+def _record_type(schema):
+    type_name = re.sub(r"[^0-9A-Za-z]+", "", schema.sheet_name.title()) + "Record"
+    return namedtuple(type_name, [_record_field(column) for column in schema_columns(schema)], rename=True)
+
+
+# Fixed-schema row type of each section, e.g. RECORD_TYPES["B2B Invoices"](recipient_gstin=..., ...)
+RECORD_TYPES = {schema.sheet_name: _record_type(schema) for schema in SECTION_SCHEMAS}
+
+
+# --- Extraction Engine ---
+
+# Output dtypes. Repetitive codes become categories, amounts and counts float64,
+# and everything else (numbers, dates, descriptions) stays as Python objects.
+CATEGORY_COLUMNS = {
+    "Recipient GSTIN", "Place of Supply", "Reverse Charge", "Note Type",
+    "Rate", "UQC", "Port Code", "Document Type Index",
+}
+FLOAT_COLUMNS = {
+    "Taxable Value", "Total IGST", "Total CGST", "Total SGST", "Total CESS",
+    "Invoice Value", "Note Value", "IGST", "CGST", "SGST", "CESS",
+    "Quantity", "Total Value", "Total Issued", "Cancelled", "Net Issued",
+}
+
+
+def _as_float(values):
+    """Converts buffered values to a float64 array; missing or non-numeric values become NaN"""
     try:
-        b2b_section = data.get("b2b", [])
-        for supplier in b2b_section:
-            recipient_gstin = supplier.get("ctin")
-            invoices = supplier.get("inv", [])
-            for invoice in invoices:
-                items = invoice.get("itms", [])
-                total_taxable_value = 0
-                total_igst = 0
-                total_cgst = 0
-                total_sgst = 0
-                total_cess = 0
-                for item in items:
-                    item_details = item.get("itm_det", {})
-                    taxable_value = item_details.get("txval", 0)
-                    total_taxable_value += taxable_value
-                    total_igst += item_details.get("iamt", 0)
-                    total_cgst += item_details.get("camt", 0)
-                    total_sgst += item_details.get("samt", 0)
-                    total_cess += item_details.get("csamt", 0)
-                # Calculate Invoice Value if not provided
-                invoice_value = invoice.get("val")
-                if invoice_value is None:
-                    invoice_value = total_taxable_value + total_igst + total_cgst + total_sgst + total_cess
-                b2b_data.append({
-                    "Recipient GSTIN": recipient_gstin,
-                    "Invoice Number": invoice.get("inum"),
-                    "Invoice Date": invoice.get("idt"),
-                    "Place of Supply": invoice.get("pos"),
-                    "Reverse Charge": invoice.get("rchrg"),
-                    "Taxable Value": total_taxable_value,
-                    "Total IGST": total_igst,
-                    "Total CGST": total_cgst,
-                    "Total SGST": total_sgst,
-                    "Total CESS": total_cess,
-                    "Invoice Value": invoice_value
-                })
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _as_object(values):
+    """Converts buffered values to a 1-D object array without dtype inference"""
+    objects = np.empty(len(values), dtype=object)
+    objects[:] = values
+    return objects
+
+
+def _interning_append(values, seen=None):
+    """
+    Returns an append function for a column of repetitive values (GSTINs, POS codes,
+    rates) that stores each distinct value once: every equal value appended after
+    the first is replaced by the first object, so parsed duplicates can be freed.
+    seen is the {value: first object} table, when it is shared with other writers.
+    """
+    append = values.append
+    seen = {} if seen is None else seen
+    setdefault = seen.setdefault
+
+    def intern_append(value):
+        try:
+            append(setdefault(value, value))
+        except TypeError:  # Unhashable values are kept as they are
+            append(value)
+
+    return intern_append
+
+
+def _typed_column(column, values):
+    """Builds the output array of a column with its fixed dtype"""
+    if column in FLOAT_COLUMNS:
+        return _as_float(values)
+    if column in CATEGORY_COLUMNS:
+        try:
+            return pd.Categorical(_as_object(values))
+        except TypeError:  # Unhashable values cannot be categories
+            return pd.Series(_as_object(values), dtype=object)
+    return pd.Series(_as_object(values), dtype=object)
+
+
+def recategorize(frame):
+    """
+    Restores the category dtypes of a section frame assembled from other frames
+    (concatenated shards, reused rows, joined views): category columns hold exactly
+    the values present, as in a fresh conversion. Returns the frame, changed in place.
+    """
+    for column in frame.columns:
+        if column not in CATEGORY_COLUMNS:
+            continue
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].cat.remove_unused_categories()
+        else:
+            try:
+                frame[column] = frame[column].astype("category")
+            except TypeError:  # Unhashable values stay objects
+                pass
+    return frame
+
+
+def document_column(schema):
+    """Returns the document (invoice or note) number column of a section, or None when it has none"""
+    return next((column for column, key, _ in schema.fields if key in ("inum", "nt_num")), None)
+
+
+# Records appended between two progress reports of a section
+PROGRESS_CHUNK_RECORDS = 5000
+
+
+class SectionBuffer:
+    """
+    Per-column buffers for one section, filled according to its schema.
+    Item amounts are flattened into typed arrays with an invoice-index column
+    and summed per invoice with vectorized group-sums when the frame is built.
+    With item_rates=True the itm_det.rt of every item is kept as well, for the
+    invoice-rate rows of item_frame().
+    """
+
+    def __init__(self, schema, item_rates=False):
+        self.schema = schema
+        self.columns = {column: []
+                        for column, _, _ in schema.parent_fields + schema.fields + schema.trailing_fields}
+        self._interned = {column: {} for column in self.columns if column in CATEGORY_COLUMNS}
+        self.failed = False
+        self._parent_fields = [(self._append_function(column), key, default)
+                               for column, key, default in schema.parent_fields]
+        self._fields = [(self._append_function(column), key, default)
+                        for column, key, default in schema.fields + schema.trailing_fields]
+        self._total_keys = [key for _, key in schema.totals]
+        self._value_key = schema.value[1] if schema.value is not None else None
+        self._record_count = 0
+        # Item amounts per tax head, aligned with the invoice index of each item
+        self.item_index = array("q")
+        self.item_values = {key: array("d") for key in self._total_keys}
+        self.item_rates = array("d") if item_rates and self._total_keys else None
+        self._pending_items = []
+        self.declared_values = []
+        self._checkpoint = (0, 0)
+        self.metrics = None  # Optional ConversionMetrics receiving error events
+
+    def __len__(self):
+        return self._record_count
+
+    def _append_function(self, column):
+        if column in CATEGORY_COLUMNS:
+            return _interning_append(self.columns[column], self._interned[column])
+        return self.columns[column].append
+
+    def start_document(self):
+        """Marks the start of a new return; a failure then only drops that return's records"""
+        self.failed = False
+        self._checkpoint = (self._record_count, len(self.item_index))
+
+    def extend_section(self, section, progress=None, chunk_records=PROGRESS_CHUNK_RECORDS):
+        """
+        Appends the records of a top-level section value.
+        With a progress callback, the elements are appended in slices of about
+        chunk_records records and progress(rows so far) is called after each slice.
+        """
+        try:
+            if self.schema.container is not None and section is not None:
+                section = section.get(self.schema.container, [])
+            elements = iter(section or [])
+        except Exception as e:
+            self._fail(e)
+            return
+        if progress is None:
+            self.extend(elements)
+            return
+        records_key = self.schema.records
+        chunk, count = [], 0
+        for element in elements:
+            chunk.append(element)
+            if records_key is not None and isinstance(element, dict):
+                count += len(element.get(records_key) or ())
+            else:
+                count += 1
+            if count >= chunk_records:
+                self.extend(chunk)
+                progress(len(self))
+                chunk, count = [], 0
+        if chunk:
+            self.extend(chunk)
+            progress(len(self))
+
+    def extend(self, elements):
+        """Appends section elements: records, or grouping objects holding records"""
+        if self.failed:
+            return
+        try:
+            records_key = self.schema.records
+            for element in elements:
+                if records_key is None:
+                    self._append_record(element)
+                    continue
+                for record in element.get(records_key, []):
+                    for append, key, default in self._parent_fields:
+                        append(element.get(key, default))
+                    self._append_record(record)
+            self._flush_items()
+        except Exception as e:
+            self._fail(e)
+
+    def extend_validated(self, elements):
+        """
+        Appends section elements that passed validate_gstr1, column by column and
+        without the per-value checks and rollback of extend().
+        """
+        if self.failed:
+            return
+        records_key = self.schema.records
+        if records_key is None:
+            records = elements if isinstance(elements, list) else list(elements)
+        else:
+            groups = [(element, element.get(records_key, [])) for element in elements]
+            records = [record for _, group in groups for record in group]
+            for column, key, default in self.schema.parent_fields:
+                values = []
+                for element, group in groups:
+                    values += [element.get(key, default)] * len(group)
+                self._extend_column(column, values)
+        for column, key, default in self.schema.fields + self.schema.trailing_fields:
+            self._extend_column(column, [record.get(key, default) for record in records])
+        if self._total_keys:
+            items = [record.get("itms", []) for record in records]
+            index = np.repeat(np.arange(self._record_count, self._record_count + len(records), dtype=np.int64),
+                              [len(record_items) for record_items in items])
+            self.item_index.frombytes(index.tobytes())
+            self._pending_items = [item.get("itm_det", {}) for record_items in items for item in record_items]
+            self.declared_values.extend([record.get(self._value_key) for record in records])
+            self._flush_items()
+        self._record_count += len(records)
+
+    def _extend_column(self, column, values):
+        seen = self._interned.get(column)
+        if seen is not None:  # Validated values are scalars, so always hashable
+            setdefault = seen.setdefault
+            values = [setdefault(value, value) for value in values]
+        self.columns[column].extend(values)
+
+    def _append_record(self, record):
+        for append, key, default in self._fields:
+            append(record.get(key, default))
+        if self._total_keys:
+            items = record.get("itms", [])
+            self.item_index.extend([self._record_count] * len(items))
+            self._pending_items.extend([item.get("itm_det", {}) for item in items])
+            self.declared_values.append(record.get(self._value_key))
+        self._record_count += 1
+
+    def _flush_items(self):
+        # Flatten the collected itm_det objects into the typed per-head arrays,
+        # one column at a time, so the source objects can be released
+        if not self._pending_items:
+            return
+        for key, values in self.item_values.items():
+            values.extend([item_details.get(key, 0) for item_details in self._pending_items])
+        if self.item_rates is not None:
+            rates = _as_float([item_details.get("rt") for item_details in self._pending_items])
+            self.item_rates.frombytes(rates.tobytes())
+        self._pending_items = []
+
+    def _fail(self, error):
+        # A broken section is dropped as a whole, as the per-section extractors always did
+        print(f"Error extracting {self.schema.label} data: {error}")
+        if self.metrics is not None:
+            self.metrics.error("extract", error, section=self.schema.sheet_name)
+        self.failed = True
+        records, items = self._checkpoint
+        for values in self.columns.values():
+            del values[records:]
+        del self.declared_values[records:]
+        self._record_count = records
+        del self.item_index[items:]
+        for values in self.item_values.values():
+            del values[items:]
+        if self.item_rates is not None:
+            del self.item_rates[items:]
+        self._pending_items = []
+
+    def input_count(self):
+        """Returns the number of input items (itms entries, or records for sections without items)"""
+        return len(self.item_index) if self._total_keys else self._record_count
+
+    def totals(self):
+        """Returns the per-record totals of each summed tax head as float64 arrays"""
+        index = np.frombuffer(self.item_index, dtype=np.int64)
+        return {
+            column: np.bincount(index, weights=np.frombuffer(self.item_values[key], dtype=np.float64),
+                                minlength=self._record_count)
+            for column, key in self.schema.totals
+        }
+
+    def _output_columns(self):
+        trailing = [column for column, _, _ in self.schema.trailing_fields]
+        columns = {column: values for column, values in self.columns.items() if column not in trailing}
+        if self._total_keys:
+            totals = self.totals()
+            columns.update(totals)
+            # Calculate Invoice/Note Value if not provided
+            declared = _as_float(self.declared_values)
+            computed = sum(totals.values())
+            columns[self.schema.value[0]] = np.where(np.isnan(declared), computed, declared)
+        columns.update((column, self.columns[column]) for column in trailing)
+        return columns
+
+    def records(self):
+        """Returns the buffered rows as a list of the section's record type (see RECORD_TYPES)"""
+        columns = [values.tolist() if isinstance(values, np.ndarray) else values
+                   for values in self._output_columns().values()]
+        return list(map(RECORD_TYPES[self.schema.sheet_name]._make, zip(*columns)))
+
+    def rows(self):
+        """Returns the buffered rows as a list of dicts"""
+        columns = {column: values.tolist() if isinstance(values, np.ndarray) else values
+                   for column, values in self._output_columns().items()}
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    def to_frame(self):
+        """Builds the section DataFrame from the column buffers with fixed dtypes"""
+        return pd.DataFrame({column: _typed_column(column, values)
+                             for column, values in self._output_columns().items()})
+
+    def _item_groups(self):
+        """
+        Sums the item amounts per (record, rate) with one group-by over the flat arrays.
+        Returns: (record index of each group, its rate, DataFrame of its summed totals)
+        """
+        index = np.frombuffer(self.item_index, dtype=np.int64)
+        rates = np.frombuffer(self.item_rates, dtype=np.float64)
+        amounts = pd.DataFrame({column: np.frombuffer(self.item_values[key], dtype=np.float64)
+                                for column, key in self.schema.totals})
+        grouped = amounts.groupby([index, rates], sort=True, dropna=False).sum()
+        return (grouped.index.get_level_values(0).to_numpy(), grouped.index.get_level_values(1).to_numpy(),
+                grouped.reset_index(drop=True))
+
+    def item_frame(self):
+        """
+        Builds the invoice-rate rows of a section read with item_rates=True: one row per
+        record and distinct itm_det.rt, with the record's fields and its totals at that rate.
+        """
+        return self._item_frame(self._item_groups())
+
+    def _item_frame(self, groups):
+        rows, rates, amounts = groups
+        frame = pd.DataFrame({column: _typed_column(column, values) for column, values in self.columns.items()})
+        frame = frame.take(rows).reset_index(drop=True)
+        frame["Rate"] = _typed_column("Rate", rates.tolist())
+        for column in amounts.columns:
+            frame[column] = amounts[column].to_numpy()
+        trailing = [column for column, _, _ in self.schema.trailing_fields]
+        return frame[[column for column in frame.columns if column not in trailing] + trailing]
+
+
+def frame_from_records(sheet_name, records):
+    """
+    Builds a section DataFrame from a list of its record type, column by column,
+    with the same fixed dtypes as SectionBuffer.to_frame().
+    """
+    columns = schema_columns(SCHEMAS_BY_SHEET[sheet_name])
+    values = zip(*records) if records else [()] * len(columns)
+    return pd.DataFrame({column: _typed_column(column, list(column_values))
+                         for column, column_values in zip(columns, values)})
+
+
+def new_section_buffers(item_rates=False):
+    """Returns empty SectionBuffers for every section, keyed by sheet name"""
+    return {schema.sheet_name: SectionBuffer(schema, item_rates) for schema in SECTION_SCHEMAS}
+
+
+def _start_documents(buffers, metrics):
+    for buffer in buffers.values():
+        buffer.metrics = metrics
+        buffer.start_document()
+
+
+def _finish_extract(metrics, token, buffer, before):
+    # Records the items read and rows produced since before = (input count, row count)
+    metrics.finish(token, input_items=buffer.input_count() - before[0], output_rows=len(buffer) - before[1])
+
+
+def extract_sections(gstr1_data, buffers=None, metrics=None, validated=False):
+    """
+    Extracts every section in a single pass over the top-level keys.
+    Appends to the given buffers (e.g. to merge several returns) or to new ones.
+    metrics is an optional ConversionMetrics that gets one "extract" stage per section.
+    With validated=True, gstr1_data must be a document returned by validate_gstr1;
+    its sections are then read on the unchecked fast path (see SectionBuffer.extend_validated).
+    Returns a dictionary of SectionBuffers keyed by sheet name.
+    """
+    if buffers is None:
+        buffers = new_section_buffers()
+    _start_documents(buffers, metrics)
+    for key, value in gstr1_data.items():
+        schema = SCHEMAS_BY_KEY.get(key)
+        if schema is None:
+            continue
+        buffer = buffers[schema.sheet_name]
+        extend = buffer.extend_section
+        if validated:
+            extend = partial(_extend_validated_section, buffer)
+        if metrics is None:
+            extend(value)
+            continue
+        before = (buffer.input_count(), len(buffer))
+        token = metrics.start("extract", schema.sheet_name)
+        extend(value)
+        _finish_extract(metrics, token, buffer, before)
+    return buffers
+
+
+def _extend_validated_section(buffer, section):
+    if buffer.schema.container is not None and section is not None:
+        section = section.get(buffer.schema.container, [])
+    buffer.extend_validated(section or [])
+
+
+def _extract_rows(key, data):
+    """Runs the engine for one section and returns its rows as a list of dicts"""
+    buffer = SectionBuffer(SCHEMAS_BY_KEY[key])
+    try:
+        section = data.get(key)
     except Exception as e:
-        print(f"Error extracting B2B data: {e}")
+        buffer._fail(e)
         return []
-    return b2b_data
+    buffer.extend_section(section)
+    return buffer.rows()
+
+
+# --- Schema Validation ---
+
+# Validation modes: "strict" raises ValidationError listing every invalid record,
+# "lenient" converts the valid records and quarantines the rest (see validation_frame)
+VALIDATION_MODES = ("strict", "lenient")
+
+# Sheet listing the records a lenient conversion left out
+VALIDATION_SHEET = "Validation Errors"
+VALIDATION_COLUMNS = ["Section", "Record", "Path", "Error", "Value"]
+
+# One validation failure: the section's sheet name, the 1-based number of the record
+# within its section (None when a whole supplier block or section is rejected), the
+# JSON path of the offending value, what was expected and the value found
+ValidationIssue = namedtuple("ValidationIssue", ["section", "record", "path", "error", "value"])
+
+# Value types as decoded from JSON
+_SCALAR_TYPES = {str, int, float, bool, type(None)}
+_NUMBER_TYPES = {int, float}
+_OPTIONAL_NUMBER_TYPES = {int, float, type(None)}
+
+
+class ValidationError(ValueError):
+    """Raised by strict validation; issues holds every ValidationIssue found"""
+
+    def __init__(self, issues):
+        self.issues = issues
+        shown = "; ".join(f"{issue.path}: {issue.error}" for issue in issues[:5])
+        more = f" (and {len(issues) - 5:,} more)" if len(issues) > 5 else ""
+        super().__init__(f"{len(issues):,} invalid GSTR-1 entries: {shown}{more}")
+
+
+def _compile_record_check(schema):
+    """
+    Compiles the predicate of one section's records from its schema into a Python
+    function, with one inlined type test per field: True when the record is an object
+    whose fields are scalars (numbers for amount and count columns), whose itms are
+    objects with numeric itm_det amounts and whose declared value is a number, so that
+    SectionBuffer.extend_validated can read it without checks.
+    """
+    conditions = ["type(record) is dict"]
+    for column, key, _ in schema.fields + schema.trailing_fields:
+        types = "optional_number" if column in FLOAT_COLUMNS else "scalar"
+        conditions.append(f"type(record.get({key!r})) in {types}")
+    item_conditions = ["type(details) is dict", "type(details.get('rt')) in optional_number"]
+    item_conditions += [f"type(details.get({key!r}, 0)) in number" for _, key in schema.totals]
+    if schema.totals:
+        conditions.append(f"type(record.get({schema.value[1]!r})) in optional_number")
+        conditions.append("valid_items(record.get('itms', empty_list))")
+    source = (
+        "def valid_items(items):\n"
+        "    if type(items) is not list:\n"
+        "        return False\n"
+        "    for item in items:\n"
+        "        if type(item) is not dict:\n"
+        "            return False\n"
+        "        details = item.get('itm_det', empty_dict)\n"
+        f"        if not ({' and '.join(item_conditions)}):\n"
+        "            return False\n"
+        "    return True\n"
+        "\n"
+        "def valid(record):\n"
+        f"    return {' and '.join(conditions)}\n"
+    )
+    namespace = {"scalar": _SCALAR_TYPES, "number": _NUMBER_TYPES, "optional_number": _OPTIONAL_NUMBER_TYPES,
+                 "empty_list": (), "empty_dict": {}}
+    exec(compile(source, f"<{schema.key} record check>", "exec"), namespace)
+    return namespace["valid"]
+
+
+# Compiled record predicate of each section, keyed by section key
+RECORD_CHECKS = {schema.key: _compile_record_check(schema) for schema in SECTION_SCHEMAS}
+
+
+def _type_error(value, expected):
+    return f"expected {expected}, got {type(value).__name__}"
+
+
+def _record_issues(schema, record, path):
+    """Explains why a record failed its RECORD_CHECKS predicate: yields (path, error, value)"""
+    if type(record) is not dict:
+        yield path, _type_error(record, "an object"), record
+        return
+    for column, key, _ in schema.fields + schema.trailing_fields:
+        value = record.get(key)
+        if column in FLOAT_COLUMNS and type(value) not in _OPTIONAL_NUMBER_TYPES:
+            yield f"{path}.{key}", _type_error(value, "a number"), value
+        elif type(value) not in _SCALAR_TYPES:
+            yield f"{path}.{key}", _type_error(value, "a text or number"), value
+    if not schema.totals:
+        return
+    value_key = schema.value[1]
+    if type(record.get(value_key)) not in _OPTIONAL_NUMBER_TYPES:
+        yield f"{path}.{value_key}", _type_error(record.get(value_key), "a number"), record.get(value_key)
+    items = record.get("itms", [])
+    if type(items) is not list:
+        yield f"{path}.itms", _type_error(items, "a list"), items
+        return
+    for position, item in enumerate(items):
+        item_path = f"{path}.itms[{position}]"
+        if type(item) is not dict:
+            yield item_path, _type_error(item, "an object"), item
+            continue
+        details = item.get("itm_det", {})
+        if type(details) is not dict:
+            yield f"{item_path}.itm_det", _type_error(details, "an object"), details
+            continue
+        if type(details.get("rt")) not in _OPTIONAL_NUMBER_TYPES:
+            yield f"{item_path}.itm_det.rt", _type_error(details.get("rt"), "a number"), details.get("rt")
+        for _, key in schema.totals:
+            if type(details.get(key, 0)) not in _NUMBER_TYPES:
+                yield f"{item_path}.itm_det.{key}", _type_error(details.get(key), "a number"), details.get(key)
+
+
+def _validate_section(schema, section, issues):
+    """
+    Validates one section value in a single sweep, appending a ValidationIssue per
+    problem to issues. Returns the section without its invalid records (the same
+    object when it has none), or None when the section as a whole is unusable.
+    """
+    sheet_name = schema.sheet_name
+    if section is None:
+        return None
+    path = schema.key
+    container = section
+    if schema.container is not None:
+        if type(section) is not dict:
+            issues.append(ValidationIssue(sheet_name, None, path, _type_error(section, "an object"), section))
+            return None
+        path = f"{path}.{schema.container}"
+        container = section.get(schema.container, [])
+    if type(container) is not list:
+        issues.append(ValidationIssue(sheet_name, None, path, _type_error(container, "a list"), container))
+        return None
+
+    valid = RECORD_CHECKS[schema.key]
+    records_key = schema.records
+    if records_key is None and all(map(valid, container)):
+        return section
+    kept = []
+    changed = False
+    record_number = 0
+    for position, element in enumerate(container):
+        element_path = f"{path}[{position}]"
+        if records_key is None:
+            record_number += 1
+            if valid(element):
+                kept.append(element)
+                continue
+            issues.extend(ValidationIssue(sheet_name, record_number, *issue)
+                          for issue in _record_issues(schema, element, element_path))
+            changed = True
+            continue
+        # Supplier blocks (b2b[], cdnr[], doc_det[]): the block itself, then each of its records
+        records = element.get(records_key, []) if type(element) is dict else None
+        if type(element) is not dict:
+            problem = (element_path, _type_error(element, "an object"), element)
+        elif type(records) is not list:
+            problem = (f"{element_path}.{records_key}", _type_error(records, "a list"), records)
+        else:
+            problem = next(((f"{element_path}.{key}", _type_error(element.get(key), "a text or number"),
+                             element.get(key))
+                            for _, key, _ in schema.parent_fields if type(element.get(key)) not in _SCALAR_TYPES),
+                           None)
+        if problem is not None:
+            issues.append(ValidationIssue(sheet_name, None, *problem))
+            record_number += len(records) if type(records) is list else 0
+            changed = True
+            continue
+        if all(map(valid, records)):
+            kept.append(element)
+            record_number += len(records)
+            continue
+        good = []
+        for record_position, record in enumerate(records):
+            record_number += 1
+            if valid(record):
+                good.append(record)
+                continue
+            record_path = f"{element_path}.{records_key}[{record_position}]"
+            issues.extend(ValidationIssue(sheet_name, record_number, *issue)
+                          for issue in _record_issues(schema, record, record_path))
+        if len(good) == len(records):
+            kept.append(element)
+        else:
+            kept.append({**element, records_key: good})
+            changed = True
+    if not changed:
+        return section
+    if schema.container is not None:
+        return {**section, schema.container: kept}
+    return kept
+
+
+def validate_gstr1(gstr1_data, mode="lenient"):
+    """
+    Checks every section of a parsed return against its schema in one sweep.
+    Returns: (the document without its invalid records, [ValidationIssue]); the
+    document can then be extracted with extract_sections(..., validated=True).
+    In "strict" mode a ValidationError listing every issue is raised instead when
+    anything is invalid.
+    """
+    if mode not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode: {mode}")
+    if not isinstance(gstr1_data, dict):
+        raise ValidationError([ValidationIssue(None, None, "", _type_error(gstr1_data, "an object"), gstr1_data)])
+    issues = []
+    validated = {}
+    for key, value in gstr1_data.items():
+        schema = SCHEMAS_BY_KEY.get(key)
+        if schema is None:
+            validated[key] = value
+            continue
+        value = _validate_section(schema, value, issues)
+        if value is not None:
+            validated[key] = value
+    if issues and mode == "strict":
+        raise ValidationError(issues)
+    return validated, issues
+
+
+def validation_frame(issues):
+    """Builds the Validation Errors sheet of a lenient conversion, one row per issue"""
+    return pd.DataFrame({
+        "Section": pd.Categorical([issue.section for issue in issues]),
+        "Record": pd.array([issue.record for issue in issues], dtype="Int64"),
+        "Path": pd.Series([issue.path for issue in issues], dtype=object),
+        "Error": pd.Series([issue.error for issue in issues], dtype=object),
+        "Value": pd.Series([_short_repr(issue.value) for issue in issues], dtype=object),
+    }, columns=VALIDATION_COLUMNS)
+
+
+def _short_repr(value, limit=80):
+    text = json.dumps(value, default=str, ensure_ascii=False)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+# --- Extraction Functions ---
+
+def extract_b2b_data(data):
+    """Extracts B2B invoice data with calculated Invoice Value"""
+    return _extract_rows("b2b", data)
 
 
 def extract_b2cl_data(data):
     """Extracts B2C Large invoices with calculated Invoice Value"""
-    b2cl_data = []
-    try:
-        b2cl_section = data.get("b2cl", [])
-        for invoice in b2cl_section:
-            items = invoice.get("itms", [])
-            total_taxable_value = 0
-            total_igst = 0
-            for item in items:
-                item_details = item.get("itm_det", {})
-                taxable_value = item_details.get("txval", 0)
-                total_taxable_value += taxable_value
-                total_igst += item_details.get("iamt", 0)
-            # Calculate Invoice Value if not provided
-            invoice_value = invoice.get("val")
-            if invoice_value is None:
-                invoice_value = total_taxable_value + total_igst
-            b2cl_data.append({
-                "Invoice Number": invoice.get("inum"),
-                "Invoice Date": invoice.get("idt"),
-                "Place of Supply": invoice.get("pos"),
-                "Taxable Value": total_taxable_value,
-                "Total IGST": total_igst,
-                "Invoice Value": invoice_value
-            })
-    except Exception as e:
-        print(f"Error extracting B2CL data: {e}")
-        return []
-    return b2cl_data
+    return _extract_rows("b2cl", data)
 
 
 def extract_b2cs_data(data):
     """Extracts B2C Small summary data"""
-    b2cs_data = []
-    try:
-        b2cs_section = data.get("b2cs", [])
-        for item in b2cs_section:
-            b2cs_data.append({
-                "Place of Supply": item.get("pos"),
-                "Taxable Value": item.get("txval"),
-                "Rate": item.get("rt"),
-                "IGST": item.get("iamt", 0),
-                "CGST": item.get("camt", 0),
-                "SGST": item.get("samt", 0),
-                "CESS": item.get("csamt", 0)
-            })
-    except Exception as e:
-        print(f"Error extracting B2CS data: {e}")
-        return []
-    return b2cs_data
+    return _extract_rows("b2cs", data)
 
 
 def extract_export_data(data):
     """Extracts Export invoices with calculated Invoice Value"""
-    export_data = []
-    try:
-        export_section = data.get("exp", [])
-        for invoice in export_section:
-            items = invoice.get("itms", [])
-            total_taxable_value = 0
-            total_igst = 0
-            for item in items:
-                item_details = item.get("itm_det", {})
-                taxable_value = item_details.get("txval", 0)
-                total_taxable_value += taxable_value
-                total_igst += item_details.get("iamt", 0)
-            # Calculate Invoice Value if not provided
-            invoice_value = invoice.get("val")
-            if invoice_value is None:
-                invoice_value = total_taxable_value + total_igst
-            export_data.append({
-                "Invoice Number": invoice.get("inum"),
-                "Invoice Date": invoice.get("idt"),
-                "Port Code": invoice.get("pcode"),
-                "Shipping Bill Number": invoice.get("sbnum"),
-                "Shipping Bill Date": invoice.get("sbdt"),
-                "Taxable Value": total_taxable_value,
-                "Total IGST": total_igst,
-                "Invoice Value": invoice_value
-            })
-    except Exception as e:
-        print(f"Error extracting Export data: {e}")
-        return []
-    return export_data
+    return _extract_rows("exp", data)
 
 
 def extract_cdnr_data(data):
     """Extracts Credit/Debit Notes (Registered) with calculated Note Value"""
-    cdnr_data = []
-    try:
-        cdnr_section = data.get("cdnr", [])
-        for supplier_note in cdnr_section:
-            recipient_gstin = supplier_note.get("ctin")
-            notes = supplier_note.get("nt", [])
-            for note in notes:
-                items = note.get("itms", [])
-                total_taxable_value = 0
-                total_igst = 0
-                total_cgst = 0
-                total_sgst = 0
-                total_cess = 0
-                for item in items:
-                    item_details = item.get("itm_det", {})
-                    taxable_value = item_details.get("txval", 0)
-                    total_taxable_value += taxable_value
-                    total_igst += item_details.get("iamt", 0)
-                    total_cgst += item_details.get("camt", 0)
-                    total_sgst += item_details.get("samt", 0)
-                    total_cess += item_details.get("csamt", 0)
-                # Calculate Note Value if not provided
-                note_value = note.get("val")
-                if note_value is None:
-                    note_value = total_taxable_value + total_igst + total_cgst + total_sgst + total_cess
-                cdnr_data.append({
-                    "Recipient GSTIN": recipient_gstin,
-                    "Note Number": note.get("nt_num"),
-                    "Note Date": note.get("nt_dt"),
-                    "Note Type": note.get("ntty"),
-                    "Original Invoice Number": note.get("oinum"),
-                    "Original Invoice Date": note.get("oidt"),
-                    "Place of Supply": note.get("pos"),
-                    "Reason": note.get("rsn"),
-                    "Taxable Value": total_taxable_value,
-                    "Total IGST": total_igst,
-                    "Total CGST": total_cgst,
-                    "Total SGST": total_sgst,
-                    "Total CESS": total_cess,
-                    "Note Value": note_value
-                })
-    except Exception as e:
-        print(f"Error extracting CDNR data: {e}")
-        return []
-    return cdnr_data
+    return _extract_rows("cdnr", data)
 
 
 def extract_cdunr_data(data):
     """Extracts Credit/Debit Notes (Unregistered) with calculated Note Value"""
-    cdunr_data = []
-    try:
-        cdunr_section = data.get("cdunr", [])
-        for note in cdunr_section:
-            items = note.get("itms", [])
-            total_taxable_value = 0
-            total_igst = 0
-            total_cess = 0
-            for item in items:
-                item_details = item.get("itm_det", {})
-                taxable_value = item_details.get("txval", 0)
-                total_taxable_value += taxable_value
-                total_igst += item_details.get("iamt", 0)
-                total_cess += item_details.get("csamt", 0)
-            # Calculate Note Value if not provided
-            note_value = note.get("val")
-            if note_value is None:
-                note_value = total_taxable_value + total_igst + total_cess
-            cdunr_data.append({
-                "Note Number": note.get("nt_num"),
-                "Note Date": note.get("nt_dt"),
-                "Note Type": note.get("ntty"),
-                "Original Invoice Number": note.get("oinum"),
-                "Original Invoice Date": note.get("oidt"),
-                "Place of Supply": note.get("pos"),
-                "Reason": note.get("rsn"),
-                "Taxable Value": total_taxable_value,
-                "Total IGST": total_igst,
-                "Total CESS": total_cess,
-                "Note Value": note_value
-            })
-    except Exception as e:
-        print(f"Error extracting CDUNR data: {e}")
-        return []
-    return cdunr_data
+    return _extract_rows("cdunr", data)
 
 
 def extract_hsn_data(data):
     """Extracts HSN summary data"""
-    hsn_data = []
-    try:
-        hsn_section = data.get("hsn", {})
-        hsn_data_list = hsn_section.get("data", [])
-        for hsn_item in hsn_data_list:
-            hsn_data.append({
-                "HSN Code": hsn_item.get("hsn_sc"),
-                "Description": hsn_item.get("desc"),
-                "UQC": hsn_item.get("uqc"),
-                "Quantity": hsn_item.get("qty", 0),
-                "Total Value": hsn_item.get("val", 0),
-                "Taxable Value": hsn_item.get("txval", 0),
-                "IGST": hsn_item.get("iamt", 0),
-                "CGST": hsn_item.get("camt", 0),
-                "SGST": hsn_item.get("samt", 0),
-                "CESS": hsn_item.get("csamt", 0),
-            })
-    except Exception as e:
-        print(f"Error extracting HSN data: {e}")
-        return []
-    return hsn_data
+    return _extract_rows("hsn", data)
 
 
 def extract_doc_issued_data(data):
     """Extracts document issued summary data"""
-    doc_data = []
-    try:
-        doc_section = data.get("doc_issue", {})
-        doc_list = doc_section.get("doc_det", [])
-        for doc_series in doc_list:
-            doc_num = doc_series.get("doc_num", 0)
-            docs = doc_series.get("docs", [])
-            for doc_detail in docs:
-                doc_data.append({
-                    "Document Type Index": doc_num,
-                    "Serial Number From": doc_detail.get("from"),
-                    "Serial Number To": doc_detail.get("to"),
-                    "Total Issued": doc_detail.get("totnum"),
-                    "Cancelled": doc_detail.get("cancel"),
-                    "Net Issued": doc_detail.get("net_issue")
-                })
-    except Exception as e:
-        print(f"Error extracting Document Issued data: {e}")
-        return []
-    return doc_data
+    return _extract_rows("doc_issue", data)
 
 
 def extract_nil_rated_data(data):
     """Extracts Nil Rated Supplies data"""
-    nil_rated_data = []
-    try:
-        nil_rated_section = data.get("nil", [])
-        for item in nil_rated_section:
-            nil_rated_data.append({
-                "Place of Supply": item.get("pos"),
-                "Taxable Value": item.get("txval"),
-                "Rate": item.get("rt"),
-                "IGST": item.get("iamt", 0),
-                "CGST": item.get("camt", 0),
-                "SGST": item.get("samt", 0),
-                "CESS": item.get("csamt", 0)
-            })
-    except Exception as e:
-        print(f"Error extracting Nil Rated data: {e}")
-        return []
-    return nil_rated_data
+    return _extract_rows("nil", data)
 
 
 def extract_amended_b2b_data(data):
     """Extracts Amended B2B Invoices data"""
-    amended_b2b_data = []
-    try:
-        amended_b2b_section = data.get("amend_b2b", [])
-        for supplier in amended_b2b_section:
-            recipient_gstin = supplier.get("ctin")
-            invoices = supplier.get("inv", [])
-            for invoice in invoices:
-                items = invoice.get("itms", [])
-                total_taxable_value = 0
-                total_igst = 0
-                total_cgst = 0
-                total_sgst = 0
-                total_cess = 0
-                for item in items:
-                    item_details = item.get("itm_det", {})
-                    taxable_value = item_details.get("txval", 0)
-                    total_taxable_value += taxable_value
-                    total_igst += item_details.get("iamt", 0)
-                    total_cgst += item_details.get("camt", 0)
-                    total_sgst += item_details.get("samt", 0)
-                    total_cess += item_details.get("csamt", 0)
-                # Calculate Invoice Value if not provided
-                invoice_value = invoice.get("val")
-                if invoice_value is None:
-                    invoice_value = total_taxable_value + total_igst + total_cgst + total_sgst + total_cess
-                amended_b2b_data.append({
-                    "Recipient GSTIN": recipient_gstin,
-                    "Invoice Number": invoice.get("inum"),
-                    "Invoice Date": invoice.get("idt"),
-                    "Place of Supply": invoice.get("pos"),
-                    "Reverse Charge": invoice.get("rchrg"),
-                    "Taxable Value": total_taxable_value,
-                    "Total IGST": total_igst,
-                    "Total CGST": total_cgst,
-                    "Total SGST": total_sgst,
-                    "Total CESS": total_cess,
-                    "Invoice Value": invoice_value
-                })
-    except Exception as e:
-        print(f"Error extracting Amended B2B data: {e}")
-        return []
-    return amended_b2b_data
+    return _extract_rows("amend_b2b", data)
 
 
 def extract_amended_b2cl_data(data):
     """Extracts Amended B2C (Large) Invoices data"""
-    amended_b2cl_data = []
-    try:
-        amended_b2cl_section = data.get("amend_b2cl", [])
-        for invoice in amended_b2cl_section:
-            items = invoice.get("itms", [])
-            total_taxable_value = 0
-            total_igst = 0
-            for item in items:
-                item_details = item.get("itm_det", {})
-                taxable_value = item_details.get("txval", 0)
-                total_taxable_value += taxable_value
-                total_igst += item_details.get("iamt", 0)
-            # Calculate Invoice Value if not provided
-            invoice_value = invoice.get("val")
-            if invoice_value is None:
-                invoice_value = total_taxable_value + total_igst
-            amended_b2cl_data.append({
-                "Invoice Number": invoice.get("inum"),
-                "Invoice Date": invoice.get("idt"),
-                "Place of Supply": invoice.get("pos"),
-                "Taxable Value": total_taxable_value,
-                "Total IGST": total_igst,
-                "Invoice Value": invoice_value
-            })
-    except Exception as e:
-        print(f"Error extracting Amended B2CL data: {e}")
-        return []
-    return amended_b2cl_data
+    return _extract_rows("amend_b2cl", data)
 
 
 def extract_amended_export_data(data):
     """Extracts Amended Export Invoices data"""
-    amended_export_data = []
-    try:
-        amended_export_section = data.get("amend_exp", [])
-        for invoice in amended_export_section:
-            items = invoice.get("itms", [])
-            total_taxable_value = 0
-            total_igst = 0
-            for item in items:
-                item_details = item.get("itm_det", {})
-                taxable_value = item_details.get("txval", 0)
-                total_taxable_value += taxable_value
-                total_igst += item_details.get("iamt", 0)
-            # Calculate Invoice Value if not provided
-            invoice_value = invoice.get("val")
-            if invoice_value is None:
-                invoice_value = total_taxable_value + total_igst
-            amended_export_data.append({
-                "Invoice Number": invoice.get("inum"),
-                "Invoice Date": invoice.get("idt"),
-                "Port Code": invoice.get("pcode"),
-                "Shipping Bill Number": invoice.get("sbnum"),
-                "Shipping Bill Date": invoice.get("sbdt"),
-                "Taxable Value": total_taxable_value,
-                "Total IGST": total_igst,
-                "Invoice Value": invoice_value
-            })
-    except Exception as e:
-        print(f"Error extracting Amended Export data: {e}")
-        return []
-    return amended_export_data
+    return _extract_rows("amend_exp", data)
 
 
 def extract_amended_cdnr_data(data):
     """Extracts Amended Credit/Debit Notes (Registered) data"""
-    amended_cdnr_data = []
-    try:
-        amended_cdnr_section = data.get("amend_cdnr", [])
-        for supplier_note in amended_cdnr_section:
-            recipient_gstin = supplier_note.get("ctin")
-            notes = supplier_note.get("nt", [])
-            for note in notes:
-                items = note.get("itms", [])
-                total_taxable_value = 0
-                total_igst = 0
-                total_cgst = 0
-                total_sgst = 0
-                total_cess = 0
-                for item in items:
-                    item_details = item.get("itm_det", {})
-                    taxable_value = item_details.get("txval", 0)
-                    total_taxable_value += taxable_value
-                    total_igst += item_details.get("iamt", 0)
-                    total_cgst += item_details.get("camt", 0)
-                    total_sgst += item_details.get("samt", 0)
-                    total_cess += item_details.get("csamt", 0)
-                # Calculate Note Value if not provided
-                note_value = note.get("val")
-                if note_value is None:
-                    note_value = total_taxable_value + total_igst + total_cgst + total_sgst + total_cess
-                amended_cdnr_data.append({
-                    "Recipient GSTIN": recipient_gstin,
-                    "Note Number": note.get("nt_num"),
-                    "Note Date": note.get("nt_dt"),
-                    "Note Type": note.get("ntty"),
-                    "Original Invoice Number": note.get("oinum"),
-                    "Original Invoice Date": note.get("oidt"),
-                    "Place of Supply": note.get("pos"),
-                    "Reason": note.get("rsn"),
-                    "Taxable Value": total_taxable_value,
-                    "Total IGST": total_igst,
-                    "Total CGST": total_cgst,
-                    "Total SGST": total_sgst,
-                    "Total CESS": total_cess,
-                    "Note Value": note_value
-                })
-    except Exception as e:
-        print(f"Error extracting Amended CDNR data: {e}")
-        return []
-    return amended_cdnr_data
+    return _extract_rows("amend_cdnr", data)
 
 
 def extract_amended_cdunr_data(data):
     """Extracts Amended Credit/Debit Notes (Unregistered) data"""
-    amended_cdunr_data = []
-    try:
-        amended_cdunr_section = data.get("amend_cdunr", [])
-        for note in amended_cdunr_section:
-            items = note.get("itms", [])
-            total_taxable_value = 0
-            total_igst = 0
-            total_cess = 0
-            for item in items:
-                item_details = item.get("itm_det", {})
-                taxable_value = item_details.get("txval", 0)
-                total_taxable_value += taxable_value
-                total_igst += item_details.get("iamt", 0)
-                total_cess += item_details.get("csamt", 0)
-            # Calculate Note Value if not provided
-            note_value = note.get("val")
-            if note_value is None:
-                note_value = total_taxable_value + total_igst + total_cess
-            amended_cdunr_data.append({
-                "Note Number": note.get("nt_num"),
-                "Note Date": note.get("nt_dt"),
-                "Note Type": note.get("ntty"),
-                "Original Invoice Number": note.get("oinum"),
-                "Original Invoice Date": note.get("oidt"),
-                "Place of Supply": note.get("pos"),
-                "Reason": note.get("rsn"),
-                "Taxable Value": total_taxable_value,
-                "Total IGST": total_igst,
-                "Total CESS": total_cess,
-                "Note Value": note_value
-            })
-    except Exception as e:
-        print(f"Error extracting Amended CDUNR data: {e}")
-        return []
-    return amended_cdunr_data
+    return _extract_rows("amend_cdunr", data)
 
 
 def extract_amended_hsn_data(data):
     """Extracts Amended HSN summary data"""
-    amended_hsn_data = []
-    try:
-        amended_hsn_section = data.get("amend_hsn", {})
-        amended_hsn_list = amended_hsn_section.get("data", [])
-        for hsn_item in amended_hsn_list:
-            amended_hsn_data.append({
-                "HSN Code": hsn_item.get("hsn_sc"),
-                "Description": hsn_item.get("desc"),
-                "UQC": hsn_item.get("uqc"),
-                "Quantity": hsn_item.get("qty", 0),
-                "Total Value": hsn_item.get("val", 0),
-                "Taxable Value": hsn_item.get("txval", 0),
-                "IGST": hsn_item.get("iamt", 0),
-                "CGST": hsn_item.get("camt", 0),
-                "SGST": hsn_item.get("samt", 0),
-                "CESS": hsn_item.get("csamt", 0),
-            })
-    except Exception as e:
-        print(f"Error extracting Amended HSN data: {e}")
-        return []
-    return amended_hsn_data
+    return _extract_rows("amend_hsn", data)
 
 
 def extract_amended_doc_issued_data(data):
     """Extracts Amended Document Issued summary data"""
-    amended_doc_data = []
-    try:
-        amended_doc_section = data.get("amend_doc_issue", {})
-        amended_doc_list = amended_doc_section.get("doc_det", [])
-        for doc_series in amended_doc_list:
-            doc_num = doc_series.get("doc_num", 0)
-            docs = doc_series.get("docs", [])
-            for doc_detail in docs:
-                amended_doc_data.append({
-                    "Document Type Index": doc_num,
-                    "Serial Number From": doc_detail.get("from"),
-                    "Serial Number To": doc_detail.get("to"),
-                    "Total Issued": doc_detail.get("totnum"),
-                    "Cancelled": doc_detail.get("cancel"),
-                    "Net Issued": doc_detail.get("net_issue")
-                })
-    except Exception as e:
-        print(f"Error extracting Amended Document Issued data: {e}")
-        return []
-    return amended_doc_data
+    return _extract_rows("amend_doc_issue", data)
 
 
 def extract_amended_nil_rated_data(data):
     """Extracts Amended Nil Rated Supplies data"""
-    amended_nil_rated_data = []
+    return _extract_rows("amend_nil", data)
+
+
+# --- Streaming Input ---
+
+# Sections that group invoices/notes under a recipient GSTIN. The stream yields
+# them one invoice at a time as {"ctin": ..., "inv": [invoice]} fragments.
+STREAM_NESTED_SECTIONS = {schema.key: schema.records for schema in SECTION_SCHEMAS
+                          if schema.records is not None and schema.container is None}
+
+# Sections that hold their records in a list under a single object
+STREAM_SUMMARY_SECTIONS = {schema.key: schema.container for schema in SECTION_SCHEMAS
+                           if schema.container is not None}
+
+# Sections that are a plain list of records
+STREAM_FLAT_SECTIONS = tuple(schema.key for schema in SECTION_SCHEMAS
+                             if schema.records is None and schema.container is None)
+
+
+def _parse_events(fp):
+    """ijson.parse, raising json.JSONDecodeError for malformed input like the other decoders"""
+    events = ijson.parse(fp, use_float=True)
+    while True:
+        try:
+            event = next(events)
+        except StopIteration:
+            return
+        except ijson.JSONError as e:
+            raise json.JSONDecodeError(f"Invalid JSON: {e}", "", 0) from e
+        yield event
+
+
+def iter_gstr1_records(fp):
+    """
+    Parses a GSTR-1 JSON file object incrementally.
+    Yields (section key, record) pairs, where a record is one invoice, note or summary row,
+    so peak memory is bounded by a single record rather than the whole return.
+    Top-level scalars such as "gstin" and "fp" are yielded as (key, value).
+    """
+    if ijson is None:
+        raise ImportError("Streaming mode requires the 'ijson' package")
+
+    record_prefixes = {}
+    for key, child in STREAM_NESTED_SECTIONS.items():
+        record_prefixes[f"{key}.item.{child}.item"] = key
+    for key, child in STREAM_SUMMARY_SECTIONS.items():
+        record_prefixes[f"{key}.{child}.item"] = key
+    for key in STREAM_FLAT_SECTIONS:
+        record_prefixes[f"{key}.item"] = key
+    parent_prefixes = {f"{key}.item": key for key in STREAM_NESTED_SECTIONS}
+
+    builder = None
+    depth = 0
+    record_key = None
+    # Recipient GSTIN of the current supplier block, and invoices seen before it
+    parent_ctin = None
+    pending = []
+
+    for prefix, event, value in _parse_events(fp):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+            if depth == 0:
+                record, builder = builder.value, None
+                if record_key in STREAM_NESTED_SECTIONS:
+                    if parent_ctin is None:
+                        pending.append(record)
+                        continue
+                    record = {"ctin": parent_ctin, STREAM_NESTED_SECTIONS[record_key]: [record]}
+                yield record_key, record
+            continue
+
+        if prefix in record_prefixes and event not in ("end_map", "end_array"):
+            record_key = record_prefixes[prefix]
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            depth = 1 if event in ("start_map", "start_array") else 0
+            if depth == 0:
+                record, builder = builder.value, None
+                yield record_key, record
+        elif prefix in parent_prefixes:
+            if event == "start_map":
+                parent_ctin, pending = None, []
+            elif event == "end_map":
+                key = parent_prefixes[prefix]
+                for record in pending:
+                    yield key, {"ctin": parent_ctin, STREAM_NESTED_SECTIONS[key]: [record]}
+                pending = []
+        elif prefix.endswith(".ctin") and prefix[:-len(".ctin")] in parent_prefixes:
+            parent_ctin = value
+            key = parent_prefixes[prefix[:-len(".ctin")]]
+            for record in pending:
+                yield key, {"ctin": parent_ctin, STREAM_NESTED_SECTIONS[key]: [record]}
+            pending = []
+        elif "." not in prefix and prefix and event in ("string", "number", "boolean", "null"):
+            if prefix in SCHEMAS_BY_KEY:
+                continue  # A null (or scalar) section holds no records, e.g. "b2cl": null
+            yield prefix, value
+
+
+def extract_sections_from_stream(fp, buffers=None, header=None, metrics=None):
+    """
+    Streams a GSTR-1 JSON file object through the extraction engine record by record.
+    Top-level scalars (gstin, fp, ...) are stored in header when a dict is given.
+    metrics is an optional ConversionMetrics; as parsing and extraction are interleaved,
+    each section's "extract" stage includes the time spent parsing it.
+    Returns a dictionary of SectionBuffers keyed by sheet name, like extract_sections.
+    """
+    if buffers is None:
+        buffers = new_section_buffers()
+    _start_documents(buffers, metrics)
+    current = None  # (buffer, token, counts before) of the section being streamed
+    for key, record in iter_gstr1_records(fp):
+        schema = SCHEMAS_BY_KEY.get(key)
+        if schema is None:
+            if header is not None:
+                header[key] = record
+            continue
+        buffer = buffers[schema.sheet_name]
+        if metrics is not None and (current is None or current[0] is not buffer):
+            # A section's records arrive contiguously; time each run of them
+            if current is not None:
+                _finish_extract(metrics, current[1], current[0], current[2])
+            current = (buffer, metrics.start("extract", schema.sheet_name),
+                       (buffer.input_count(), len(buffer)))
+        buffer.extend([record])
+    if current is not None:
+        _finish_extract(metrics, current[1], current[0], current[2])
+    return buffers
+
+
+def _should_stream(json_data, stream):
+    """Decides whether the input goes through the streaming parser"""
+    if stream is None:
+        return ijson is not None and (hasattr(json_data, "read") or isinstance(json_data, os.PathLike))
+    return stream
+
+
+def _open_stream(json_data):
+    """Returns a binary file object over str/bytes input, or the file object itself"""
+    if isinstance(json_data, str):
+        return BytesIO(json_data.encode("utf-8"))
+    if isinstance(json_data, (bytes, bytearray)):
+        return BytesIO(json_data)
+    return json_data
+
+
+def _json_loads(data):
+    # The stdlib decoder takes str, bytes and bytearray, but not memoryview
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+# JSON decoders by name: callables taking str, bytes, bytearray or memoryview.
+# Both raise json.JSONDecodeError (orjson's error is a subclass of it).
+JSON_DECODERS = {"json": _json_loads}
+if orjson is not None:
+    JSON_DECODERS["orjson"] = orjson.loads
+
+
+def select_json_decoder(name=None):
+    """Returns the named JSON decoder, or the fastest installed one when name is None"""
+    if name is None:
+        name = "orjson" if "orjson" in JSON_DECODERS else "json"
+    if name not in JSON_DECODERS:
+        raise ValueError(f"Unknown or unavailable JSON decoder: {name}")
+    return JSON_DECODERS[name]
+
+
+def decode_json(data, decoder=None):
+    """
+    Decodes a JSON document from str, bytes, bytearray or memoryview.
+    Bytes are parsed as they are, without decoding them to str first.
+    decoder names one of JSON_DECODERS; by default the fastest installed one is used.
+    """
+    return select_json_decoder(decoder)(data)
+
+
+@contextmanager
+def map_input(json_data):
+    """
+    Memory-maps a path (os.PathLike) or a binary file object read-only.
+    Yields a memoryview of the file from the current position, or None when the input
+    cannot be mapped (text or in-memory files, pipes, empty files).
+    The view is only valid inside the with block.
+    """
+    if isinstance(json_data, os.PathLike):
+        with open(json_data, "rb") as source, map_input(source) as view:
+            yield view
+        return
+    mapped = None
+    if not isinstance(json_data, TextIOBase) and hasattr(json_data, "fileno"):
+        try:
+            mapped = mmap.mmap(json_data.fileno(), 0, access=mmap.ACCESS_READ)
+            start = json_data.tell()
+        except (OSError, ValueError, UnsupportedOperation):
+            mapped = None
+    if mapped is None:
+        yield None
+        return
     try:
-        amended_nil_rated_section = data.get("amend_nil", [])
-        for item in amended_nil_rated_section:
-            amended_nil_rated_data.append({
-                "Place of Supply": item.get("pos"),
-                "Taxable Value": item.get("txval"),
-                "Rate": item.get("rt"),
-                "IGST": item.get("iamt", 0),
-                "CGST": item.get("camt", 0),
-                "SGST": item.get("samt", 0),
-                "CESS": item.get("csamt", 0)
-            })
-    except Exception as e:
-        print(f"Error extracting Amended Nil Rated data: {e}")
-        return []
-    return amended_nil_rated_data
+        with memoryview(mapped) as view, view[start:] as payload:
+            yield payload
+        json_data.seek(0, os.SEEK_END)  # Consumed, as json.load would leave it
+    finally:
+        mapped.close()
 
 
-# --- Main Conversion Logic ---
+def load_json(json_data):
+    """
+    Parses a string, bytes, path or file object into the GSTR-1 document; dicts pass through.
+    Paths and binary files are memory-mapped and decoded in place, so the payload is
+    never copied into a Python string (and stays in the OS page cache between runs).
+    """
+    if isinstance(json_data, (str, bytes, bytearray, memoryview)):
+        return decode_json(json_data)
+    if isinstance(json_data, os.PathLike) or hasattr(json_data, "fileno"):
+        with map_input(json_data) as view:
+            if view is not None:
+                return decode_json(view)
+        if isinstance(json_data, os.PathLike):  # Empty or unmappable file
+            with open(json_data, "rb") as source:
+                return decode_json(source.read())
+    if hasattr(json_data, "getbuffer"):
+        # In-memory files (BytesIO, Streamlit uploads): parse the buffer in place
+        # from the current position instead of copying it out with read()
+        with json_data.getbuffer() as view, view[json_data.tell():] as payload:
+            document = decode_json(payload)
+        json_data.seek(0, os.SEEK_END)  # Consumed, as json.load would leave it
+        return document
+    if hasattr(json_data, "read"):
+        return decode_json(json_data.read())
+    return json_data  # Assume it's already a dict
+
+
+def load_json_timed(json_data, metrics):
+    """Loads the document, recording a "parse" stage unless it is a dict already"""
+    if metrics is None or isinstance(json_data, dict):
+        return load_json(json_data)
+    with metrics.stage("parse"):
+        return load_json(json_data)
+
+
+def _extract_all_sections(json_data, stream, buffers=None, header=None, metrics=None, validation=None, issues=None):
+    """
+    Parses the input (string, bytes, dict, path or file object) and extracts all sections.
+    Top-level scalars (gstin, fp, ...) are stored in header when a dict is given.
+    With a validation mode (see validate_gstr1) the document is loaded rather than
+    streamed, validated and extracted on the fast path; the issues found are added
+    to the issues list when one is given.
+    """
+    if validation is not None:
+        gstr1_data = load_json_timed(json_data, metrics)
+        if header is not None:
+            header.update((key, value) for key, value in gstr1_data.items()
+                          if not isinstance(value, (dict, list)))
+        if metrics is None:
+            gstr1_data, found = validate_gstr1(gstr1_data, validation)
+        else:
+            with metrics.stage("validate") as counts:
+                gstr1_data, found = validate_gstr1(gstr1_data, validation)
+                counts["errors"] = len(found)
+        if issues is not None:
+            issues.extend(found)
+        return extract_sections(gstr1_data, buffers, metrics, validated=True)
+    if isinstance(json_data, os.PathLike) and _should_stream(json_data, stream):
+        with open(json_data, "rb") as source:
+            return extract_sections_from_stream(source, buffers, header, metrics)
+    if _should_stream(json_data, stream):
+        return extract_sections_from_stream(_open_stream(json_data), buffers, header, metrics)
+    gstr1_data = load_json_timed(json_data, metrics)
+    if header is not None:
+        header.update((key, value) for key, value in gstr1_data.items()
+                      if not isinstance(value, (dict, list)))
+    return extract_sections(gstr1_data, buffers, metrics)
+
+
+def build_frames(sections, metrics=None):
+    """
+    Builds the DataFrames of the non-empty SectionBuffers, keyed by sheet name.
+    metrics is an optional ConversionMetrics that gets one "dataframe" stage per section.
+    """
+    dfs = {}
+    for sheet_name, buffer in sections.items():
+        if not len(buffer):
+            continue
+        if metrics is None:
+            dfs[sheet_name] = buffer.to_frame()
+            continue
+        with metrics.stage("dataframe", sheet_name) as counts:
+            dfs[sheet_name] = buffer.to_frame()
+            counts["output_rows"] = len(buffer)
+    return dfs
+
+
+# --- Item-Level Detail ---
+
+# Pivots over the invoice-rate rows of every section: sheet name -> grouping column
+PIVOT_SHEETS = {
+    "Rate-wise Summary": "Rate",
+    "POS-wise Summary": "Place of Supply",
+    "GSTIN-wise Summary": "Recipient GSTIN",
+}
+PIVOT_AMOUNTS = [column for column, _ in _ALL_TAX_TOTALS]
+
+
+def item_sheet_name(schema):
+    """Returns the sheet name of the invoice-rate rows of a section (e.g. B2B Items)"""
+    return f"{schema.label} Items"
+
+
+def build_item_sheets(sections, metrics=None):
+    """
+    Builds the invoice-rate sheets of SectionBuffers read with item_rates=True and the
+    PIVOT_SHEETS: totals by section and rate, place of supply or recipient GSTIN, with
+    the number of distinct documents in each group. Each section's items are grouped
+    once; the pivots are group-sums over the resulting rows of all sections.
+    """
+    sheets, parts = {}, []
+    offset = 0  # Documents are numbered across sections so they can be counted together
+    token = metrics.start("dataframe", "Item detail") if metrics is not None else None
+    for sheet_name, buffer in sections.items():
+        if buffer.item_rates is not None and len(buffer.item_index):
+            groups = buffer._item_groups()
+            frame = buffer._item_frame(groups)
+            sheets[item_sheet_name(buffer.schema)] = frame
+            rows, rates, amounts = groups
+            part = pd.DataFrame({"Section": sheet_name, "Document": rows + offset, "Rate": rates})
+            for column in ("Place of Supply", "Recipient GSTIN"):
+                part[column] = frame[column].astype(object) if column in frame else None
+            for column in PIVOT_AMOUNTS:
+                part[column] = amounts[column].to_numpy() if column in amounts else 0.0
+            parts.append(part)
+        offset += len(buffer)
+
+    if parts:
+        combined = pd.concat(parts, ignore_index=True)
+        combined["Section"] = pd.Categorical(combined["Section"], categories=[part["Section"].iat[0]
+                                                                            for part in parts])
+        for pivot_name, column in PIVOT_SHEETS.items():
+            grouped = combined.groupby(["Section", column], sort=True, observed=True,
+                                       dropna=column == "Recipient GSTIN")
+            pivot = grouped[PIVOT_AMOUNTS].sum()
+            pivot.insert(0, "Documents", grouped["Document"].nunique())
+            sheets[pivot_name] = pivot.reset_index()
+    if metrics is not None:
+        metrics.finish(token, output_rows=sum(len(sheet) for sheet in sheets.values()))
+    return sheets
+
+
+# --- Excel Writing ---
+
+# Excel's hard limits: rows per worksheet (including the header) and sheet name length
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_SHEET_NAME = 31
+
+# Workbooks with at least this many data rows are written in constant-memory mode
+STREAMING_ROW_THRESHOLD = 100000
+
+# Rows converted to Python values at a time by the streaming writer
+STREAMING_CHUNK_ROWS = 50000
+
+
+# Number formats of the "optimized" engine: amounts with two decimals, document counts as integers.
+# Other columns (quantities, rates) keep the General format
+AMOUNT_FORMAT = "#,##0.00"
+COUNT_FORMAT = "#,##0"
+NUMBER_FORMATS = {
+    **{column: AMOUNT_FORMAT for column in (
+        "Taxable Value", "Total IGST", "Total CGST", "Total SGST", "Total CESS", "Invoice Value",
+        "Note Value", "IGST", "CGST", "SGST", "CESS", "Total Value")},
+    **{column: COUNT_FORMAT for column in ("Total Issued", "Cancelled", "Net Issued", "Documents")},
+}
+
+
+def sheet_title(sheet_name, part):
+    """Returns a valid worksheet title for one part of a section"""
+    suffix = f" ({part})" if part > 1 else ""
+    return sheet_name[:EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix
+
 
-def convert_gstr1_json_to_excel_bytes(json_data):
+def split_sheets(dfs):
     """
-    Converts GSTR-1 JSON data (as string or dict) to an Excel file in memory.
-    Returns: BytesIO object containing the Excel file
+    Yields (worksheet title, DataFrame) pairs for the non-empty sections.
+    Sections over Excel's row limit are split into "B2B Invoices (2)", "B2B Invoices (3)", ...
     """
+    rows_per_sheet = EXCEL_MAX_ROWS - 1
+    for sheet_name, df in dfs.items():
+        if df.empty:
+            continue
+        for part, start in enumerate(range(0, len(df), rows_per_sheet), start=1):
+            yield sheet_title(sheet_name, part), df.iloc[start:start + rows_per_sheet]
+
+
+def _write_with_pandas(sheets, output, engine):
+    with pd.ExcelWriter(output, engine=engine) as writer:
+        for title, df in sheets:
+            df.to_excel(writer, sheet_name=title, index=False)
+
+
+def _write_with_openpyxl(sheets, output):
+    """Builds the whole workbook in memory with openpyxl"""
+    _write_with_pandas(sheets, output, "openpyxl")
+
+
+def _write_with_xlsxwriter(sheets, output):
+    """Builds the workbook with xlsxwriter through pandas"""
+    _write_with_pandas(sheets, output, "xlsxwriter")
+
+
+def _write_with_xlsxwriter_streaming(sheets, output):
+    """
+    Writes rows sequentially with xlsxwriter's constant-memory mode.
+    Each row is flushed to a temporary file as soon as the next one starts,
+    so memory use does not grow with the number of rows.
+    """
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    # Same look as the header pandas writes
+    header_format = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    for title, df in sheets:
+        worksheet = workbook.add_worksheet(title)
+        worksheet.write_row(0, 0, [str(column) for column in df.columns], header_format)
+        row_number = 1
+        for start in range(0, len(df), STREAMING_CHUNK_ROWS):
+            chunk = df.iloc[start:start + STREAMING_CHUNK_ROWS]
+            columns = [chunk[column].to_numpy(dtype=object, na_value=None) for column in chunk.columns]
+            for row in zip(*columns):
+                worksheet.write_row(row_number, 0, row)
+                row_number += 1
+    workbook.close()
+
+
+def _write_optimized(sheets, output, strings="auto", compression_level=None):
+    """
+    Writes the SpreadsheetML directly (see gstr1_xlsx.write_workbook): repetitive text
+    columns go to the shared strings table, unique ones stay inline, and amounts and
+    counts get explicit number formats.
+    """
+    from gstr1_xlsx import DEFAULT_COMPRESSION_LEVEL, write_workbook
+    if compression_level is None:
+        compression_level = DEFAULT_COMPRESSION_LEVEL
+    write_workbook(sheets, output, strings, NUMBER_FORMATS, compression_level)
+
+
+EXCEL_ENGINES = {
+    "xlsxwriter-streaming": _write_with_xlsxwriter_streaming,
+    "xlsxwriter": _write_with_xlsxwriter,
+    "openpyxl": _write_with_openpyxl,
+    "optimized": _write_optimized,
+}
+
+
+def select_excel_engine(row_count):
+    """Picks the Excel engine for a workbook of row_count data rows"""
+    if xlsxwriter is None:
+        return "openpyxl"
+    if row_count >= STREAMING_ROW_THRESHOLD:
+        return "xlsxwriter-streaming"
+    return "xlsxwriter"
+
+
+def write_excel(dfs, output=None, engine=None):
+    """
+    Writes a dictionary of DataFrames to an xlsx workbook, one sheet per section.
+    engine is one of EXCEL_ENGINES; by default it is chosen from the total row count.
+    Returns: the output file object (a new BytesIO if none is given), rewound
+    """
+    if engine is None:
+        engine = select_excel_engine(sum(len(df) for df in dfs.values()))
+    if engine not in EXCEL_ENGINES:
+        raise ValueError(f"Unknown Excel engine: {engine}")
+    if output is None:
+        output = BytesIO()
+    EXCEL_ENGINES[engine](split_sheets(dfs), output)
+    output.seek(0)
+    return output
+
+
+def write_optimized_excel(dfs, output=None, strings="auto", compression_level=None):
+    """
+    Writes a dictionary of DataFrames with the "optimized" engine and explicit options.
+    strings is "auto" (shared strings for repetitive columns, inline for the rest),
+    "shared" or "inline"; compression_level is the deflate level (0 to 9, 0 stores
+    the package uncompressed; by default gstr1_xlsx.DEFAULT_COMPRESSION_LEVEL).
+    Returns: the output file object (a new BytesIO if none is given), rewound
+    """
+    if output is None:
+        output = BytesIO()
+    _write_optimized(split_sheets(dfs), output, strings, compression_level)
+    output.seek(0)
+    return output
+
+
+# --- Columnar Output ---
+
+# Output formats: label, download file extension and MIME type.
+# Everything except xlsx is a dataset with one file per section, delivered as a zip archive
+# when written to a file object.
+OUTPUT_FORMATS = {
+    "xlsx": ("Excel workbook", ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("Parquet dataset", ".zip", "application/zip"),
+    "arrow": ("Arrow IPC files", ".zip", "application/zip"),
+    "csv.gz": ("Gzip CSV files", ".zip", "application/zip"),
+}
+
+# Parquet datasets are partitioned by these columns (as added by merge_returns), Hive style
+PARTITION_COLUMNS = ("GSTIN", "Return Period")
+HIVE_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def section_slug(sheet_name):
+    """Returns a file-system friendly name for a section, e.g. credit_debit_notes_reg"""
+    return re.sub(r"[^0-9a-z]+", "_", sheet_name.lower()).strip("_")
+
+
+def _partition_value(value):
+    if value is None or value != value:  # None or NaN
+        return HIVE_NULL_PARTITION
+    return re.sub(r"[\\/=]", "_", str(value))
+
+
+def _text_columns(df):
+    """
+    Returns df with the values of its object columns (and of categorical columns with
+    object categories) as text, so each gets one Arrow string type whatever mix of JSON
+    types the return holds, e.g. HSN codes given as "1001" and 1002. Missing values stay missing.
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == object:
+            columns[column] = series.map(str, na_action="ignore").astype(object)
+        elif isinstance(series.dtype, pd.CategoricalDtype) and series.cat.categories.dtype == object:
+            columns[column] = series.astype(object).map(str, na_action="ignore").astype("category")
+    return df.assign(**columns) if columns else df
+
+
+def _arrow_table(df):
+    # Categorical columns become dictionary-encoded Arrow columns
+    return pa.Table.from_pandas(_text_columns(df), preserve_index=False)
+
+
+def _parquet_bytes(df):
+    sink = BytesIO()
+    pq.write_table(_arrow_table(df), sink, compression="snappy")
+    return sink.getvalue()
+
+
+def _arrow_bytes(df):
+    table = _arrow_table(df)
+    sink = BytesIO()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _csv_gz_bytes(df):
+    sink = BytesIO()
+    df.to_csv(sink, index=False, compression={"method": "gzip", "mtime": 0})
+    return sink.getvalue()
+
+
+def _dataset_files(dfs, output_format, basename):
+    """Yields (relative path, file bytes) for every file of a dataset"""
+    for sheet_name, df in dfs.items():
+        if df.empty:
+            continue
+        slug = section_slug(sheet_name)
+        if output_format == "parquet":
+            partition_columns = [column for column in PARTITION_COLUMNS if column in df.columns]
+            if not partition_columns:
+                yield f"{slug}/{basename}.parquet", _parquet_bytes(df)
+                continue
+            groups = df.groupby(partition_columns, sort=False, observed=True, dropna=False)
+            for values, part in groups:
+                values = values if isinstance(values, tuple) else (values,)
+                directory = "/".join(f"{column}={_partition_value(value)}"
+                                     for column, value in zip(partition_columns, values))
+                part = part.drop(columns=partition_columns)
+                yield f"{slug}/{directory}/{basename}.parquet", _parquet_bytes(part)
+        elif output_format == "arrow":
+            yield f"{slug}/{basename}.arrow", _arrow_bytes(df)
+        elif output_format == "csv.gz":
+            yield f"{slug}/{basename}.csv.gz", _csv_gz_bytes(df)
+
+
+def write_dataset(dfs, output_format, destination=None, basename="part-0"):
+    """
+    Writes a dictionary of DataFrames as a columnar dataset, one dataset per section:
+    "parquet" (partitioned by GSTIN/Return Period when those columns are present),
+    "arrow" (Arrow IPC files) or "csv.gz".
+    destination is a directory path, or a binary file object that receives a zip
+    archive of the same layout (a new BytesIO if none is given).
+    Returns: the destination (rewound when it is a file object)
+    """
+    if output_format not in OUTPUT_FORMATS or output_format == "xlsx":
+        raise ValueError(f"Unknown dataset format: {output_format}")
+    if output_format in ("parquet", "arrow") and pa is None:
+        raise ImportError(f"{output_format} output requires the 'pyarrow' package")
+
+    if destination is None:
+        destination = BytesIO()
+    if isinstance(destination, (str, os.PathLike)):
+        for path, data in _dataset_files(dfs, output_format, basename):
+            path = os.path.join(destination, *path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        return destination
+
+    # The files are compressed already, so the archive only stores them
+    with zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_STORED) as archive:
+        for path, data in _dataset_files(dfs, output_format, basename):
+            archive.writestr(path, data)
+    destination.seek(0)
+    return destination
+
+
+# --- Lazy Sections ---
+
+def count_section_records(schema, section):
+    """Counts the rows a section will produce without extracting it"""
     try:
-        # Parse JSON if it's a string
-        if isinstance(json_data, str):
-            gstr1_data = json.loads(json_data)
+        if schema.container is not None:
+            section = section.get(schema.container, [])
+        if schema.records is not None:
+            return sum(len(element.get(schema.records, [])) for element in section)
+        return len(section)
+    except Exception:
+        return 0
+
+
+def _section_progress(progress, sheet_name, total, done):
+    progress(sheet_name, done, total)
+
+
+class LazySections(Mapping):
+    """
+    Read-only, dict-like view of a return's sections keyed by sheet name.
+    Only sections with rows are present; each DataFrame is extracted and
+    built on first access and kept for later lookups, or section by section
+    with progress reports through iter_frames().
+    metrics is an optional ConversionMetrics that records each extraction.
+    """
+
+    def __init__(self, gstr1_data, metrics=None):
+        self._data = gstr1_data
+        self._metrics = metrics
+        self._frames = {}
+        self._row_counts = {}
+        for schema in SECTION_SCHEMAS:
+            if schema.key in gstr1_data:
+                count = count_section_records(schema, gstr1_data[schema.key])
+                if count:
+                    self._row_counts[schema.sheet_name] = count
+
+    def __getitem__(self, sheet_name):
+        if sheet_name not in self._row_counts:
+            raise KeyError(sheet_name)
+        if sheet_name not in self._frames:
+            self._frames[sheet_name] = self._build_frame(sheet_name)
+        return self._frames[sheet_name]
+
+    def _build_frame(self, sheet_name, progress=None, chunk_records=PROGRESS_CHUNK_RECORDS):
+        schema = SCHEMAS_BY_SHEET[sheet_name]
+        buffer = SectionBuffer(schema)
+        buffer.metrics = self._metrics
+        section = self._data.get(schema.key)
+        if self._metrics is None:
+            buffer.extend_section(section, progress, chunk_records)
         else:
-            gstr1_data = json_data  # Assume it's already a dict
-
-        # Extract sections
-        sections = {
-            "B2B Invoices": extract_b2b_data(gstr1_data),
-            "B2C Large Invoices": extract_b2cl_data(gstr1_data),
-            "B2C Small Summary": extract_b2cs_data(gstr1_data),
-            "Exports": extract_export_data(gstr1_data),
-            "Credit Debit Notes (Reg)": extract_cdnr_data(gstr1_data),
-            "Credit Debit Notes (Unreg)": extract_cdunr_data(gstr1_data),
-            "HSN Summary": extract_hsn_data(gstr1_data),
-            "Document Issued Summary": extract_doc_issued_data(gstr1_data),
-            "Nil Rated Supplies": extract_nil_rated_data(gstr1_data),
-            "Amended B2B Invoices": extract_amended_b2b_data(gstr1_data),
-            "Amended B2C Large Invoices": extract_amended_b2cl_data(gstr1_data),
-            "Amended Exports": extract_amended_export_data(gstr1_data),
-            "Amended Credit Debit Notes (Reg)": extract_amended_cdnr_data(gstr1_data),
-            "Amended Credit Debit Notes (Unreg)": extract_amended_cdunr_data(gstr1_data),
-            "Amended HSN Summary": extract_amended_hsn_data(gstr1_data),
-            "Amended Document Issued Summary": extract_amended_doc_issued_data(gstr1_data),
-            "Amended Nil Rated Supplies": extract_amended_nil_rated_data(gstr1_data),
-        }
+            token = self._metrics.start("extract", sheet_name)
+            buffer.extend_section(section, progress, chunk_records)
+            _finish_extract(self._metrics, token, buffer, (0, 0))
+        return build_frames({sheet_name: buffer}, self._metrics).get(
+            sheet_name, pd.DataFrame(columns=schema_columns(schema)))
+
+    def iter_frames(self, progress=None, chunk_records=PROGRESS_CHUNK_RECORDS):
+        """
+        Yields (sheet name, DataFrame) for every present section in sheet order,
+        extracting the sections not loaded yet one at a time, so each can be used
+        as soon as it is ready. progress(sheet name, rows done, rows total) is
+        called about every chunk_records records while a section is extracted.
+        """
+        for sheet_name, total in self._row_counts.items():
+            if sheet_name not in self._frames:
+                report = None
+                if progress is not None:
+                    report = partial(_section_progress, progress, sheet_name, total)
+                self._frames[sheet_name] = self._build_frame(sheet_name, report, chunk_records)
+            yield sheet_name, self._frames[sheet_name]
+
+    def __contains__(self, sheet_name):
+        # Membership must not trigger extraction
+        return sheet_name in self._row_counts
+
+    def __iter__(self):
+        return iter(self._row_counts)
+
+    def __len__(self):
+        return len(self._row_counts)
+
+    def row_count(self, sheet_name):
+        """Returns the number of rows of a section without extracting it (0 when absent)"""
+        return self._row_counts.get(sheet_name, 0)
+
+    def row_counts(self):
+        """Returns {sheet name: row count} for the present sections without extracting them"""
+        return dict(self._row_counts)
+
+    def is_loaded(self, sheet_name):
+        """Tells whether a section's DataFrame has been built already"""
+        return sheet_name in self._frames
+
+
+# --- Main Conversion Logic ---
+
+# Errors the entry points raise as they are, rather than wrapped in RuntimeError:
+# malformed JSON (from any decoder or the streaming parser) and strict validation failures
+_PASSED_THROUGH_ERRORS = (json.JSONDecodeError, ValidationError)
+
+
+def convert_gstr1_json_to_excel_bytes(json_data, stream=None, engine=None, output=None, output_format="xlsx",
+                                      metrics=None, workers=None, item_level=False, validation=None):
+    """
+    Converts GSTR-1 JSON data (as string, bytes, dict, path or file object) to an Excel file in memory.
+    With stream=True (the default for paths and file objects when ijson is installed) the JSON is
+    parsed incrementally instead of being loaded whole; otherwise paths and binary files are
+    memory-mapped and decoded without copying (see load_json). Pass a path as pathlib.Path,
+    since plain strings are taken as JSON text.
+    engine selects the Excel writer (see EXCEL_ENGINES); by default it is picked by row count.
+    output is an optional binary file object to write the workbook to instead of memory.
+    output_format is one of OUTPUT_FORMATS; other formats than "xlsx" produce a zip archive
+    of per-section files tagged with the return's GSTIN and period (see write_dataset).
+    metrics is an optional ConversionMetrics (see gstr1_metrics) that records the parse,
+    extract, dataframe and write stages and any errors.
+    With workers > 1, an xlsx workbook is converted across that many processes instead
+    (see gstr1_parallel.convert_parallel); stream is then ignored, and of the engines
+    only "optimized" makes a difference (its number formats).
+    With item_level=True the workbook also gets the invoice-rate sheets of the sections
+    with items and the rate-, POS- and GSTIN-wise pivots (see build_item_sheets).
+    validation is None (extract defensively, dropping a section at its first bad record),
+    or one of VALIDATION_MODES: the return is validated up front (see validate_gstr1) and
+    extracted on the fast path; in "lenient" mode invalid records are left out and listed
+    on a Validation Errors sheet, while in "strict" mode an invalid return raises
+    ValidationError. Validation loads the whole document, so stream and workers are
+    then ignored. Malformed JSON raises json.JSONDecodeError; other failures RuntimeError.
+    Returns: BytesIO object containing the Excel file (or output, when given)
+    """
+    try:
+        if (workers is not None and workers > 1 and output_format == "xlsx" and not item_level
+                and validation is None):
+            from gstr1_parallel import convert_parallel
+            number_formats = NUMBER_FORMATS if engine == "optimized" else None
+            return convert_parallel(json_data, output=output, workers=workers, metrics=metrics,
+                                    number_formats=number_formats)
+
+        if output_format != "xlsx":
+            dfs = merge_returns([json_data], stream, metrics, validation)
+            if metrics is None:
+                return write_dataset(dfs, output_format, output)
+            with metrics.stage("write", output_format) as counts:
+                counts["output_rows"] = sum(len(df) for df in dfs.values())
+                return write_dataset(dfs, output_format, output)
+
+        issues = []
+        sections = _extract_all_sections(json_data, stream, new_section_buffers(item_level), metrics=metrics,
+                                         validation=validation, issues=issues)
 
         # Create DataFrames
-        dfs = {sheet_name: pd.DataFrame(data) for sheet_name, data in sections.items() if data}
+        dfs = build_frames(sections, metrics)
+        if item_level:
+            dfs.update(build_item_sheets(sections, metrics))
+        if issues:
+            dfs[VALIDATION_SHEET] = validation_frame(issues)
 
         # Write to BytesIO
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            for sheet_name, df in dfs.items():
-                if not df.empty:
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-        output.seek(0)
-        return output
+        if metrics is None:
+            return write_excel(dfs, output=output, engine=engine)
+        with metrics.stage("write", output_format) as counts:
+            counts["output_rows"] = sum(len(df) for df in dfs.values())
+            return write_excel(dfs, output=output, engine=engine)
 
     except Exception as e:
+        if metrics is not None:
+            metrics.error("convert", e)
+        if isinstance(e, _PASSED_THROUGH_ERRORS):
+            raise
         raise RuntimeError(f"Error during conversion: {e}")
 
 
-def get_all_sections_from_json(json_data):
+def get_all_sections_from_json(json_data, stream=None, lazy=False, metrics=None, item_level=False,
+                               validation=None):
     """
     Returns a dictionary of DataFrames for each section.
     Suitable for use in Streamlit apps where we work with in-memory data.
+    Accepts the same inputs, stream, metrics, item_level and validation options as
+    convert_gstr1_json_to_excel_bytes; lenient validation adds a Validation Errors frame.
+    With lazy=True the document is loaded (not streamed) and a LazySections view is
+    returned instead, which extracts each section only when it is first accessed
+    (item_level and validation do not apply).
     """
     try:
-        if isinstance(json_data, str):
-            gstr1_data = json.loads(json_data)
-        else:
-            gstr1_data = json_data  # Assume it's already a dict
-
-        sections = {
-            "B2B Invoices": extract_b2b_data(gstr1_data),
-            "B2C Large Invoices": extract_b2cl_data(gstr1_data),
-            "B2C Small Summary": extract_b2cs_data(gstr1_data),
-            "Exports": extract_export_data(gstr1_data),
-            "Credit Debit Notes (Reg)": extract_cdnr_data(gstr1_data),
-            "Credit Debit Notes (Unreg)": extract_cdunr_data(gstr1_data),
-            "HSN Summary": extract_hsn_data(gstr1_data),
-            "Document Issued Summary": extract_doc_issued_data(gstr1_data),
-            "Nil Rated Supplies": extract_nil_rated_data(gstr1_data),
-            "Amended B2B Invoices": extract_amended_b2b_data(gstr1_data),
-            "Amended B2C Large Invoices": extract_amended_b2cl_data(gstr1_data),
-            "Amended Exports": extract_amended_export_data(gstr1_data),
-            "Amended Credit Debit Notes (Reg)": extract_amended_cdnr_data(gstr1_data),
-            "Amended Credit Debit Notes (Unreg)": extract_amended_cdunr_data(gstr1_data),
-            "Amended HSN Summary": extract_amended_hsn_data(gstr1_data),
-            "Amended Document Issued Summary": extract_amended_doc_issued_data(gstr1_data),
-            "Amended Nil Rated Supplies": extract_amended_nil_rated_data(gstr1_data),
-        }
+        if lazy:
+            return LazySections(load_json_timed(json_data, metrics), metrics)
+        issues = []
+        sections = _extract_all_sections(json_data, stream, new_section_buffers(item_level), metrics=metrics,
+                                         validation=validation, issues=issues)
+        dfs = build_frames(sections, metrics)
+        if item_level:
+            dfs.update(build_item_sheets(sections, metrics))
+        if issues:
+            dfs[VALIDATION_SHEET] = validation_frame(issues)
+        return dfs
+
+    except Exception as e:
+        if metrics is not None:
+            metrics.error("sections", e)
+        if isinstance(e, _PASSED_THROUGH_ERRORS):
+            raise
+        raise RuntimeError(f"Error extracting sections: {e}")
+
+
+# --- Consolidated Returns ---
+
+# Columns added in front of every section when several returns are merged
+RETURN_TAG_COLUMNS = ("GSTIN", "Return Period")
+
+
+def merge_returns(json_sources, stream=None, metrics=None, validation=None):
+    """
+    Extracts many GSTR-1 returns (any input accepted by get_all_sections_from_json)
+    into one DataFrame per section, each row tagged with its return's GSTIN ("gstin")
+    and return period ("fp"). All returns append into the same column buffers and
+    each DataFrame is built once at the end, instead of concatenating per-return frames.
+    metrics is an optional ConversionMetrics recording the stages of every return.
+    validation is an optional validation mode (see convert_gstr1_json_to_excel_bytes).
+    """
+    try:
+        buffers = new_section_buffers()
+        # Per section, the (gstin, fp, row count) run of each return
+        runs = {sheet_name: [] for sheet_name in buffers}
+        runs[VALIDATION_SHEET] = []
+        issues = []
+        for json_data in json_sources:
+            before = {sheet_name: len(buffer) for sheet_name, buffer in buffers.items()}
+            before_issues = len(issues)
+            header = {}
+            _extract_all_sections(json_data, stream, buffers, header, metrics, validation, issues)
+            for sheet_name, buffer in buffers.items():
+                count = len(buffer) - before[sheet_name]
+                if count:
+                    runs[sheet_name].append((header.get("gstin"), header.get("fp"), count))
+            if len(issues) > before_issues:
+                runs[VALIDATION_SHEET].append((header.get("gstin"), header.get("fp"), len(issues) - before_issues))
 
-        dfs = {sheet_name: pd.DataFrame(data) for sheet_name, data in sections.items() if data}
+        dfs = build_frames(buffers, metrics)
+        if issues:
+            dfs[VALIDATION_SHEET] = validation_frame(issues)
+        for sheet_name, df in dfs.items():
+            gstins, periods, counts = zip(*runs[sheet_name])
+            for position, (column, tags) in enumerate(zip(RETURN_TAG_COLUMNS, (gstins, periods))):
+                df.insert(position, column, pd.Categorical(_as_object(list(tags))).repeat(counts))
         return dfs
 
     except Exception as e:
-        raise RuntimeError(f"Error extracting sections: {e}")
\ No newline at end of file
+        if metrics is not None:
+            metrics.error("merge", e)
+        if isinstance(e, _PASSED_THROUGH_ERRORS):
+            raise
+        raise RuntimeError(f"Error merging returns: {e}")
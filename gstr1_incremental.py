@@ -0,0 +1,298 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from collections import Counter, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from gstr1_converter import (EXCEL_ENGINES, SECTION_SCHEMAS, SectionBuffer, load_json, orjson, recategorize,
+                             schema_columns, write_excel)
+
+# Sheet listing the invoices and notes that changed since the previous version
+CHANGES_SHEET = "Changes"
+CHANGE_COLUMNS = ["Section", "Recipient GSTIN", "Document Number", "Change", "Previous Value", "New Value"]
+
+# Source keys that identify a record within its block (invoice and note numbers)
+RECORD_ID_KEYS = ("inum", "nt_num")
+
+# How blocks and records are fingerprinted; indexes built one way cannot be updated the other
+FINGERPRINT_METHOD = "orjson" if orjson is not None else "json"
+
+# One block of a section in an index: a grouping object (a b2b[] supplier, a doc_det[] entry)
+# or, for flat sections, the whole section. Its rows are contiguous from start in the frame.
+SectionBlock = namedtuple("SectionBlock", ["digest", "start", "record_ids", "record_digests"])
+
+
+# --- Fingerprints ---
+
+def _fingerprint(value):
+    """Returns a 128-bit digest of a JSON value that does not depend on key order"""
+    if orjson is not None:
+        data = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    else:
+        data = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _record_id_key(schema):
+    for _, key, _ in schema.fields:
+        if key in RECORD_ID_KEYS:
+            return key
+    return None
+
+
+def _section_blocks(schema, section):
+    """Returns (block key, block value, records) per grouping object, or one block for flat sections"""
+    if schema.container is not None and section is not None:
+        section = section.get(schema.container, [])
+    section = section or []
+    if schema.records is None:
+        return [(None, section, list(section))]
+    return [(tuple(element.get(key, default) for _, key, default in schema.parent_fields),
+             element, list(element.get(schema.records) or []))
+            for element in section]
+
+
+# --- Index ---
+
+class ConversionIndex:
+    """
+    A converted return together with the fingerprints of its blocks and records,
+    so a later version of the same return can be converted incrementally.
+    frames holds the section DataFrames keyed by sheet name (non-empty sections only)
+    and blocks the {block id: SectionBlock} of every section.
+    """
+
+    def __init__(self, gstin=None, period=None, frames=None, blocks=None, fingerprint=FINGERPRINT_METHOD):
+        self.gstin = gstin
+        self.period = period
+        self.frames = frames or {}
+        self.blocks = blocks or {}
+        self.fingerprint = fingerprint
+        self.last_update = None  # {"reused_rows": ..., "extracted_rows": ..., "seconds": ...}
+
+    def save(self, path):
+        """Writes the index to path atomically"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        if not isinstance(index, cls):
+            raise ValueError(f"{path} is not a GSTR-1 conversion index")
+        return index
+
+
+def _combine_frames(old_frame, fresh_frame, positions):
+    """
+    Assembles a section frame from reused rows of old_frame (positions >= 0) and
+    freshly extracted rows (position -1 - n is row n of fresh_frame).
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if old_frame is None or not len(old_frame):
+        return fresh_frame.take(-1 - positions).reset_index(drop=True)
+    if not len(fresh_frame):
+        frame = old_frame.take(positions).reset_index(drop=True)
+    else:
+        combined = pd.concat([old_frame, fresh_frame], ignore_index=True)
+        frame = combined.take(np.where(positions >= 0, positions, len(old_frame) - 1 - positions))
+        frame = frame.reset_index(drop=True)
+    return recategorize(frame)
+
+
+def _update_section(schema, section, old_frame, old_blocks, changes):
+    """
+    Converts one section of the new return, reusing the rows of unchanged blocks and records.
+    Appends a CHANGE_COLUMNS row to changes per added, removed or modified document.
+    Returns (frame, blocks, reused rows, extracted rows).
+    """
+    id_key = _record_id_key(schema)
+    # (kind, block key, document number, old row, fresh row) per changed record
+    events = []
+    buffer = SectionBuffer(schema)
+    old_blocks = dict(old_blocks)
+    blocks = {}
+    positions = []
+    fresh = 0
+    block_counts = Counter()
+
+    for key, value, records in _section_blocks(schema, section):
+        block_id = (key, block_counts[key])
+        block_counts[key] += 1
+        digest = _fingerprint(value)
+        old = old_blocks.pop(block_id, None)
+        start = len(positions)
+        if old is not None and old.digest == digest:
+            positions.extend(range(old.start, old.start + len(old.record_ids)))
+            blocks[block_id] = old._replace(start=start)
+            continue
+
+        # Changed block: compare its records one by one
+        old_records = {}
+        if old is not None:
+            old_records = {record_id: (record_digest, old.start + offset) for offset, (record_id, record_digest)
+                           in enumerate(zip(old.record_ids, old.record_digests))}
+        record_ids, record_digests, changed = [], [], []
+        record_counts = Counter()
+        for position, record in enumerate(records):
+            number = record.get(id_key) if id_key is not None else position
+            record_id = (number, record_counts[number])
+            record_counts[number] += 1
+            record_digest = _fingerprint(record)
+            record_ids.append(record_id)
+            record_digests.append(record_digest)
+            previous = old_records.pop(record_id, None)
+            if previous is not None and previous[0] == record_digest:
+                positions.append(previous[1])
+                continue
+            positions.append(-1 - fresh - len(changed))
+            events.append(("Added" if previous is None else "Modified", key, number,
+                           None if previous is None else previous[1], fresh + len(changed)))
+            changed.append(record)
+        for (number, _), (_, row) in old_records.items():
+            events.append(("Removed", key, number, row, None))
+        if changed:
+            buffer.extend([dict(value, **{schema.records: changed})] if schema.records is not None else changed)
+            fresh += len(changed)
+        blocks[block_id] = SectionBlock(digest, start, tuple(record_ids), tuple(record_digests))
+
+    for (key, _), old in old_blocks.items():
+        for offset, (number, _) in enumerate(old.record_ids):
+            events.append(("Removed", key, number, old.start + offset, None))
+
+    if buffer.failed or len(buffer) != fresh:
+        raise ValueError(f"Could not extract the changed {schema.label} records")
+    fresh_frame = buffer.to_frame()
+    if id_key is not None:
+        changes.extend(_change_rows(schema, events, old_frame, fresh_frame))
+    return _combine_frames(old_frame, fresh_frame, positions), blocks, len(positions) - fresh, fresh
+
+
+def _change_rows(schema, events, old_frame, fresh_frame):
+    """Turns change events into CHANGE_COLUMNS rows with the document's old and new value"""
+    value_column = schema.value[0] if schema.value is not None else None
+    has_gstin = bool(schema.parent_fields) and schema.parent_fields[0][0] == "Recipient GSTIN"
+    rows = []
+    for kind, key, number, old_row, fresh_row in events:
+        previous = new = None
+        if value_column is not None:
+            if old_row is not None:
+                previous = float(old_frame[value_column].iat[old_row])
+            if fresh_row is not None:
+                new = float(fresh_frame[value_column].iat[fresh_row])
+        rows.append([schema.sheet_name, key[0] if has_gstin else None, number, kind, previous, new])
+    return rows
+
+
+def update_index(index, json_data):
+    """
+    Converts a new version of the return in index, re-extracting only the blocks
+    (e.g. b2b[] suppliers) and records (invoices, notes) whose fingerprints changed.
+    Sections that cannot be compared (malformed data) are extracted in full.
+    Returns: (new ConversionIndex, DataFrame of added, removed and modified documents)
+    """
+    start = time.perf_counter()
+    gstr1_data = load_json(json_data)
+    gstin, period = gstr1_data.get("gstin"), gstr1_data.get("fp")
+    if index.frames and (gstin, period) != (index.gstin, index.period):
+        raise ValueError(f"The index is for GSTIN {index.gstin}, period {index.period}; "
+                         f"the new return is for GSTIN {gstin}, period {period}")
+    if index.fingerprint != FINGERPRINT_METHOD:
+        raise ValueError(f"The index was fingerprinted with {index.fingerprint}, "
+                         f"this installation uses {FINGERPRINT_METHOD}; rebuild it")
+
+    frames, blocks, change_rows = {}, {}, []
+    reused = extracted = 0
+    for schema in SECTION_SCHEMAS:
+        sheet_name = schema.sheet_name
+        changes = []
+        old_frame, old_blocks = index.frames.get(sheet_name), index.blocks.get(sheet_name, {})
+        if old_frame is not None and list(old_frame.columns) != schema_columns(schema):
+            old_frame, old_blocks = None, {}  # Indexed with another layout; its rows cannot be reused
+        try:
+            frame, blocks[sheet_name], section_reused, section_extracted = _update_section(
+                schema, gstr1_data.get(schema.key), old_frame, old_blocks, changes)
+        except Exception:
+            # Extract the section the regular way; it is compared in full next time
+            buffer = SectionBuffer(schema)
+            buffer.extend_section(gstr1_data.get(schema.key))
+            frame, blocks[sheet_name], changes = buffer.to_frame(), {}, []
+            section_reused, section_extracted = 0, len(buffer)
+        reused += section_reused
+        extracted += section_extracted
+        if len(frame):
+            frames[sheet_name] = frame
+        change_rows.extend(changes)
+
+    new_index = ConversionIndex(gstin, period, frames, blocks)
+    new_index.last_update = {"reused_rows": reused, "extracted_rows": extracted,
+                             "seconds": round(time.perf_counter() - start, 3)}
+    return new_index, pd.DataFrame(change_rows, columns=CHANGE_COLUMNS)
+
+
+def build_index(json_data):
+    """Converts a return in full and fingerprints it for later incremental updates"""
+    return update_index(ConversionIndex(), json_data)[0]
+
+
+# --- Conversion ---
+
+def convert_incremental(json_data, previous=None, output=None, engine=None):
+    """
+    Converts a GSTR-1 return to Excel, reusing a previous conversion of the same
+    GSTIN and period (a ConversionIndex, or the path of a saved one) when given.
+    The workbook then gets an extra "Changes" sheet of added, removed and modified
+    invoices and notes.
+    Returns: (workbook BytesIO or output, new ConversionIndex, changes DataFrame)
+    """
+    if isinstance(previous, str):
+        previous = ConversionIndex.load(previous)
+    index, changes = update_index(previous or ConversionIndex(), json_data)
+    dfs = dict(index.frames)
+    if previous is not None:
+        dfs[CHANGES_SHEET] = changes
+    return write_excel(dfs, output=output, engine=engine), index, changes
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert a GSTR-1 JSON file, re-extracting only what changed since the last conversion.")
+    parser.add_argument("input", help="GSTR-1 JSON file")
+    parser.add_argument("-o", "--output", default=None, help="Excel output path (default: INPUT with .xlsx)")
+    parser.add_argument("--index", default=None,
+                        help="Index of the previous conversion; created or updated (default: INPUT with .gstr1idx)")
+    parser.add_argument("--engine", choices=sorted(EXCEL_ENGINES), default=None)
+    args = parser.parse_args(argv)
+
+    stem = os.path.splitext(args.input)[0]
+    index_path = args.index or stem + ".gstr1idx"
+    output_path = args.output or stem + ".xlsx"
+    previous = ConversionIndex.load(index_path) if os.path.exists(index_path) else None
+
+    with open(args.input, "rb") as source, open(output_path, "wb") as output:
+        _, index, changes = convert_incremental(source, previous, output, args.engine)
+    index.save(index_path)
+
+    stats = index.last_update
+    print(f"Extracted {stats['extracted_rows']:,} rows, reused {stats['reused_rows']:,} "
+          f"in {stats['seconds']:.2f}s; {len(changes):,} changed documents")
+    if previous is not None:
+        for kind, count in changes["Change"].value_counts().items():
+            print(f"  {kind}: {count:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import json
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class ConversionMetrics:
+    """
+    Collects structured events from the conversion pipeline.
+
+    Stage events record wall time, peak allocation (with trace_memory=True) and
+    counts such as input items and output rows, labelled by stage ("parse",
+    "extract", "dataframe", "write", ...) and section. Error events record
+    sections that failed to extract. Each event is also passed to callback.
+    One object can be reused across conversions; the Prometheus export sums
+    the events per stage and section as they are recorded. A long-lived object
+    (e.g. a server's) can keep only its last max_events events; the Prometheus
+    totals still cover every event.
+    """
+
+    def __init__(self, trace_memory=False, callback=None, max_events=None):
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.events = [] if max_events is None else deque(maxlen=max_events)
+        self._totals = OrderedDict()
+        self._error_counts = OrderedDict()
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    # --- Recording ---
+
+    def start(self, stage, section=None):
+        """Starts timing a stage; returns a token for finish()"""
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        else:
+            baseline = None
+        return (stage, section, time.perf_counter(), baseline)
+
+    def finish(self, token, **counts):
+        """Finishes a stage started with start(), recording counts such as output_rows"""
+        stage, section, started, baseline = token
+        seconds = time.perf_counter() - started
+        if baseline is not None and tracemalloc.is_tracing():
+            counts = {"peak_bytes": max(0, tracemalloc.get_traced_memory()[1] - baseline), **counts}
+        return self.record(stage, seconds, section, **counts)
+
+    def record(self, stage, seconds, section=None, **counts):
+        """Records a stage timed elsewhere (e.g. before this object existed) as a stage event"""
+        event = {"type": "stage", "stage": stage, "section": section, "seconds": seconds}
+        event.update(counts)
+        self._emit(event)
+        return event
+
+    def merge(self, events):
+        """Records events collected by another ConversionMetrics, e.g. in a worker process"""
+        for event in events:
+            self._emit(dict(event))
+
+    @contextmanager
+    def stage(self, stage, section=None):
+        """
+        Times the enclosed block as one stage.
+        Yields a dict; counts put into it are recorded with the event.
+        """
+        token = self.start(stage, section)
+        counts = {}
+        try:
+            yield counts
+        finally:
+            self.finish(token, **counts)
+
+    def error(self, stage, error, section=None):
+        """Records an error event"""
+        self._emit({"type": "error", "stage": stage, "section": section, "error": str(error)})
+
+    def close(self):
+        """Stops memory tracing if this object started it"""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+
+    def _emit(self, event):
+        with self._lock:
+            self.events.append(event)
+            self._aggregate(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    # --- Queries ---
+
+    def snapshot(self):
+        """Returns a copy of the events, safe to iterate while other threads record"""
+        with self._lock:
+            return list(self.events)
+
+    def stages(self):
+        """Returns the stage events"""
+        return [event for event in self.snapshot() if event["type"] == "stage"]
+
+    def errors(self):
+        """Returns the error events"""
+        return [event for event in self.snapshot() if event["type"] == "error"]
+
+    def total_seconds(self):
+        """Returns the summed wall time of all stages"""
+        return sum(event["seconds"] for event in self.stages())
+
+    # --- Export ---
+
+    def to_dict(self):
+        events = self.snapshot()
+        total_seconds = sum(event["seconds"] for event in events if event["type"] == "stage")
+        return {"total_seconds": total_seconds, "events": events}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def _aggregate(self, event):
+        # Running per (stage, section) sums for to_prometheus, so scrapes do not rescan the events
+        key = (event["stage"], event["section"])
+        if event["type"] == "error":
+            self._error_counts[key] = self._error_counts.get(key, 0) + 1
+            return
+        total = self._totals.setdefault(key, {})
+        for name, value in event.items():
+            if name in ("type", "stage", "section") or not isinstance(value, (int, float)):
+                continue
+            if name == "peak_bytes":
+                total[name] = max(total.get(name, 0), value)
+            else:
+                total[name] = total.get(name, 0) + value
+        total["runs"] = total.get("runs", 0) + 1
+
+    def to_prometheus(self, prefix="gstr1"):
+        """Renders the event totals in the Prometheus text exposition format"""
+        with self._lock:
+            totals = [(key, dict(total)) for key, total in self._totals.items()]
+            errors = list(self._error_counts.items())
+
+        metrics = OrderedDict()
+        for key, total in totals:
+            for name, value in total.items():
+                if name == "peak_bytes":
+                    metric = (f"{prefix}_stage_peak_bytes", "gauge", "Largest peak allocation of a stage run")
+                elif name == "seconds":
+                    metric = (f"{prefix}_stage_seconds_total", "counter", "Wall time spent in a stage")
+                elif name == "runs":
+                    metric = (f"{prefix}_stage_runs_total", "counter", "Number of stage runs")
+                else:
+                    metric = (f"{prefix}_{name}_total", "counter", f"Sum of {name.replace('_', ' ')}")
+                metrics.setdefault(metric, []).append((key, value))
+        for key, count in errors:
+            metric = (f"{prefix}_errors_total", "counter", "Conversion errors")
+            metrics.setdefault(metric, []).append((key, count))
+
+        lines = []
+        for (name, kind, help_text), samples in metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (stage, section), value in samples:
+                labels = f'stage="{_escape_label(stage)}"'
+                if section is not None:
+                    labels += f',section="{_escape_label(section)}"'
+                lines.append(f"{name}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# --- Metrics Endpoint ---
+
+def serve_metrics(metrics, host="127.0.0.1", port=9108):
+    """
+    Serves metrics.to_prometheus() at http://host:port/metrics from a daemon thread.
+    metrics is a ConversionMetrics or a callable returning one.
+    Returns: the running server (call shutdown() to stop it)
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            source = metrics() if callable(metrics) else metrics
+            body = source.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep scrapes out of the server log
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
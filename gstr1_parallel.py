@@ -0,0 +1,286 @@
+import argparse
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from gstr1_converter import (EXCEL_MAX_ROWS, SECTION_SCHEMAS, SCHEMAS_BY_KEY, SectionBuffer, load_json_timed,
+                             recategorize, schema_columns, sheet_title)
+from gstr1_metrics import ConversionMetrics
+from gstr1_xlsx import (DEFAULT_COMPRESSION_LEVEL, SHEET_END, SHEET_START, column_cells, column_styles,
+                        finish_package, header_row, open_package, rows_xml)
+
+# Target number of records per shard; large sections are split into at least one shard per worker
+DEFAULT_SHARD_RECORDS = int(os.environ.get("GSTR1_SHARD_RECORDS", "50000"))
+
+# Rows joined into one string before being written to a sheet fragment
+FRAGMENT_CHUNK_ROWS = 10000
+
+# The parsed return, inherited by forked workers so shards are not pickled to them
+_DOCUMENT = None
+
+# One unit of work: elements[start:stop] of a section (after its container), or the
+# whole section when start is None. rows is the number of rows it produces and offset
+# the section row of its first one.
+Shard = namedtuple("Shard", ["key", "number", "start", "stop", "rows", "offset"])
+
+# What a worker sends back for a shard: its frame (extract only) or its sheet
+# fragments as [(sheet part, path)], and the extraction errors
+ShardResult = namedtuple("ShardResult", ["shard", "rows", "frame", "fragments", "errors"])
+
+
+# --- Sharding ---
+
+def _section_elements(schema, section):
+    if schema.container is not None and section is not None:
+        section = section.get(schema.container, [])
+    return section or []
+
+
+def plan_shards(gstr1_data, workers, shard_records=DEFAULT_SHARD_RECORDS):
+    """
+    Splits every section of the return into shards of consecutive elements: whole supplier
+    blocks (b2b[], cdnr[], ...) for nested sections, records for flat ones. Sections
+    of over shard_records records are split into at least one shard per worker.
+    Sections whose structure cannot be counted form a single shard.
+    Returns: list of Shards in section order
+    """
+    shards = []
+    for schema in SECTION_SCHEMAS:
+        if schema.key not in gstr1_data:
+            continue
+        try:
+            elements = _section_elements(schema, gstr1_data[schema.key])
+            if schema.records is not None:
+                sizes = [len(element.get(schema.records, [])) for element in elements]
+            else:
+                sizes = [1] * len(elements)
+        except Exception:
+            shards.append(Shard(schema.key, len(shards), None, None, None, 0))
+            continue
+        total = sum(sizes)
+        target = max(1, min(shard_records, math.ceil(total / workers)) if total > shard_records else total)
+        start = offset = rows = 0
+        for position, size in enumerate(sizes):
+            rows += size
+            if rows >= target:
+                shards.append(Shard(schema.key, len(shards), start, position + 1, rows, offset))
+                start, offset, rows = position + 1, offset + rows, 0
+        if rows or not shards or shards[-1].key != schema.key:
+            shards.append(Shard(schema.key, len(shards), start, len(sizes), rows, offset))
+    return shards
+
+
+# --- Sheet XML ---
+
+def write_sheet_fragments(frame, offset, directory, name, number_formats=None):
+    """
+    Serializes the rows of a section frame whose first row is section row offset
+    into <row> elements, one file per sheet part (see split_sheets).
+    number_formats maps columns to number format codes (see gstr1_xlsx.styles_xml).
+    Returns: [(sheet part, fragment path)]
+    """
+    rows_per_sheet = EXCEL_MAX_ROWS - 1
+    styles = column_styles(frame.columns, number_formats)
+    columns = [column_cells(frame[column], style=style) for column, style in zip(frame.columns, styles)]
+    fragments = []
+    position = 0
+    while position < len(frame):
+        part, first = divmod(offset + position, rows_per_sheet)
+        count = min(len(frame) - position, rows_per_sheet - first)
+        path = os.path.join(directory, f"{name}-{part + 1}.xml")
+        with open(path, "w", encoding="utf-8") as fragment:
+            for chunk_start in range(position, position + count, FRAGMENT_CHUNK_ROWS):
+                chunk_stop = min(chunk_start + FRAGMENT_CHUNK_ROWS, position + count)
+                fragment.write(rows_xml([cells[chunk_start:chunk_stop] for cells in columns],
+                                        first + chunk_start - position + 2))
+        fragments.append((part + 1, path))
+        position += count
+    return fragments
+
+
+# --- Workers ---
+
+def _process_shard(shard, elements, directory, number_formats=None):
+    """
+    Extracts one shard in a worker. elements is None when the return was inherited
+    through fork. With a directory, the rows are written there as sheet fragments;
+    otherwise the shard's DataFrame is sent back.
+    """
+    schema = SCHEMAS_BY_KEY[shard.key]
+    buffer = SectionBuffer(schema)
+    buffer.metrics = ConversionMetrics()
+    if shard.start is None:
+        buffer.extend_section(_DOCUMENT.get(shard.key) if elements is None else elements)
+    else:
+        if elements is None:
+            elements = _section_elements(schema, _DOCUMENT.get(shard.key))[shard.start:shard.stop]
+        buffer.extend(elements)
+    errors = [event["error"] for event in buffer.metrics.errors()]
+    if not errors and shard.rows is not None and len(buffer) != shard.rows:
+        errors.append(f"expected {shard.rows} rows, extracted {len(buffer)}")
+        print(f"Error extracting {schema.label} data: {errors[-1]}")
+    frame = fragments = None
+    if not errors and len(buffer):
+        frame = buffer.to_frame()
+        if directory is not None:
+            fragments = write_sheet_fragments(frame, shard.offset, directory, f"shard{shard.number}",
+                                              number_formats)
+            frame = None
+    return ShardResult(shard, len(buffer), frame, fragments, errors)
+
+
+def _fork_context():
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def _run_shards(gstr1_data, workers, shard_records, directory, metrics, number_formats=None):
+    """Runs every shard over a process pool; returns {section key: [ShardResult]} of the sections that succeeded"""
+    global _DOCUMENT
+    workers = workers or os.cpu_count() or 1
+    shards = plan_shards(gstr1_data, workers, shard_records)
+    context = _fork_context()
+    results = {}
+    token = metrics.start("extract") if metrics is not None else None
+    _DOCUMENT = gstr1_data if context is not None else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = []
+            for shard in shards:
+                elements = None
+                if context is None:  # Without fork the shard's data goes to the worker
+                    section = gstr1_data.get(shard.key)
+                    if shard.start is None:
+                        elements = section
+                    else:
+                        elements = _section_elements(SCHEMAS_BY_KEY[shard.key], section)[shard.start:shard.stop]
+                futures.append(pool.submit(_process_shard, shard, elements, directory, number_formats))
+            for future in futures:
+                result = future.result()
+                results.setdefault(result.shard.key, []).append(result)
+    finally:
+        _DOCUMENT = None
+
+    if metrics is not None:
+        metrics.finish(token, shards=len(shards),
+                       output_rows=sum(result.rows for section in results.values() for result in section))
+    succeeded = {}
+    for key, section_results in results.items():
+        schema = SCHEMAS_BY_KEY[key]
+        errors = [error for result in section_results for error in result.errors]
+        if metrics is not None:
+            for error in errors:
+                metrics.error("extract", error, section=schema.sheet_name)
+        if errors:  # A broken section is dropped as a whole, as in a serial conversion
+            continue
+        succeeded[key] = section_results
+    return succeeded
+
+
+def _concat_frames(frames):
+    """Joins shard frames; category columns are re-categorized over the whole section"""
+    if len(frames) == 1:
+        return frames[0]
+    import pandas as pd
+
+    return recategorize(pd.concat(frames, ignore_index=True))
+
+
+def extract_frames_parallel(json_data, workers=None, shard_records=DEFAULT_SHARD_RECORDS, metrics=None):
+    """
+    Extracts the sections of one return concurrently over worker processes,
+    large sections in shards of whole supplier blocks.
+    Returns the same {sheet name: DataFrame} of non-empty sections as build_frames.
+    """
+    gstr1_data = load_json_timed(json_data, metrics)
+    results = _run_shards(gstr1_data, workers, shard_records, None, metrics)
+    dfs = {}
+    for schema in SECTION_SCHEMAS:
+        frames = [result.frame for result in results.get(schema.key, []) if result.frame is not None]
+        if frames:
+            dfs[schema.sheet_name] = _concat_frames(frames)
+    return dfs
+
+
+# --- Workbook Assembly ---
+
+def _assemble_workbook(results, output, number_formats=None, compression_level=DEFAULT_COMPRESSION_LEVEL):
+    """Streams the sheet fragments of every section, in section order, into an xlsx package"""
+    titles = []
+    with open_package(output, compression_level) as package:
+        for schema in SECTION_SCHEMAS:
+            parts = {}
+            for result in results.get(schema.key, []):
+                for part, path in result.fragments or ():
+                    parts.setdefault(part, []).append(path)
+            header = header_row(schema_columns(schema)).encode("utf-8")
+            for part in sorted(parts):
+                titles.append(sheet_title(schema.sheet_name, part))
+                with package.open(f"xl/worksheets/sheet{len(titles)}.xml", "w", force_zip64=True) as sheet:
+                    sheet.write(SHEET_START.encode("utf-8") + header)
+                    for path in parts[part]:
+                        with open(path, "rb") as fragment:
+                            shutil.copyfileobj(fragment, sheet)
+                    sheet.write(SHEET_END.encode("utf-8"))
+        finish_package(package, titles, number_formats)
+
+
+def convert_parallel(json_data, output=None, workers=None, shard_records=DEFAULT_SHARD_RECORDS, metrics=None,
+                     number_formats=None, compression_level=DEFAULT_COMPRESSION_LEVEL):
+    """
+    Converts one return to an xlsx workbook using every core: the sections are extracted
+    in shards across worker processes (which inherit the parsed return through fork
+    where available), each worker serializes its rows straight to worksheet XML with
+    inline strings, and the fragments are stitched into the workbook in section order.
+    number_formats maps columns to Excel number format codes; compression_level is the
+    deflate level of the package (0 stores it uncompressed).
+    Returns: BytesIO object containing the Excel file (or output, when given), rewound
+    """
+    gstr1_data = load_json_timed(json_data, metrics)
+    if output is None:
+        output = BytesIO()
+    with tempfile.TemporaryDirectory(prefix="gstr1-sheets-") as directory:
+        results = _run_shards(gstr1_data, workers, shard_records, directory, metrics, number_formats)
+        if metrics is None:
+            _assemble_workbook(results, output, number_formats, compression_level)
+        else:
+            with metrics.stage("write", "xlsx") as counts:
+                counts["output_rows"] = sum(result.rows for section in results.values() for result in section)
+                _assemble_workbook(results, output, number_formats, compression_level)
+    output.seek(0)
+    return output
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert one large GSTR-1 JSON file to Excel using all cores.")
+    parser.add_argument("input", help="GSTR-1 JSON file")
+    parser.add_argument("-o", "--output", default=None, help="Excel output path (default: INPUT with .xlsx)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--shard-records", type=int, default=DEFAULT_SHARD_RECORDS,
+                        help="Target records per shard (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    output_path = args.output or os.path.splitext(args.input)[0] + ".xlsx"
+    metrics = ConversionMetrics()
+    with open(output_path, "wb") as output:
+        convert_parallel(Path(args.input), output, args.workers, args.shard_records, metrics)
+    for event in metrics.stages():
+        section = f" {event['section']}" if event["section"] else ""
+        print(f"{event['stage']}{section}: {event['seconds']:.2f}s")
+    print(f"Wrote {output_path} in {metrics.total_seconds():.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import argparse
+import importlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+
+from gstr1_converter import (EXCEL_ENGINES, OUTPUT_FORMATS, convert_gstr1_json_to_excel_bytes, write_dataset,
+                             write_excel)
+from gstr1_metrics import ConversionMetrics, serve_metrics
+
+# Defaults, overridable through the environment of the Streamlit server
+DEFAULT_POOL_WORKERS = int(os.environ.get("GSTR1_POOL_WORKERS", "2"))
+DEFAULT_METRICS_PORT = int(os.environ.get("GSTR1_METRICS_PORT", "0"))  # 0: no metrics endpoint
+
+# Modules every worker imports before its first job; gstr1_converter itself loads them lazily
+WARM_MODULES = ("pandas", "openpyxl", "xlsxwriter", "pyarrow", "pyarrow.parquet", "gstr1_xlsx")
+
+# A one-invoice return each worker converts to every output format once, so the
+# first real job finds every writer imported and its code paths already run
+WARM_RETURN = (
+    b'{"gstin": "27AAAAA0000A1Z5", "fp": "042024", "b2b": [{"ctin": "29BBBBB0000B1Z5", "inv": [{'
+    b'"inum": "WARM-1", "idt": "01-04-2024", "pos": "29", "rchrg": "N", "val": 118.0, '
+    b'"itms": [{"num": 1, "itm_det": {"rt": 18, "txval": 100.0, "iamt": 18.0}}]}]}]}'
+)
+
+# Stages logged to the server log as they are recorded (requests after the first are not)
+LOGGED_STAGES = ("startup", "pool_warmup", "first_request")
+
+# Events the pool's metrics keep for inspection; the Prometheus totals cover every event
+METRICS_MAX_EVENTS = 1000
+
+# Seconds the worker spent in warm_worker, reported back by _worker_ready
+_WARM_SECONDS = None
+
+
+# --- Worker Process ---
+
+def warm_worker():
+    """Pool initializer: imports the writers and converts WARM_RETURN to every format once"""
+    global _WARM_SECONDS
+    started = time.perf_counter()
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:  # Optional writers that are not installed
+            pass
+    for engine in ("optimized", None):
+        convert_gstr1_json_to_excel_bytes(WARM_RETURN, engine=engine)
+    for output_format in OUTPUT_FORMATS:
+        if output_format == "xlsx":
+            continue
+        try:
+            convert_gstr1_json_to_excel_bytes(WARM_RETURN, output_format=output_format)
+        except RuntimeError:  # Formats whose optional dependency is missing
+            pass
+    _WARM_SECONDS = time.perf_counter() - started
+
+
+def _worker_ready():
+    return os.getpid(), _WARM_SECONDS
+
+
+def convert_job(data, output_format="xlsx", engine=None, validation=None):
+    """
+    Converts one return (bytes) in a worker.
+    Returns: (output bytes, the conversion's metric events)
+    """
+    metrics = ConversionMetrics()
+    output = convert_gstr1_json_to_excel_bytes(data, engine=engine, output_format=output_format, metrics=metrics,
+                                               validation=validation)
+    return output.getvalue(), metrics.events
+
+
+def write_job(dfs, output_format="xlsx", engine=None):
+    """
+    Writes the sections of a return, already extracted by the caller (by
+    get_all_sections_from_json for xlsx, merge_returns for the other formats), in a worker.
+    Returns: (output bytes, the write's metric events)
+    """
+    metrics = ConversionMetrics()
+    with metrics.stage("write", output_format) as counts:
+        counts["output_rows"] = sum(len(df) for df in dfs.values())
+        if output_format == "xlsx":
+            output = write_excel(dfs, engine=engine)
+        else:
+            output = write_dataset(dfs, output_format)
+    return output.getvalue(), metrics.events
+
+
+# --- Pool ---
+
+def _pool_context():
+    # The server process runs threads, so workers are not forked from it directly
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["gstr1_converter"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _log_event(event):
+    if event["type"] == "stage" and event["stage"] in LOGGED_STAGES:
+        counts = "".join(f", {name}={value}" for name, value in event.items()
+                         if name not in ("type", "stage", "section", "seconds"))
+        print(f"gstr1 {event['stage']}: {event['seconds']:.3f}s{counts}", file=sys.stderr, flush=True)
+
+
+class WarmPool:
+    """
+    A process pool for conversions whose workers are started and warmed up as soon
+    as it is created: each imports the writers and converts a tiny return once
+    (see warm_worker), so no request waits for imports. Meant to be created once
+    per server process and shared by all sessions.
+    metrics (a ConversionMetrics) receives the server's "startup", "pool_warmup",
+    "first_request" and "request" stages; the first three are also logged.
+    When a worker dies, the pool is replaced by a new one and the job retried once.
+    """
+
+    def __init__(self, workers=DEFAULT_POOL_WORKERS, metrics=None):
+        self.workers = max(1, workers)
+        self.metrics = metrics if metrics is not None else ConversionMetrics(callback=_log_event,
+                                                                             max_events=METRICS_MAX_EVENTS)
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._pool = self._new_executor()
+        self._warm()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context(), initializer=warm_worker)
+
+    def _warm(self):
+        # One task per worker makes the pool start every worker now, not on demand
+        token = self.metrics.start("pool_warmup")
+        futures = [self._pool.submit(_worker_ready) for _ in range(self.workers)]
+        remaining = [len(futures)]
+
+        def done(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            warm_seconds = [future.result()[1] for future in futures if future.exception() is None]
+            self.metrics.finish(token, workers=len(warm_seconds),
+                                worker_warm_seconds=round(max(warm_seconds, default=0.0), 3))
+            self.ready.set()
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def _restart(self, broken):
+        """Replaces a broken pool (one whose worker died) with a new, warming one"""
+        with self._lock:
+            if self._pool is not broken:
+                return  # Another session replaced it already
+            self._pool = self._new_executor()
+            self.ready.clear()
+        broken.shutdown(wait=False)
+        self._warm()
+
+    def _run(self, job, *args):
+        pool = self._pool
+        try:
+            return pool.submit(job, *args).result()
+        except BrokenProcessPool as e:
+            self.metrics.error("pool", e)
+            self._restart(pool)
+        return self._pool.submit(job, *args).result()
+
+    def wait_ready(self, timeout=None):
+        """Blocks until every worker has warmed up; returns False on timeout"""
+        return self.ready.wait(timeout)
+
+    def record_startup(self, seconds, **counts):
+        """Records the server's startup time (e.g. the app's imports) as the "startup" stage"""
+        self.metrics.record("startup", seconds, **counts)
+
+    @contextmanager
+    def request(self):
+        """Times one request end to end: the first of the process as "first_request", later ones as "request" """
+        with self._lock:
+            self._requests += 1
+            stage = "first_request" if self._requests == 1 else "request"
+        with self.metrics.stage(stage) as counts:
+            counts["pool_ready"] = int(self.ready.is_set())
+            yield counts
+
+    def write(self, dfs, output_format="xlsx", engine=None):
+        """
+        Writes extracted sections to output_format in a worker (see write_job), so a
+        session that has the sections for its previews does not extract them again.
+        The DataFrames are pickled to the worker, a transfer of about their in-memory
+        size, which is still much cheaper than parsing and extracting the upload again.
+        Returns: (output bytes, the write's metric events)
+        """
+        return self._run(write_job, dfs, output_format, engine)
+
+    def convert(self, data, output_format="xlsx", engine=None, validation=None):
+        """Converts a return (bytes) in a worker. Returns: (output bytes, the conversion's metric events)"""
+        return self._run(convert_job, data, output_format, engine, validation)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def start_metrics_endpoint(pool, port=DEFAULT_METRICS_PORT, host="127.0.0.1"):
+    """Serves the pool's metrics in the Prometheus format when port is set; returns the server or None"""
+    if not port:
+        return None
+    return serve_metrics(pool.metrics, host=host, port=port)
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold and warm conversion latency of the worker pool.")
+    parser.add_argument("input", help="GSTR-1 JSON file")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_POOL_WORKERS,
+                        help="Number of worker processes (default: %(default)s)")
+    parser.add_argument("-f", "--format", dest="output_format", choices=list(OUTPUT_FORMATS), default="xlsx")
+    parser.add_argument("--engine", choices=sorted(EXCEL_ENGINES), default=None)
+    parser.add_argument("--requests", type=int, default=3, help="Conversions to time after warm-up")
+    args = parser.parse_args(argv)
+
+    data = Path(args.input).read_bytes()
+    started = time.perf_counter()
+    pool = WarmPool(args.workers)
+    pool.wait_ready()
+    try:
+        for _ in range(args.requests):
+            with pool.request() as counts:
+                output, _ = pool.convert(data, args.output_format, args.engine)
+                counts["output_bytes"] = len(output)
+    finally:
+        pool.shutdown()
+    for event in pool.metrics.stages():
+        print(f"{event['stage']}: {event['seconds']:.3f}s")
+    print(f"Total {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+from gstr1_converter import SCHEMAS_BY_SHEET, document_column, get_all_sections_from_json, write_excel
+
+# Sheet added to the workbook with every discrepancy found
+DISCREPANCY_SHEET = "Discrepancies"
+DISCREPANCY_COLUMNS = ["Check", "Section", "Recipient GSTIN", "Document", "Field", "Expected", "Reported",
+                       "Difference"]
+
+# Differences up to this amount (in rupees) are treated as rounding
+DEFAULT_TOLERANCE = 1.0
+
+# Sections whose supplies the HSN summary should add up to; notes count with their sign
+HSN_SUPPLY_SECTIONS = ["B2B Invoices", "B2C Large Invoices", "B2C Small Summary", "Exports"]
+HSN_NOTE_SECTIONS = ["Credit Debit Notes (Reg)", "Credit Debit Notes (Unreg)"]
+
+# HSN summary column -> the columns holding the same amount in the other sections
+HSN_AMOUNTS = {
+    "Taxable Value": ("Taxable Value",),
+    "IGST": ("Total IGST", "IGST"),
+    "CGST": ("Total CGST", "CGST"),
+    "SGST": ("Total SGST", "SGST"),
+    "CESS": ("Total CESS", "CESS"),
+}
+
+# Document Issued Summary types (doc_num) -> (description, sections counted, note type or None)
+DOCUMENT_TYPES = {
+    1: ("Invoices for outward supply", ["B2B Invoices", "B2C Large Invoices", "Exports"], None),
+    4: ("Debit Notes", HSN_NOTE_SECTIONS, "D"),
+    5: ("Credit Notes", HSN_NOTE_SECTIONS, "C"),
+}
+
+
+class Reconciliation:
+    """
+    Result of reconcile(): one entry per check in checks (name, status "ok",
+    "mismatch" or "skipped", number of values compared, discrepancies found)
+    and every discrepancy as a row of the discrepancies DataFrame.
+    """
+
+    def __init__(self, tolerance=DEFAULT_TOLERANCE):
+        self.tolerance = tolerance
+        self.checks = []
+        self._frames = []
+
+    @property
+    def discrepancies(self):
+        frames = [frame for frame in self._frames if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=DISCREPANCY_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    @property
+    def ok(self):
+        return all(check["status"] != "mismatch" for check in self.checks)
+
+    def _record(self, name, section, compared, frame=None, note=None):
+        found = 0 if frame is None else len(frame)
+        status = "skipped" if compared == 0 else ("mismatch" if found else "ok")
+        check = {"check": name, "section": section, "status": status, "compared": int(compared),
+                 "discrepancies": found}
+        if note:
+            check["note"] = note
+        self.checks.append(check)
+        if frame is not None:
+            self._frames.append(frame)
+
+    def to_dict(self):
+        discrepancies = self.discrepancies.astype(object).where(self.discrepancies.notna(), None)
+        return {"ok": self.ok, "tolerance": self.tolerance, "checks": self.checks,
+                "discrepancies": discrepancies.to_dict(orient="records")}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), default=str, **kwargs)
+
+
+# --- Checks ---
+
+def _check_document_values(report, dfs):
+    """Declared invoice/note values against the sum of their item amounts"""
+    for sheet_name, df in dfs.items():
+        schema = SCHEMAS_BY_SHEET.get(sheet_name)
+        if schema is None or schema.value is None or not len(df):
+            continue
+        value_column = schema.value[0]
+        computed = df[[column for column, _ in schema.totals]].to_numpy(dtype=np.float64).sum(axis=1)
+        declared = df[value_column].to_numpy(dtype=np.float64)
+        difference = declared - computed
+        mismatched = np.flatnonzero(np.abs(difference) > report.tolerance)
+        number_column = document_column(schema)
+        frame = pd.DataFrame({
+            "Check": "Document value",
+            "Section": sheet_name,
+            "Recipient GSTIN": (df["Recipient GSTIN"].to_numpy(dtype=object)[mismatched]
+                                if "Recipient GSTIN" in df else None),
+            "Document": df[number_column].to_numpy(dtype=object)[mismatched] if number_column else None,
+            "Field": value_column,
+            "Expected": computed[mismatched],
+            "Reported": declared[mismatched],
+            "Difference": difference[mismatched],
+        }, columns=DISCREPANCY_COLUMNS)
+        report._record("Document value", sheet_name, len(df), frame)
+
+
+def _section_amounts(df, sign=None):
+    """Sums the HSN_AMOUNTS of a section, optionally weighting each row by sign"""
+    amounts = {}
+    for hsn_column, columns in HSN_AMOUNTS.items():
+        column = next((column for column in columns if column in df), None)
+        if column is None:
+            amounts[hsn_column] = 0.0
+            continue
+        values = pd.to_numeric(df[column], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        amounts[hsn_column] = float(values @ sign if sign is not None else values.sum())
+    return amounts
+
+
+def _note_signs(df):
+    """Returns +1 for debit notes and -1 for credit notes (and other types)"""
+    note_types = df["Note Type"].astype(object).to_numpy()
+    return np.where(note_types == "D", 1.0, -1.0)
+
+
+def _check_hsn_summary(report, dfs):
+    """Taxable value and tax across the supply sections against the HSN summary totals"""
+    hsn = dfs.get("HSN Summary")
+    if hsn is None or not len(hsn):
+        report._record("HSN summary totals", "HSN Summary", 0, note="No HSN summary in the return")
+        return
+    expected = dict.fromkeys(HSN_AMOUNTS, 0.0)
+    for sheet_name in HSN_SUPPLY_SECTIONS + HSN_NOTE_SECTIONS:
+        df = dfs.get(sheet_name)
+        if df is None or not len(df):
+            continue
+        sign = _note_signs(df) if sheet_name in HSN_NOTE_SECTIONS else None
+        for column, amount in _section_amounts(df, sign).items():
+            expected[column] += amount
+    reported = _section_amounts(hsn)
+    rows = [["HSN summary totals", "HSN Summary", None, None, column, expected[column], reported[column],
+             reported[column] - expected[column]]
+            for column in HSN_AMOUNTS if abs(reported[column] - expected[column]) > report.tolerance]
+    report._record("HSN summary totals", "HSN Summary", len(HSN_AMOUNTS),
+                   pd.DataFrame(rows, columns=DISCREPANCY_COLUMNS),
+                   note="Amendment sections are not included")
+
+
+def _check_documents_issued(report, dfs):
+    """Document Issued Summary counts: internal consistency and net issued against the documents reported"""
+    docs = dfs.get("Document Issued Summary")
+    if docs is None or not len(docs):
+        report._record("Documents issued", "Document Issued Summary", 0, note="No document summary in the return")
+        return
+    total = pd.to_numeric(docs["Total Issued"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    cancelled = pd.to_numeric(docs["Cancelled"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    net = pd.to_numeric(docs["Net Issued"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    inconsistent = np.flatnonzero(np.abs(total - cancelled - net) > 0)
+    ranges = (docs["Serial Number From"].astype(str) + " - " + docs["Serial Number To"].astype(str)).to_numpy()
+    frame = pd.DataFrame({
+        "Check": "Document series",
+        "Section": "Document Issued Summary",
+        "Recipient GSTIN": None,
+        "Document": ranges[inconsistent],
+        "Field": "Net Issued",
+        "Expected": (total - cancelled)[inconsistent],
+        "Reported": net[inconsistent],
+        "Difference": (net - total + cancelled)[inconsistent],
+    }, columns=DISCREPANCY_COLUMNS)
+    report._record("Document series", "Document Issued Summary", len(docs), frame)
+
+    # Net issued per document type against the distinct documents in the sections
+    doc_types = pd.to_numeric(docs["Document Type Index"].astype(object), errors="coerce")
+    net_by_type = pd.Series(net).groupby(doc_types.to_numpy()).sum()
+    rows, compared = [], 0
+    for doc_type, (description, sections, note_type) in DOCUMENT_TYPES.items():
+        if doc_type not in net_by_type.index:
+            continue
+        numbers = []
+        for sheet_name in sections:
+            df = dfs.get(sheet_name)
+            if df is None or not len(df):
+                continue
+            column = document_column(SCHEMAS_BY_SHEET[sheet_name])
+            selected = df[column] if note_type is None else df.loc[df["Note Type"] == note_type, column]
+            numbers.append(selected.astype(object))
+        counted = int(pd.concat(numbers).nunique()) if numbers else 0
+        issued = float(net_by_type[doc_type])
+        compared += 1
+        # B2C small invoices are only reported in summary, so more may have been issued than listed
+        partial = doc_type == 1 and "B2C Small Summary" in dfs and len(dfs["B2C Small Summary"])
+        if issued == counted or (partial and issued > counted):
+            continue
+        rows.append(["Documents issued", "Document Issued Summary", None, None, f"Net Issued ({description})",
+                     counted, issued, issued - counted])
+    report._record("Documents issued", "Document Issued Summary", compared,
+                   pd.DataFrame(rows, columns=DISCREPANCY_COLUMNS))
+
+
+def reconcile(dfs, tolerance=DEFAULT_TOLERANCE):
+    """
+    Cross-checks the sections of a return (as returned by get_all_sections_from_json):
+    declared invoice/note values against the sum of their items, the totals of the
+    supply sections (notes with their sign) against the HSN summary, and the Document
+    Issued Summary against the invoices and notes actually reported.
+    All comparisons are vectorized over the section DataFrames.
+    Returns: Reconciliation
+    """
+    report = Reconciliation(tolerance)
+    _check_document_values(report, dfs)
+    _check_hsn_summary(report, dfs)
+    _check_documents_issued(report, dfs)
+    return report
+
+
+def add_discrepancy_sheet(dfs, report):
+    """Returns a copy of dfs with the discrepancies as an extra sheet"""
+    dfs = dict(dfs)
+    dfs[DISCREPANCY_SHEET] = report.discrepancies
+    return dfs
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconcile the totals of a GSTR-1 return.")
+    parser.add_argument("input", help="GSTR-1 JSON file")
+    parser.add_argument("-o", "--output", default=None, help="Write the JSON report to this file (default: stdout)")
+    parser.add_argument("--excel", default=None, help="Also write the workbook with a Discrepancies sheet")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Largest difference treated as rounding (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    with open(args.input, "rb") as source:
+        dfs = get_all_sections_from_json(source)
+    report = reconcile(dfs, args.tolerance)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report.to_json(indent=2))
+    else:
+        print(report.to_json(indent=2))
+    if args.excel:
+        with open(args.excel, "wb") as output:
+            write_excel(add_discrepancy_sheet(dfs, report), output=output)
+    for check in report.checks:
+        print(f"[{check['status']}] {check['check']} - {check['section']}: "
+              f"{check['discrepancies']} of {check['compared']}", file=sys.stderr)
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,433 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from gstr1_converter import (EXCEL_ENGINES, OUTPUT_FORMATS, SECTION_SCHEMAS, convert_gstr1_json_to_excel_bytes,
+                             count_section_records, decode_json)
+from gstr1_metrics import ConversionMetrics
+
+# Defaults, overridable through the environment or the command line
+DEFAULT_WORKERS = int(os.environ.get("GSTR1_SERVICE_WORKERS", "2"))
+DEFAULT_QUEUE_SIZE = int(os.environ.get("GSTR1_SERVICE_QUEUE", "16"))
+DEFAULT_MAX_UPLOAD_MB = int(os.environ.get("GSTR1_SERVICE_MAX_UPLOAD_MB", "512"))
+DEFAULT_JOBS_PER_CLIENT = int(os.environ.get("GSTR1_SERVICE_JOBS_PER_CLIENT", "4"))
+DEFAULT_JOB_TTL = int(os.environ.get("GSTR1_SERVICE_JOB_TTL", "3600"))
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                409: "Conflict", 411: "Length Required", 413: "Payload Too Large", 429: "Too Many Requests",
+                500: "Internal Server Error", 503: "Service Unavailable"}
+
+# Job states, in lifecycle order
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "error"
+
+
+# --- Worker Process ---
+
+def _pool_context():
+    # The service runs a progress listener thread and a Manager, so workers are not forked from it
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["gstr1_converter"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def run_conversion_job(job_id, input_path, output_path, output_format, engine, progress):
+    """
+    Converts one uploaded file in a worker process, writing the result to output_path.
+    Progress is reported on the progress queue as (job_id, fraction, last completed stage):
+    each present section counts one step when extracted and one when its DataFrame
+    is built, and writing the output, usually the slowest stage, counts as many steps
+    as all of those together.
+    """
+    with open(input_path, "rb") as source:
+        gstr1_data = decode_json(source.read())
+    present = sum(1 for schema in SECTION_SCHEMAS
+                  if schema.key in gstr1_data and count_section_records(schema, gstr1_data[schema.key]))
+    steps = 4 * present + 1
+    done = [0]
+
+    def report(event):
+        if event["type"] != "stage":
+            return
+        done[0] = min(done[0] + 1, 2 * present) if event["stage"] != "write" else steps
+        label = f"{event['stage']} {event['section']}" if event["section"] else event["stage"]
+        progress.put((job_id, done[0] / steps, label))
+
+    metrics = ConversionMetrics(callback=report)
+    with open(output_path, "wb") as output:
+        convert_gstr1_json_to_excel_bytes(gstr1_data, engine=engine, output=output,
+                                          output_format=output_format, metrics=metrics)
+    return metrics.to_dict()
+
+
+# --- Jobs ---
+
+class Job:
+    """State of one conversion job, as reported by the status endpoint"""
+
+    def __init__(self, job_id, client, input_path, output_path, output_format, engine):
+        self.id = job_id
+        self.client = client
+        self.input_path = input_path
+        self.output_path = output_path
+        self.output_format = output_format
+        self.engine = engine
+        self.status = QUEUED
+        self.progress = 0.0
+        self.stage = None
+        self.error = None
+        self.metrics = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self, queue_position=None):
+        info = {
+            "id": self.id,
+            "status": self.status,
+            "format": self.output_format,
+            "progress": round(self.progress, 4),
+            "stage": self.stage,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+        if queue_position is not None:
+            info["queue_position"] = queue_position
+        if self.status == DONE:
+            info["result_url"] = f"/jobs/{self.id}/result"
+            info["metrics"] = self.metrics
+        if self.error:
+            info["error"] = self.error
+        return info
+
+
+class ConversionService:
+    """
+    Queues uploaded returns and converts them on a bounded process pool.
+
+    At most `workers` conversions run at once and at most `queue_size` jobs wait;
+    submissions beyond that are refused (HTTP 503 with Retry-After) instead of
+    piling up, as are uploads over max_upload_bytes (413) and clients that already
+    have max_jobs_per_client unfinished jobs (429). Finished jobs and their files
+    are removed job_ttl seconds after they complete.
+    """
+
+    def __init__(self, work_dir=None, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 max_upload_bytes=DEFAULT_MAX_UPLOAD_MB * 1024 * 1024,
+                 max_jobs_per_client=DEFAULT_JOBS_PER_CLIENT, job_ttl=DEFAULT_JOB_TTL):
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="gstr1-service-")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_upload_bytes = max_upload_bytes
+        self.max_jobs_per_client = max_jobs_per_client
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self._queue = None
+        self._pool = None
+        self._manager = None
+        self._progress = None
+        self._tasks = []
+        self._loop = None
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        """Starts the process pool, the progress listener and the queue workers"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()  # Bounded by queued_jobs(), so deleted jobs give their slot back
+        context = _pool_context()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        self._manager = context.Manager()
+        self._progress = self._manager.Queue()
+        threading.Thread(target=self._listen_progress, daemon=True).start()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._expire_jobs()))
+
+    async def stop(self):
+        """Cancels the workers and shuts the pool down"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._pool.shutdown(cancel_futures=True)
+        self._progress.put(None)
+        self._manager.shutdown()
+
+    # --- Jobs ---
+
+    def active_jobs(self, client):
+        return sum(1 for job in self.jobs.values() if job.client == client and job.status in (QUEUED, RUNNING))
+
+    def queued_jobs(self):
+        return sum(1 for job in self.jobs.values() if job.status == QUEUED)
+
+    def queue_position(self, job):
+        """Returns how many queued jobs were submitted before this one (None unless queued)"""
+        if job.status != QUEUED:
+            return None
+        return sum(1 for other in self.jobs.values() if other.status == QUEUED and other.created < job.created)
+
+    def submit(self, client, input_path, output_format="xlsx", engine=None):
+        """
+        Queues an uploaded file for conversion.
+        Raises asyncio.QueueFull when queue_size jobs are already waiting.
+        """
+        if self.queued_jobs() >= self.queue_size:
+            raise asyncio.QueueFull
+        job_id = uuid.uuid4().hex
+        output_path = os.path.join(self.work_dir, job_id + OUTPUT_FORMATS[output_format][1])
+        job = Job(job_id, client, input_path, output_path, output_format, engine)
+        self._queue.put_nowait(job)
+        self.jobs[job_id] = job
+        return job
+
+    def remove(self, job):
+        """Forgets a job and deletes its files"""
+        self.jobs.pop(job.id, None)
+        for path in (job.input_path, job.output_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.id not in self.jobs:
+                    continue  # Deleted while it was waiting; its slot was released then
+                job.status, job.started = RUNNING, time.time()
+                job.metrics = await self._loop.run_in_executor(
+                    self._pool, run_conversion_job, job.id, job.input_path, job.output_path,
+                    job.output_format, job.engine, self._progress)
+                job.status, job.progress, job.stage = DONE, 1.0, None
+            except Exception as e:
+                job.status, job.error = FAILED, str(e)
+            finally:
+                if job.status != QUEUED:
+                    job.finished = time.time()
+                try:
+                    os.remove(job.input_path)  # The upload is not needed any more
+                except OSError:
+                    pass
+                self._queue.task_done()
+
+    def _listen_progress(self):
+        # Runs in a thread: relays progress reported by the worker processes to the loop
+        while True:
+            try:
+                message = self._progress.get()
+            except (EOFError, OSError):
+                return  # The manager was shut down
+            if message is None:
+                return
+            self._loop.call_soon_threadsafe(self._update_progress, *message)
+
+    def _update_progress(self, job_id, fraction, stage):
+        job = self.jobs.get(job_id)
+        if job is not None and job.status == RUNNING:
+            job.progress, job.stage = fraction, stage
+
+    async def _expire_jobs(self):
+        while True:
+            await asyncio.sleep(max(1, min(60, self.job_ttl)))
+            cutoff = time.time() - self.job_ttl
+            for job in list(self.jobs.values()):
+                if job.finished is not None and job.finished < cutoff:
+                    self.remove(job)
+
+    # --- HTTP ---
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """Starts the service and serves the HTTP API until cancelled"""
+        await self.start()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"GSTR-1 conversion service listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader, writer):
+        client = (writer.get_extra_info("peername") or ("unknown",))[0]
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            response = await self._route(method, url.path, parse_qs(url.query), headers, reader, client)
+        except ValueError:
+            response = _json_response(400, {"error": "Malformed request"})
+        except Exception as e:
+            response = _json_response(500, {"error": str(e)})
+        try:
+            await _write_response(writer, *response)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, params, headers, reader, client):
+        parts = [part for part in path.split("/") if part]
+        if parts == ["health"] and method == "GET":
+            return _json_response(200, {
+                "workers": self.workers,
+                "queued": self.queued_jobs(),
+                "queue_size": self.queue_size,
+                "running": sum(1 for job in self.jobs.values() if job.status == RUNNING),
+            })
+        if parts == ["jobs"] and method == "POST":
+            return await self._create_job(params, headers, reader, client)
+        if len(parts) < 2 or parts[0] != "jobs":
+            return _json_response(404, {"error": "Not found"})
+        job = self.jobs.get(parts[1])
+        if job is None:
+            return _json_response(404, {"error": "Unknown job"})
+        if len(parts) == 2 and method == "GET":
+            return _json_response(200, job.to_dict(self.queue_position(job)))
+        if len(parts) == 2 and method == "DELETE":
+            if job.status == RUNNING:
+                return _json_response(409, {"error": "Job is running"})
+            self.remove(job)
+            return _json_response(200, {"id": job.id, "deleted": True})
+        if parts[2:] == ["result"] and method == "GET":
+            if job.status != DONE:
+                return _json_response(409, {"error": f"Job is {job.status}", "status": job.status})
+            _, extension, mime = OUTPUT_FORMATS[job.output_format]
+            disposition = f'attachment; filename="gstr1_{job.id}{extension}"'
+            return 200, mime, job.output_path, {"Content-Disposition": disposition}
+        return _json_response(405 if len(parts) <= 3 else 404, {"error": "Unsupported request"})
+
+    async def _create_job(self, params, headers, reader, client):
+        output_format = params.get("format", ["xlsx"])[0]
+        engine = params.get("engine", [None])[0]
+        if output_format not in OUTPUT_FORMATS:
+            return _json_response(400, {"error": f"Unknown format: {output_format}"})
+        if engine is not None and engine not in EXCEL_ENGINES:
+            return _json_response(400, {"error": f"Unknown engine: {engine}"})
+        if "content-length" not in headers:
+            return _json_response(411, {"error": "Content-Length is required"})
+        length = int(headers["content-length"])
+        if length > self.max_upload_bytes:
+            return _json_response(413, {"error": f"Upload exceeds {self.max_upload_bytes} bytes"})
+        if self.active_jobs(client) >= self.max_jobs_per_client:
+            await _discard(reader, length)
+            return _json_response(429, {"error": "Too many unfinished jobs for this client"},
+                                  {"Retry-After": "5"})
+        if self.queued_jobs() >= self.queue_size:
+            await _discard(reader, length)
+            return _json_response(503, {"error": "Conversion queue is full"}, {"Retry-After": "5"})
+
+        # Spool the upload to disk; the worker process reads it from there
+        fd, input_path = tempfile.mkstemp(dir=self.work_dir, suffix=".json")
+        try:
+            with os.fdopen(fd, "wb") as upload:
+                remaining = length
+                while remaining:
+                    chunk = await reader.read(min(UPLOAD_CHUNK_BYTES, remaining))
+                    if not chunk:
+                        raise ValueError("Upload ended early")
+                    upload.write(chunk)
+                    remaining -= len(chunk)
+            job = self.submit(client, input_path, output_format, engine)
+        except asyncio.QueueFull:
+            os.remove(input_path)
+            return _json_response(503, {"error": "Conversion queue is full"}, {"Retry-After": "5"})
+        except Exception:
+            os.remove(input_path)
+            raise
+        return _json_response(202, job.to_dict(self.queue_position(job)), {"Location": f"/jobs/{job.id}"})
+
+
+# --- HTTP Responses ---
+
+async def _discard(reader, length):
+    # Reads a refused upload to its end, so the client gets to read the response
+    while length:
+        chunk = await reader.read(min(UPLOAD_CHUNK_BYTES, length))
+        if not chunk:
+            return
+        length -= len(chunk)
+
+
+def _json_response(status, payload, headers=None):
+    return status, "application/json", json.dumps(payload).encode("utf-8"), headers or {}
+
+
+async def _write_response(writer, status, content_type, body, headers):
+    """Writes a response; body is bytes or the path of a file to stream"""
+    is_file = isinstance(body, str)
+    length = os.path.getsize(body) if is_file else len(body)
+    head = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {length}",
+            "Connection: close"]
+    head += [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+    if not is_file:
+        writer.write(body)
+        await writer.drain()
+        return
+    with open(body, "rb") as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve GSTR-1 conversions as queued jobs over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Conversions running at once (worker processes)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Jobs allowed to wait; further uploads get HTTP 503")
+    parser.add_argument("--max-upload-mb", type=int, default=DEFAULT_MAX_UPLOAD_MB)
+    parser.add_argument("--jobs-per-client", type=int, default=DEFAULT_JOBS_PER_CLIENT,
+                        help="Unfinished jobs allowed per client address; further uploads get HTTP 429")
+    parser.add_argument("--job-ttl", type=int, default=DEFAULT_JOB_TTL,
+                        help="Seconds a finished job's result is kept")
+    parser.add_argument("--work-dir", default=None, help="Directory for uploads and results (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    service = ConversionService(args.work_dir, args.workers, args.queue_size, args.max_upload_mb * 1024 * 1024,
+                                args.jobs_per_client, args.job_ttl)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(service.work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+from gstr1_converter import (FLOAT_COLUMNS, RETURN_TAG_COLUMNS, SCHEMAS_BY_KEY, SCHEMAS_BY_SHEET, SECTION_SCHEMAS,
+                             merge_returns, schema_columns, section_slug)
+
+DEFAULT_STORE_PATH = os.environ.get("GSTR1_STORE", "gstr1.sqlite")
+
+# Columns holding dd-mm-yyyy dates (Invoice Date, Original Note Date, ...) in any section;
+# they are stored as ISO yyyy-mm-dd so ranges compare as text
+DATE_COLUMNS = {column for schema in SECTION_SCHEMAS for column in schema_columns(schema) if column.endswith(" Date")}
+
+# Lookup filters and the columns they apply to, in order of preference.
+# Every one of these columns is indexed wherever a section has it.
+FILTER_COLUMNS = {
+    "gstin": ("gstin",),
+    "period": ("return_period",),
+    "recipient": ("recipient_gstin",),
+    "number": ("invoice_number", "note_number"),
+    "date": ("invoice_date", "note_date"),
+    "pos": ("place_of_supply",),
+    "hsn": ("hsn_code",),
+}
+INDEXED_COLUMNS = [column for columns in FILTER_COLUMNS.values() for column in columns]
+
+
+def column_name(column):
+    """Returns the SQL column of a sheet column, e.g. "Total IGST" -> total_igst"""
+    return section_slug(column)
+
+
+def resolve_section(section):
+    """Accepts a sheet name, its table name (b2b_invoices) or its JSON key (b2b); returns the sheet name"""
+    if section in SCHEMAS_BY_SHEET:
+        return section
+    if section in SCHEMAS_BY_KEY:
+        return SCHEMAS_BY_KEY[section].sheet_name
+    for sheet_name in SCHEMAS_BY_SHEET:
+        if section_slug(sheet_name) == section:
+            return sheet_name
+    raise ValueError(f"Unknown section: {section}")
+
+
+def _iso_dates(values):
+    """Converts dd-mm-yyyy strings to yyyy-mm-dd; other values are kept as they are"""
+    values = values.astype(object)
+    parsed = pd.to_datetime(values, format="%d-%m-%Y", errors="coerce")
+    return parsed.dt.strftime("%Y-%m-%d").astype(object).where(parsed.notna(), values)
+
+
+class ReturnStore:
+    """
+    SQLite store of converted returns: one table per section, named after the sheet
+    (b2b_invoices, hsn_summary, ...), with every row tagged by the filer's GSTIN and
+    return period and indexes on the recipient GSTIN, document number, date, POS and
+    HSN code. Adding a return again replaces its earlier rows.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS returns "
+            "(gstin TEXT, return_period TEXT, added REAL, row_count INTEGER, PRIMARY KEY (gstin, return_period))")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    # --- Loading ---
+
+    def add_return(self, json_data):
+        """
+        Extracts a return (any input accepted by get_all_sections_from_json) into the store.
+        Returns: {sheet name: rows added}
+        """
+        dfs = merge_returns([json_data])
+        tags = next((df[list(RETURN_TAG_COLUMNS)].iloc[0] for df in dfs.values()), None)
+        gstin, period = (None, None) if tags is None else (tags.iloc[0], tags.iloc[1])
+        counts = {}
+        with self.connection:
+            for sheet_name in self._tables():
+                self.connection.execute(
+                    f"DELETE FROM {section_slug(sheet_name)} WHERE gstin IS ? AND return_period IS ?",
+                    (gstin, period))
+            for sheet_name, df in dfs.items():
+                counts[sheet_name] = self._insert(sheet_name, df)
+            self.connection.execute("INSERT OR REPLACE INTO returns VALUES (?, ?, ?, ?)",
+                                    (gstin, period, time.time(), sum(counts.values())))
+        return counts
+
+    def _insert(self, sheet_name, df):
+        table = section_slug(sheet_name)
+        columns = [column_name(column) for column in df.columns]
+        if sheet_name not in self._tables():
+            definitions = ", ".join(f"{name} REAL" if column in FLOAT_COLUMNS else name
+                                    for name, column in zip(columns, df.columns))
+            self.connection.execute(f"CREATE TABLE {table} ({definitions})")
+            for name in columns:
+                if name in INDEXED_COLUMNS:
+                    self.connection.execute(f"CREATE INDEX {table}_{name} ON {table} ({name})")
+        else:
+            # Tables created before a section gained columns get them added
+            existing = set(self._columns(table))
+            for name, column in zip(columns, df.columns):
+                if name not in existing:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {name}"
+                                            + (" REAL" if column in FLOAT_COLUMNS else ""))
+        df = df.copy()
+        for column in df.columns:
+            if column in DATE_COLUMNS:
+                df[column] = _iso_dates(df[column])
+        rows = df.astype(object).to_numpy(dtype=object, na_value=None)
+        placeholders = ", ".join("?" * len(columns))
+        self.connection.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                                    map(tuple, rows))
+        return len(rows)
+
+    def _tables(self):
+        names = {row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return [sheet_name for sheet_name in SCHEMAS_BY_SHEET if section_slug(sheet_name) in names]
+
+    def returns(self):
+        """Returns the stored returns with their row counts"""
+        return pd.read_sql_query("SELECT gstin, return_period, row_count, datetime(added, 'unixepoch') AS added "
+                                 "FROM returns ORDER BY gstin, return_period", self.connection)
+
+    # --- Queries ---
+
+    def _where(self, table_columns, filters):
+        """Builds a WHERE clause from lookup filters (see FILTER_COLUMNS) and date_from/date_to"""
+        clauses, params = [], []
+        filters = dict(filters)  # The caller's dict is left as it is
+        date_from, date_to = filters.pop("date_from", None), filters.pop("date_to", None)
+        if date_from is not None or date_to is not None:
+            filters["date"] = (date_from, date_to)
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name not in FILTER_COLUMNS:
+                raise ValueError(f"Unknown filter: {name}")
+            column = next((column for column in FILTER_COLUMNS[name] if column in table_columns), None)
+            if column is None:
+                return None, None  # The section cannot match this filter
+            if name == "date":
+                low, high = value
+                if low is not None:
+                    clauses.append(f"{column} >= ?")
+                    params.append(low)
+                if high is not None:
+                    clauses.append(f"{column} <= ?")
+                    params.append(high)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _columns(self, table):
+        return [row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")]
+
+    def query(self, section, limit=None, **filters):
+        """
+        Returns the rows of a section matching the filters as a DataFrame:
+        gstin, period, recipient, number, pos, hsn (exact) and date_from/date_to (yyyy-mm-dd).
+        """
+        sheet_name = resolve_section(section)
+        if sheet_name not in self._tables():
+            return pd.DataFrame()
+        table = section_slug(sheet_name)
+        where, params = self._where(self._columns(table), filters)
+        if where is None:
+            return pd.DataFrame(columns=self._columns(table))
+        sql = f"SELECT * FROM {table}{where}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def find(self, number):
+        """Looks an invoice or note number up across all sections; adds a "section" column"""
+        frames = []
+        for sheet_name in self._tables():
+            df = self.query(sheet_name, number=number)
+            if len(df):
+                df.insert(0, "section", sheet_name)
+                frames.append(df)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def aggregate(self, section, by, values=("Total IGST",), **filters):
+        """
+        Sums value columns of a section grouped by one or more columns, over the rows
+        matching the filters (as for query), e.g. total IGST per POS for a recipient:
+        aggregate("b2b", by="Place of Supply", values=["Total IGST"], recipient=gstin)
+        """
+        sheet_name = resolve_section(section)
+        if sheet_name not in self._tables():
+            return pd.DataFrame()
+        table = section_slug(sheet_name)
+        table_columns = self._columns(table)
+        by = [column_name(column) for column in ([by] if isinstance(by, str) else by)]
+        values = [column_name(column) for column in ([values] if isinstance(values, str) else values)]
+        unknown = [column for column in by + values if column not in table_columns]
+        if unknown:
+            raise ValueError(f"Unknown {sheet_name} columns: {', '.join(unknown)}")
+        where, params = self._where(table_columns, filters)
+        if where is None:
+            return pd.DataFrame(columns=by + values + ["row_count"])
+        group = ", ".join(by)
+        sums = ", ".join(f"SUM({column}) AS {column}" for column in values)
+        sql = f"SELECT {group}, {sums}, COUNT(*) AS row_count FROM {table}{where} GROUP BY {group} ORDER BY {group}"
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+
+# --- Command Line ---
+
+def _add_filters(parser):
+    parser.add_argument("--gstin", help="Filer GSTIN")
+    parser.add_argument("--period", help="Return period (mmyyyy)")
+    parser.add_argument("--recipient", help="Recipient GSTIN")
+    parser.add_argument("--number", help="Invoice or note number")
+    parser.add_argument("--pos", help="Place of supply code")
+    parser.add_argument("--hsn", help="HSN code")
+    parser.add_argument("--from", dest="date_from", help="First invoice/note date (yyyy-mm-dd)")
+    parser.add_argument("--to", dest="date_to", help="Last invoice/note date (yyyy-mm-dd)")
+
+
+def _filters(args):
+    return {name: getattr(args, name) for name in
+            ("gstin", "period", "recipient", "number", "pos", "hsn", "date_from", "date_to")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load converted GSTR-1 returns into SQLite and query them.")
+    parser.add_argument("--db", default=DEFAULT_STORE_PATH, help="SQLite database path")
+    parser.add_argument("--csv", action="store_true", help="Print results as CSV")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Add (or replace) returns")
+    add.add_argument("inputs", nargs="+", help="GSTR-1 JSON files")
+
+    commands.add_parser("list", help="List the stored returns")
+
+    find = commands.add_parser("find", help="Look an invoice or note number up in every section")
+    find.add_argument("number")
+
+    query = commands.add_parser("query", help="Rows of a section matching filters")
+    query.add_argument("section", help="Sheet name, table name or JSON key (e.g. b2b)")
+    query.add_argument("--limit", type=int, default=None)
+    _add_filters(query)
+
+    total = commands.add_parser("sum", help="Sums of value columns grouped by columns")
+    total.add_argument("section", help="Sheet name, table name or JSON key (e.g. b2b)")
+    total.add_argument("--by", action="append", required=True, help="Group by this column (repeatable)")
+    total.add_argument("--value", action="append", default=None,
+                       help="Sum this column (repeatable, default: Total IGST)")
+    _add_filters(total)
+
+    args = parser.parse_args(argv)
+    with ReturnStore(args.db) as store:
+        if args.command == "add":
+            for path in args.inputs:
+                with open(path, "rb") as source:
+                    counts = store.add_return(source)
+                print(f"{path}: {sum(counts.values()):,} rows in {len(counts)} sections")
+            return 0
+        start = time.perf_counter()
+        if args.command == "list":
+            result = store.returns()
+        elif args.command == "find":
+            result = store.find(args.number)
+        elif args.command == "query":
+            result = store.query(args.section, limit=args.limit, **_filters(args))
+        else:
+            result = store.aggregate(args.section, args.by, args.value or ["Total IGST"], **_filters(args))
+        if args.csv:
+            result.to_csv(sys.stdout, index=False)
+        else:
+            print(result.to_string(index=False) if len(result) else "No matching rows.")
+            print(f"({len(result):,} rows, {(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
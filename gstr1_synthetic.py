@@ -0,0 +1,258 @@
+import argparse
+import json
+import random
+import string
+import sys
+
+# State codes used for GSTINs and Place of Supply
+STATE_CODES = ["07", "09", "19", "24", "27", "29", "32", "33", "36"]
+GST_RATES = [0, 5, 12, 18, 28]
+HSN_CODES = [f"{code:04d}" for code in range(1001, 1201)]
+UQC_CODES = ["NOS", "KGS", "MTR", "LTR", "PCS", "BOX"]
+NOTE_REASONS = ["Sales Return", "Post Sale Discount", "Deficiency in services", "Correction in Invoice"]
+PORT_CODES = ["INBOM1", "INMAA1", "INNSA1", "INDEL4", "INCCU1"]
+
+
+# --- Building Blocks ---
+
+def random_gstin(rng, state_code=None):
+    """Returns a GSTIN-shaped identifier: state code, PAN, entity number, 'Z', check character"""
+    state_code = state_code or rng.choice(STATE_CODES)
+    pan = ("".join(rng.choices(string.ascii_uppercase, k=5))
+           + "".join(rng.choices(string.digits, k=4))
+           + rng.choice(string.ascii_uppercase))
+    return f"{state_code}{pan}{rng.choice('123456789')}Z{rng.choice(string.ascii_uppercase + string.digits)}"
+
+
+def _date(rng, period):
+    """Returns a dd-mm-yyyy date within a return period given as mmyyyy"""
+    return f"{rng.randint(1, 28):02d}-{period[:2]}-{period[2:]}"
+
+
+def _item(rng, number, inter_state, rate=None):
+    """Returns one itms[] entry with the tax split for an intra- or inter-state supply"""
+    rate = rng.choice(GST_RATES) if rate is None else rate
+    taxable_value = round(rng.uniform(100, 100000), 2)
+    details = {"txval": taxable_value, "rt": rate, "csamt": 0}
+    if inter_state:
+        details["iamt"] = round(taxable_value * rate / 100, 2)
+    else:
+        details["camt"] = round(taxable_value * rate / 200, 2)
+        details["samt"] = details["camt"]
+    return {"num": number, "itm_det": details}
+
+
+def _invoice_value(items):
+    return round(sum(sum(value for key, value in item["itm_det"].items() if key != "rt")
+                     for item in items), 2)
+
+
+def _invoice(rng, number, period, supplier_state, items_per_invoice, pos=None):
+    pos = pos or rng.choice(STATE_CODES)
+    items = [_item(rng, i + 1, pos != supplier_state) for i in range(rng.randint(1, items_per_invoice))]
+    return {
+        "inum": f"INV/{period}/{number:07d}",
+        "idt": _date(rng, period),
+        "val": _invoice_value(items),
+        "pos": pos,
+        "rchrg": "N",
+        "inv_typ": "R",
+        "itms": items,
+    }
+
+
+def _note(rng, number, period, supplier_state, items_per_invoice, pos=None):
+    pos = pos or rng.choice(STATE_CODES)
+    items = [_item(rng, i + 1, pos != supplier_state) for i in range(rng.randint(1, items_per_invoice))]
+    return {
+        "nt_num": f"CN/{period}/{number:06d}",
+        "nt_dt": _date(rng, period),
+        "ntty": rng.choice("CD"),
+        "oinum": f"INV/{period}/{rng.randint(1, 10 ** 6):07d}",
+        "oidt": _date(rng, period),
+        "pos": pos,
+        "rsn": rng.choice(NOTE_REASONS),
+        "val": _invoice_value(items),
+        "itms": items,
+    }
+
+
+# Amounts of an HSN summary row, as in itm_det and B2CS rows
+HSN_AMOUNT_KEYS = ("txval", "iamt", "camt", "samt", "csamt")
+
+
+def _hsn_summary(rng, codes, supplies, notes):
+    """
+    Builds the HSN summary of a return from its supplies: every (itm_det or B2CS row)
+    amount dict in supplies is filed under a random code of codes, and the items of
+    notes (ntty) are added to it for debit notes and taken off the largest code for
+    credit notes, so the summary adds up to the sections it summarizes.
+    """
+    rows = {code: {"hsn_sc": code, "desc": f"Goods {code}", "uqc": rng.choice(UQC_CODES), "qty": 0,
+                   **dict.fromkeys(HSN_AMOUNT_KEYS, 0.0)}
+            for code in codes}
+    for details in supplies:
+        row = rows[rng.choice(codes)]
+        row["qty"] += rng.randint(1, 100)
+        for key in HSN_AMOUNT_KEYS:
+            row[key] += details.get(key, 0)
+    supplied = [row for row in rows.values() if row["qty"]]
+    for note in notes:
+        for item in note["itms"]:
+            if note["ntty"] == "D":
+                row, sign = rng.choice(supplied), 1
+            else:
+                row, sign = max(supplied, key=lambda row: row["txval"]), -1
+            for key in HSN_AMOUNT_KEYS:
+                row[key] += sign * item["itm_det"].get(key, 0)
+    hsn = []
+    for index, row in enumerate(supplied):
+        row.update((key, round(row[key], 2)) for key in HSN_AMOUNT_KEYS)
+        row["val"] = round(sum(row[key] for key in HSN_AMOUNT_KEYS), 2)
+        hsn.append({"num": index + 1, **row})
+    return hsn
+
+
+def _note_series(period, notes, note_type):
+    """Returns the doc_issue series of the notes of one type (ntty), or None when there are none"""
+    numbers = [note["nt_num"] for note in notes if note["ntty"] == note_type]
+    if not numbers:
+        return None
+    return {"doc_num": 4 if note_type == "D" else 5,
+            "docs": [{"num": 1, "from": min(numbers), "to": max(numbers),
+                      "totnum": len(numbers), "cancel": 0, "net_issue": len(numbers)}]}
+
+
+# --- Generator ---
+
+def generate_gstr1(suppliers=100, invoices_per_supplier=10, items_per_invoice=3,
+                   amendment_ratio=0.02, note_ratio=0.05, hsn_codes=50, period="042024", seed=0):
+    """
+    Builds a synthetic GSTR-1 document (as a dict) with realistic structure.
+    B2B holds suppliers x invoices_per_supplier invoices with 1..items_per_invoice items each;
+    amend_b2b and cdnr hold about amendment_ratio and note_ratio of that volume.
+    B2CL, B2CS, exports, CDUNR, nil rated, HSN and doc_issue sections are included too;
+    the HSN summary and doc_issue counts are derived from the generated documents.
+    """
+    rng = random.Random(seed)
+    own_state = rng.choice(STATE_CODES)
+    invoice_count = suppliers * invoices_per_supplier
+    small = max(1, invoice_count // 100)
+    number = 0
+
+    b2b = []
+    for _ in range(suppliers):
+        invoices = []
+        for _ in range(invoices_per_supplier):
+            number += 1
+            invoices.append(_invoice(rng, number, period, own_state, items_per_invoice))
+        b2b.append({"ctin": random_gstin(rng), "inv": invoices})
+
+    amend_b2b = []
+    for supplier in rng.sample(b2b, min(len(b2b), max(1, int(suppliers * amendment_ratio)))):
+        original = rng.choice(supplier["inv"])
+        amended = _invoice(rng, rng.randint(1, number), period, own_state, items_per_invoice, original["pos"])
+        amended.update(oinum=original["inum"], oidt=original["idt"])
+        amend_b2b.append({"ctin": supplier["ctin"], "inv": [amended]})
+
+    cdnr = []
+    note_count = max(1, int(invoice_count * note_ratio))
+    for start in range(0, note_count, 10):
+        notes = [_note(rng, start + i + 1, period, own_state, items_per_invoice)
+                 for i in range(min(10, note_count - start))]
+        cdnr.append({"ctin": rng.choice(b2b)["ctin"], "nt": notes})
+
+    b2cl = []
+    for _ in range(small):
+        number += 1
+        pos = rng.choice([code for code in STATE_CODES if code != own_state])
+        invoice = _invoice(rng, number, period, own_state, items_per_invoice, pos)
+        del invoice["rchrg"], invoice["inv_typ"]
+        b2cl.append(invoice)
+
+    exports = []
+    for _ in range(small):
+        number += 1
+        items = [_item(rng, i + 1, True, rate=rng.choice([0, 18])) for i in range(rng.randint(1, items_per_invoice))]
+        exports.append({
+            "inum": f"EXP/{period}/{number:07d}",
+            "idt": _date(rng, period),
+            "val": _invoice_value(items),
+            "pcode": rng.choice(PORT_CODES),
+            "sbnum": str(rng.randint(10 ** 6, 10 ** 7)),
+            "sbdt": _date(rng, period),
+            "itms": items,
+        })
+
+    # Notes to unregistered persons amend B2C large invoices and exports: always inter-state
+    other_states = [code for code in STATE_CODES if code != own_state]
+    cdunr = [_note(rng, note_count + i + 1, period, own_state, items_per_invoice, rng.choice(other_states))
+             for i in range(small)]
+
+    b2cs = []
+    for pos in STATE_CODES:
+        for rate in GST_RATES[1:]:
+            taxable_value = round(rng.uniform(1000, 500000), 2)
+            row = {"sply_ty": "INTER" if pos != own_state else "INTRA", "pos": pos, "typ": "OE",
+                   "txval": taxable_value, "rt": rate, "csamt": 0}
+            if pos != own_state:
+                row["iamt"] = round(taxable_value * rate / 100, 2)
+            else:
+                row["camt"] = row["samt"] = round(taxable_value * rate / 200, 2)
+            b2cs.append(row)
+
+    nil = [{"pos": pos, "txval": round(rng.uniform(0, 10000), 2), "rt": 0} for pos in STATE_CODES]
+
+    # The HSN summary and document counts match the sections above, so the return reconciles
+    notes = [note for supplier in cdnr for note in supplier["nt"]] + cdunr
+    supplies = [item["itm_det"] for invoices in ([invoice for supplier in b2b for invoice in supplier["inv"]],
+                                                 b2cl, exports)
+                for invoice in invoices for item in invoice["itms"]] + b2cs
+    hsn = _hsn_summary(rng, rng.sample(HSN_CODES, min(hsn_codes, len(HSN_CODES))), supplies, notes)
+
+    doc_det = [{"doc_num": 1, "docs": [{"num": 1, "from": f"INV/{period}/0000001", "to": f"INV/{period}/{number:07d}",
+                                        "totnum": number, "cancel": 0, "net_issue": number}]}]
+    doc_det += [series for series in (_note_series(period, notes, "D"), _note_series(period, notes, "C"))
+                if series is not None]
+    doc_issue = {"doc_det": doc_det}
+
+    return {
+        "gstin": random_gstin(rng, own_state),
+        "fp": period,
+        "gt": 0,
+        "cur_gt": 0,
+        "b2b": b2b,
+        "b2cl": b2cl,
+        "b2cs": b2cs,
+        "exp": exports,
+        "cdnr": cdnr,
+        "cdunr": cdunr,
+        "nil": nil,
+        "hsn": {"data": hsn},
+        "doc_issue": doc_issue,
+        "amend_b2b": amend_b2b,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic GSTR-1 JSON file.")
+    parser.add_argument("output", help="Output JSON path ('-' for stdout)")
+    parser.add_argument("--suppliers", type=int, default=100)
+    parser.add_argument("--invoices-per-supplier", type=int, default=10)
+    parser.add_argument("--items-per-invoice", type=int, default=3)
+    parser.add_argument("--period", default="042024", help="Return period as mmyyyy")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    document = generate_gstr1(args.suppliers, args.invoices_per_supplier, args.items_per_invoice,
+                              period=args.period, seed=args.seed)
+    if args.output == "-":
+        json.dump(document, sys.stdout)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(document, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import math
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+
+# Deflate level of the xlsx package (0 stores the parts uncompressed, 9 is smallest and slowest)
+DEFAULT_COMPRESSION_LEVEL = int(os.environ.get("GSTR1_XLSX_COMPRESSION", "6"))
+
+# How string columns are written: "shared" (one sharedStrings entry per distinct value),
+# "inline" (the text in every cell) or "auto" (shared when values repeat enough)
+STRING_MODES = ("auto", "shared", "inline")
+
+# In "auto" mode, columns with at most this many distinct values per row use shared strings
+SHARED_STRINGS_MAX_RATIO = 0.5
+
+# Rows rendered at a time
+CHUNK_ROWS = 50000
+
+# Number format codes with built-in ids; other codes are declared in styles.xml
+BUILTIN_NUMBER_FORMATS = {"General": 0, "0": 1, "0.00": 2, "#,##0": 3, "#,##0.00": 4}
+
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_PACKAGE_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_RELATIONSHIP = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+
+SHEET_START = f'{_XML_DECLARATION}<worksheet xmlns="{_MAIN_NS}"><sheetData>'
+SHEET_END = "</sheetData></worksheet>"
+
+
+# --- Cells ---
+
+class SharedStrings:
+    """The workbook's shared strings table: each distinct text is stored once and cells refer to its index"""
+
+    def __init__(self):
+        self.index = {}
+        self.count = 0
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, text):
+        self.count += 1
+        return self.index.setdefault(text, len(self.index))
+
+    def to_xml(self):
+        items = "".join(f"<si>{_text_element(text)}</si>" for text in self.index)
+        return f'{_XML_DECLARATION}<sst xmlns="{_MAIN_NS}" count="{self.count}" uniqueCount="{len(self)}">{items}</sst>'
+
+
+def _text_element(text):
+    text = escape(_ILLEGAL_XML.sub("", text))
+    space = ' xml:space="preserve"' if text[:1].isspace() or text[-1:].isspace() else ""
+    return f"<t{space}>{text}</t>"
+
+
+def cell(value, strings=None, style=""):
+    """
+    Returns the SpreadsheetML cell of a value: numbers as values (with the style
+    attribute given, e.g. ' s="2"'), everything else as text, inline or in strings.
+    """
+    if value is None:
+        return "<c/>"
+    if isinstance(value, str):
+        if strings is not None:
+            return f'<c t="s"><v>{strings.add(value)}</v></c>'
+        return f'<c t="inlineStr"><is>{_text_element(value)}</is></c>'
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, np.integer)):
+        return f"<c{style}><v>{int(value)}</v></c>"
+    if isinstance(value, (float, np.floating)):
+        return f"<c{style}><v>{float(value)!r}</v></c>" if math.isfinite(value) else "<c/>"
+    return cell(str(value), strings)
+
+
+def category_cells(series, strings=None, style=""):
+    """
+    Renders each category of a categorical column once and counts every use of its
+    shared strings in strings. Returns: an array of cell strings indexed by the
+    column's codes, whose last entry (code -1) is the empty cell of missing values
+    """
+    count = strings.count if strings is not None else 0
+    rendered = np.array([cell(value, strings, style) for value in series.cat.categories] + ["<c/>"], dtype=object)
+    if strings is not None:
+        shared = np.array([text.startswith('<c t="s">') for text in rendered])
+        strings.count = count + int(np.count_nonzero(shared[series.cat.codes.to_numpy()]))
+    return rendered
+
+
+def column_cells(series, strings=None, style="", categories=None):
+    """
+    Returns the cell strings of a column. A categorical column is indexed into
+    categories, its category_cells(), which callers writing the column in chunks
+    render once for the whole column; otherwise they are rendered here.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if categories is None:
+            categories = category_cells(series, strings, style)
+        return categories[series.cat.codes.to_numpy()].tolist()
+    return [cell(value, strings, style) for value in series.to_numpy(dtype=object, na_value=None)]
+
+
+def header_row(columns):
+    cells = "".join(f'<c t="inlineStr" s="1"><is>{_text_element(str(column))}</is></c>' for column in columns)
+    return f'<row r="1">{cells}</row>'
+
+
+def rows_xml(columns, first_row):
+    """Joins column cell lists into <row> elements numbered from first_row"""
+    return "".join(f'<row r="{number}">{"".join(row)}</row>'
+                   for number, row in enumerate(zip(*columns), start=first_row))
+
+
+def use_shared_strings(series, mode="auto", max_ratio=SHARED_STRINGS_MAX_RATIO):
+    """Decides whether a column's text goes into the shared strings table"""
+    if mode != "auto":
+        return mode == "shared"
+    if not len(series) or pd.api.types.is_numeric_dtype(series.dtype):
+        return False
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        distinct = len(series.cat.categories)
+    else:
+        try:
+            distinct = series.nunique()
+        except TypeError:  # Unhashable values
+            return False
+    return distinct <= max_ratio * len(series)
+
+
+# --- Styles ---
+
+def style_ids(number_formats):
+    """Returns {format code: cell style id} for the codes used in number_formats ({column: code})"""
+    return {code: position for position, code in enumerate(dict.fromkeys(number_formats.values()), start=2)}
+
+
+def styles_xml(number_formats=None):
+    """
+    Returns styles.xml: style 0 is the default, style 1 the header (bold, thin border,
+    centred, as the other engines write it) and style_ids() the number formats.
+    """
+    codes = list(style_ids(number_formats or {}))
+    custom = [code for code in codes if code not in BUILTIN_NUMBER_FORMATS]
+    format_ids = dict(BUILTIN_NUMBER_FORMATS, **{code: 164 + position for position, code in enumerate(custom)})
+    num_fmts = ""
+    if custom:
+        num_fmts = (f'<numFmts count="{len(custom)}">'
+                    + "".join(f'<numFmt numFmtId="{format_ids[code]}" formatCode={quoteattr(code)}/>'
+                              for code in custom) + "</numFmts>")
+    number_xfs = "".join(f'<xf numFmtId="{format_ids[code]}" fontId="0" fillId="0" borderId="0" xfId="0" '
+                         'applyNumberFormat="1"/>' for code in codes)
+    return (
+        f'{_XML_DECLARATION}<styleSheet xmlns="{_MAIN_NS}">{num_fmts}'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>'
+        '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/>'
+        '</border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        f'<cellXfs count="{2 + len(codes)}"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" '
+        f'applyAlignment="1"><alignment horizontal="center" vertical="top"/></xf>{number_xfs}</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    )
+
+
+def column_styles(columns, number_formats=None):
+    """Returns the style attribute of each column's numeric cells"""
+    ids = style_ids(number_formats or {})
+    return [f' s="{ids[number_formats[column]]}"' if number_formats and column in number_formats else ""
+            for column in columns]
+
+
+# --- Package ---
+
+def package_parts(titles, number_formats=None, shared_strings=None):
+    """Returns the workbook, styles, relationship and content-type parts for sheets with the given titles"""
+    count = len(titles)
+    sheets = "".join(f'<sheet name={quoteattr(title)} sheetId="{number}" r:id="rId{number}"/>'
+                     for number, title in enumerate(titles, start=1))
+    workbook = (f'{_XML_DECLARATION}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_RELATIONSHIP}">'
+                f'<sheets>{sheets}</sheets></workbook>')
+    relationships = "".join(f'<Relationship Id="rId{number}" Type="{_RELATIONSHIP}/worksheet" '
+                            f'Target="worksheets/sheet{number}.xml"/>' for number in range(1, count + 1))
+    relationships += f'<Relationship Id="rId{count + 1}" Type="{_RELATIONSHIP}/styles" Target="styles.xml"/>'
+    overrides = "".join(f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+                        f'ContentType="{_CONTENT_TYPE}.worksheet+xml"/>' for number in range(1, count + 1))
+    parts = {"xl/styles.xml": styles_xml(number_formats)}
+    if shared_strings is not None and len(shared_strings):
+        relationships += (f'<Relationship Id="rId{count + 2}" Type="{_RELATIONSHIP}/sharedStrings" '
+                          'Target="sharedStrings.xml"/>')
+        overrides += f'<Override PartName="/xl/sharedStrings.xml" ContentType="{_CONTENT_TYPE}.sharedStrings+xml"/>'
+        parts["xl/sharedStrings.xml"] = shared_strings.to_xml()
+    parts.update({
+        "[Content_Types].xml": (
+            f'{_XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Override PartName="/xl/workbook.xml" ContentType="{_CONTENT_TYPE}.sheet.main+xml"/>'
+            f'<Override PartName="/xl/styles.xml" ContentType="{_CONTENT_TYPE}.styles+xml"/>'
+            f'{overrides}</Types>'),
+        "_rels/.rels": (f'{_XML_DECLARATION}<Relationships xmlns="{_PACKAGE_RELS_NS}">'
+                        f'<Relationship Id="rId1" Type="{_RELATIONSHIP}/officeDocument" Target="xl/workbook.xml"/>'
+                        '</Relationships>'),
+        "xl/workbook.xml": workbook,
+        "xl/_rels/workbook.xml.rels": f'{_XML_DECLARATION}<Relationships xmlns="{_PACKAGE_RELS_NS}">'
+                                      f'{relationships}</Relationships>',
+    })
+    return parts
+
+
+def open_package(output, compression_level=DEFAULT_COMPRESSION_LEVEL):
+    """Opens the zip container of an xlsx package for writing"""
+    if compression_level == 0:
+        return zipfile.ZipFile(output, "w", zipfile.ZIP_STORED)
+    return zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED, compresslevel=compression_level)
+
+
+def finish_package(package, titles, number_formats=None, shared_strings=None):
+    """Writes the parts that describe the sheets already in package; adds an empty sheet if there are none"""
+    if not titles:  # A workbook needs at least one sheet
+        titles = ["Sheet1"]
+        package.writestr("xl/worksheets/sheet1.xml", SHEET_START + SHEET_END)
+    for name, content in package_parts(titles, number_formats, shared_strings).items():
+        package.writestr(name, content)
+
+
+def write_workbook(sheets, output, strings="auto", number_formats=None,
+                   compression_level=DEFAULT_COMPRESSION_LEVEL):
+    """
+    Writes (title, DataFrame) pairs as an xlsx workbook, streaming each sheet into the
+    package in chunks of CHUNK_ROWS rows.
+    strings is one of STRING_MODES; in "auto" mode each column is written with shared
+    strings when its values repeat (see use_shared_strings) and inline otherwise.
+    number_formats maps column names to Excel number format codes for their numbers.
+    Returns: {sheet title: {column: "shared" or "inline"}} for the text columns
+    """
+    if strings not in STRING_MODES:
+        raise ValueError(f"Unknown string mode: {strings}")
+    shared_strings = SharedStrings()
+    titles, modes = [], {}
+    with open_package(output, compression_level) as package:
+        for title, df in sheets:
+            titles.append(title)
+            shared = [use_shared_strings(df[column], strings) for column in df.columns]
+            modes[title] = {column: "shared" if use else "inline" for column, use in zip(df.columns, shared)
+                            if not pd.api.types.is_numeric_dtype(df[column].dtype)}
+            styles = column_styles(df.columns, number_formats)
+            categories = [category_cells(df[column], shared_strings if use else None, style)
+                          if isinstance(df[column].dtype, pd.CategoricalDtype) else None
+                          for column, use, style in zip(df.columns, shared, styles)]
+            with package.open(f"xl/worksheets/sheet{len(titles)}.xml", "w", force_zip64=True) as sheet:
+                sheet.write((SHEET_START + header_row(df.columns)).encode("utf-8"))
+                for start in range(0, len(df), CHUNK_ROWS):
+                    chunk = df.iloc[start:start + CHUNK_ROWS]
+                    columns = [column_cells(chunk[column], shared_strings if use else None, style, rendered)
+                               for column, use, style, rendered in zip(chunk.columns, shared, styles, categories)]
+                    sheet.write(rows_xml(columns, start + 2).encode("utf-8"))
+                sheet.write(SHEET_END.encode("utf-8"))
+        finish_package(package, titles, number_formats, shared_strings)
+    return modes
@@ -1,55 +1,195 @@
+import time
+
+_IMPORTS_STARTED = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
 import json
-from io import BytesIO
 
-# Import conversion function from gstr1_converter.py
-from gstr1_converter import get_all_sections_from_json
+# Import conversion functions from gstr1_converter.py
+from gstr1_converter import OUTPUT_FORMATS, get_all_sections_from_json, merge_returns, section_slug, write_excel
+from gstr1_cache import ConversionCache, content_digest
+from gstr1_metrics import ConversionMetrics
+from gstr1_pool import WarmPool, start_metrics_endpoint
+
+# Only the first run of the script in a server process actually imports anything
+_IMPORT_SECONDS = time.perf_counter() - _IMPORTS_STARTED
 
 # Set page config
 st.set_page_config(page_title="GSTR-1 JSON to Excel", layout="wide")
 
+# Rows shown in each section preview
+PREVIEW_ROWS = 100
+
+# Excel writer of the downloads: shared strings for repetitive columns, formatted amounts
+EXCEL_ENGINE = "optimized"
+
+# Per-section download formats: (file extension, mime type)
+SECTION_FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "Excel": (".xlsx", OUTPUT_FORMATS["xlsx"][2]),
+}
+
+
+@st.cache_resource
+def get_conversion_cache():
+    """One conversion cache per server process, shared by all sessions"""
+    return ConversionCache()
+
+
+@st.cache_resource
+def get_worker_pool(_import_seconds):
+    """
+    One pre-warmed conversion pool per server process, shared by all sessions.
+    It is created on the first page load, so its workers warm up while the first
+    user picks a file; the startup, warm-up and first request times are logged.
+    """
+    pool = WarmPool()
+    pool.record_startup(_import_seconds)
+    start_metrics_endpoint(pool)
+    return pool
+
+
+def show_summary(row_counts):
+    """Shows the conversion summary from {sheet name: row count}"""
+    st.subheader("📄 Conversion Summary")
+    col1, col2 = st.columns(2)
+    total_sheets = len(row_counts)
+    non_empty_sheets = sum(1 for count in row_counts.values() if count)
+    col1.metric("Total Sheets", total_sheets)
+    col1.metric("Non-empty Sheets", non_empty_sheets)
+    col2.info(f"Sections: {', '.join(f'{name} ({count:,})' for name, count in row_counts.items())}")
+
+
+def section_file(df, sheet_name, section_format):
+    """Returns one section as CSV or single-sheet xlsx bytes"""
+    if section_format == "CSV":
+        return df.to_csv(index=False).encode("utf-8")
+    return write_excel({sheet_name: df}, engine=EXCEL_ENGINE).getvalue()
+
+
+def show_section(cache, digest, kind, sheet_name, df, section_format):
+    """
+    Shows a preview of a finished section with a download of just that section.
+    kind is the cache kind of the section frames ("sections" or the GSTIN/period-tagged
+    "tagged-sections"), so each variant of the download is cached on its own.
+    """
+    with st.expander(f"{sheet_name} ({len(df):,} rows)"):
+        st.dataframe(df.head(PREVIEW_ROWS), hide_index=True)
+        extension, mime = SECTION_FORMATS[section_format]
+        data = cache.get_or_create(digest, f"section-{kind}-{section_format}-{sheet_name}",
+                                   lambda: section_file(df, sheet_name, section_format))
+        st.download_button(
+            label=f"📥 Download {sheet_name} ({section_format})",
+            data=data,
+            file_name=f"{section_slug(sheet_name)}{extension}",
+            mime=mime,
+            key=f"section-{sheet_name}",
+        )
+
+
+def show_timings(metrics):
+    """Shows the per-stage timing breakdown and any sections that failed to extract"""
+    for event in metrics.errors():
+        st.warning(f"⚠️ {event['section'] or event['stage']} was skipped: {event['error']}")
+    stages = metrics.stages()
+    if not stages:
+        return  # Everything came from the cache
+    import pandas as pd  # Not at startup: the app's imports are timed as the server's cold start
+
+    with st.expander(f"⏱️ Timing breakdown ({metrics.total_seconds():.2f}s)"):
+        timings = pd.DataFrame(stages).drop(columns="type")
+        st.dataframe(timings, hide_index=True)
+        st.download_button("Download metrics (JSON)", metrics.to_json(indent=2),
+                           file_name="conversion_metrics.json", mime="application/json")
+
+
 # Title and description
 st.title("📊 GSTR-1 JSON to Excel Converter")
 st.markdown("""
 Upload your **GSTR-1 JSON file** (downloaded from the GST Portal) and get an **Excel file** with each section in separate sheets.
 """)
 
+pool = get_worker_pool(_IMPORT_SECONDS)
+
 # File upload
 uploaded_file = st.file_uploader("Choose a GSTR-1 JSON file", type=["json"])
 
+# Output format: Excel, or columnar files for analytics/warehouse loads
+output_format = st.selectbox(
+    "Output format",
+    list(OUTPUT_FORMATS),
+    format_func=lambda name: OUTPUT_FORMATS[name][0],
+)
+section_format = st.selectbox("Section downloads", list(SECTION_FORMATS))
+
 if uploaded_file is not None:
     try:
-        # Load JSON data from uploaded file
-        json_data = json.load(uploaded_file)
-
-        # Extract all sections into DataFrames
-        dfs = get_all_sections_from_json(json_data)
-
-        # Show summary of extracted data
-        st.subheader("📄 Conversion Summary")
-        col1, col2 = st.columns(2)
-        total_sheets = len(dfs)
-        non_empty_sheets = sum(1 for df in dfs.values() if not df.empty)
-        col1.metric("Total Sheets", total_sheets)
-        col1.metric("Non-empty Sheets", non_empty_sheets)
-        col2.info(f"Sections: {', '.join(dfs.keys())}")
-
-        # Generate Excel file in memory
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            for sheet_name, df in dfs.items():
-                if not df.empty:
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-        output.seek(0)
-
-        # Add download button
-        st.download_button(
-            label="📥 Download Excel File",
-            data=output.getvalue(),
-            file_name="converted_gstr1.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        # Results are cached by the hash of the uploaded bytes, so reruns and
+        # re-uploads of the same return skip parsing and writing entirely
+        with pool.request():
+            cache = get_conversion_cache()
+            digest = content_digest(uploaded_file.getbuffer())
+            metrics = ConversionMetrics()
+
+            # Extract all sections into DataFrames and show a summary of them.
+            # Columnar formats carry the return's GSTIN and period on every row.
+            kind = "sections" if output_format == "xlsx" else "tagged-sections"
+            dfs = cache.get(digest, kind)
+            if dfs is not None:
+                show_summary({sheet_name: len(df) for sheet_name, df in dfs.items()})
+                download_slot = st.empty()
+                for sheet_name, df in dfs.items():
+                    show_section(cache, digest, kind, sheet_name, df, section_format)
+            elif output_format == "xlsx":
+                # Row counts come before any extraction, so the summary shows up immediately
+                sections = get_all_sections_from_json(uploaded_file, lazy=True, metrics=metrics)
+                row_counts = sections.row_counts()
+                show_summary(row_counts)
+                download_slot = st.empty()
+
+                # Sections are extracted in order; each one is shown with its own
+                # download as soon as it is done, while the bar tracks rows overall
+                total_rows = max(1, sum(row_counts.values()))
+                finished_rows = 0
+                progress_bar = st.progress(0.0, text="Extracting sections...")
+
+                def report(sheet_name, done, total):
+                    progress_bar.progress(min(1.0, (finished_rows + done) / total_rows),
+                                          text=f"Extracting {sheet_name}: {done:,} of {total:,} rows")
+
+                dfs = {}
+                for sheet_name, df in sections.iter_frames(progress=report):
+                    dfs[sheet_name] = df
+                    finished_rows += row_counts[sheet_name]
+                    show_section(cache, digest, kind, sheet_name, df, section_format)
+                progress_bar.progress(1.0, text=f"Extracted {len(dfs)} sections")
+                cache.put(digest, kind, dfs)
+            else:
+                with st.spinner("Extracting sections..."):
+                    dfs = merge_returns([uploaded_file], metrics=metrics)
+                show_summary({sheet_name: len(df) for sheet_name, df in dfs.items()})
+                download_slot = st.empty()
+                for sheet_name, df in dfs.items():
+                    show_section(cache, digest, kind, sheet_name, df, section_format)
+                cache.put(digest, kind, dfs)
+
+            # The download file is written in the warm pool from the extracted sections
+            label, extension, mime = OUTPUT_FORMATS[output_format]
+            output = cache.get(digest, output_format)
+            if output is None:
+                with st.spinner(f"Writing {label}..."):
+                    output, events = pool.write(dfs, output_format, EXCEL_ENGINE)
+                metrics.merge(events)
+                cache.put(digest, output_format, output)
+            show_timings(metrics)
+
+            # Add download button, above the section previews
+            download_slot.download_button(
+                label=f"📥 Download {label}",
+                data=output,
+                file_name=f"converted_gstr1{extension}",
+                mime=mime
+            )
 
     except json.JSONDecodeError:
         st.error("❌ Invalid JSON file. Please ensure it's a valid GSTR-1 JSON file.")
@@ -0,0 +1,35 @@
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gstr1_synthetic import generate_gstr1  # noqa: E402
+
+
+def assert_sections_equal(expected, actual):
+    """Asserts two {sheet name: DataFrame} dicts hold the same sheets, in order, with equal frames"""
+    assert list(expected) == list(actual)
+    for sheet_name in expected:
+        pd.testing.assert_frame_equal(expected[sheet_name], actual[sheet_name], obj=sheet_name)
+
+
+@pytest.fixture(scope="session")
+def gstr1_document():
+    """A synthetic return with every section, small enough to convert in well under a second"""
+    return generate_gstr1(suppliers=20, invoices_per_supplier=10, seed=1)
+
+
+@pytest.fixture(scope="session")
+def gstr1_bytes(gstr1_document):
+    return json.dumps(gstr1_document).encode("utf-8")
+
+
+@pytest.fixture
+def gstr1_path(tmp_path, gstr1_bytes):
+    path = tmp_path / "gstr1.json"
+    path.write_bytes(gstr1_bytes)
+    return path
@@ -0,0 +1,45 @@
+from gstr1_amendments import (AMENDED, AMENDED_UNMATCHED, AMENDMENT_COLUMN, AMENDS_COLUMN, ORIGINAL,
+                              resolve_amendments)
+from gstr1_converter import SCHEMAS_BY_KEY, get_all_sections_from_json, schema_columns
+
+
+def _invoice(number, value, original=None):
+    invoice = {"inum": number, "idt": "01-04-2024", "pos": "29", "rchrg": "N", "val": value,
+               "itms": [{"num": 1, "itm_det": {"rt": 18, "txval": value / 1.18, "iamt": value - value / 1.18}}]}
+    if original is not None:
+        invoice["oinum"] = original
+        invoice["oidt"] = "01-03-2024"
+    return invoice
+
+
+def _return(invoices, amended_invoices=()):
+    document = {"gstin": "27AAAAA0000A1Z5", "fp": "042024",
+                "b2b": [{"ctin": "29BBBBB0000B1Z5", "inv": list(invoices)}]}
+    if amended_invoices:
+        document["amend_b2b"] = [{"ctin": "29BBBBB0000B1Z5", "inv": list(amended_invoices)}]
+    return document
+
+
+def test_amended_sheets_append_the_original_document_columns(gstr1_document):
+    dfs = get_all_sections_from_json(gstr1_document)
+    original, amended = SCHEMAS_BY_KEY["b2b"], SCHEMAS_BY_KEY["amend_b2b"]
+    assert schema_columns(amended) == schema_columns(original) + ["Original Invoice Number", "Original Invoice Date"]
+    assert list(dfs[amended.sheet_name].columns) == schema_columns(amended)
+
+
+def test_resolve_amendments_replaces_the_amended_documents():
+    earlier = get_all_sections_from_json(_return([_invoice("INV-0", 59.0)]))
+    dfs = get_all_sections_from_json(_return(
+        [_invoice("INV-1", 118.0), _invoice("INV-2", 236.0)],
+        [_invoice("INV-1A", 177.0, original="INV-1"), _invoice("INV-0A", 118.0, original="INV-0"),
+         _invoice("INV-9A", 10.0, original="INV-9")]))
+
+    view = resolve_amendments(dfs, history=[earlier])["B2B Net Effective"]
+
+    assert view["Invoice Number"].tolist() == ["INV-1A", "INV-2", "INV-0A", "INV-9A"]
+    assert view[AMENDMENT_COLUMN].tolist() == [AMENDED, ORIGINAL, AMENDED, AMENDED_UNMATCHED]
+    assert view[AMENDS_COLUMN][[0, 2, 3]].tolist() == ["INV-1", "INV-0", "INV-9"]
+    assert view[AMENDS_COLUMN].isna()[1]
+    changes = view["Invoice Value Change"]
+    assert changes[0] == 59.0 and changes[2] == 59.0
+    assert changes[[1, 3]].isna().all()
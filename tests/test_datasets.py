@@ -0,0 +1,40 @@
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from gstr1_converter import convert_gstr1_json_to_excel_bytes
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+# Portal and third-party exports mix text and numeric codes and document numbers
+MIXED_TYPES = {
+    "gstin": "27AAAAA0000A1Z5", "fp": "042024",
+    "b2b": [{"ctin": "29BBBBB0000B1Z5", "inv": [
+        {"inum": "INV-1", "pos": "29", "val": 118.0, "itms": [{"itm_det": {"rt": 18, "txval": 100.0, "iamt": 18.0}}]},
+        {"inum": 2, "pos": 29, "val": 59.0, "itms": [{"itm_det": {"rt": 18, "txval": 50.0, "iamt": 9.0}}]},
+    ]}],
+    "hsn": {"data": [{"hsn_sc": "1001", "txval": 100.0}, {"hsn_sc": 1002, "txval": 50.0}]},
+}
+
+
+def _read_tables(output, output_format):
+    tables = {}
+    with zipfile.ZipFile(output) as archive:
+        for name in archive.namelist():
+            data = BytesIO(archive.read(name))
+            table = pq.read_table(data) if output_format == "parquet" else pa.ipc.open_file(data).read_all()
+            tables[name.split("/")[0]] = table.to_pydict()
+    return tables
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+def test_mixed_type_columns_are_written_as_text(output_format):
+    output = convert_gstr1_json_to_excel_bytes(MIXED_TYPES, output_format=output_format)
+
+    tables = _read_tables(output, output_format)
+    assert tables["hsn_summary"]["HSN Code"] == ["1001", "1002"]
+    assert tables["b2b_invoices"]["Invoice Number"] == ["INV-1", "2"]
+    assert tables["b2b_invoices"]["Place of Supply"] == ["29", "29"]
+    assert tables["b2b_invoices"]["Invoice Value"] == [118.0, 59.0]
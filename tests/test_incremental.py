@@ -0,0 +1,50 @@
+import copy
+
+import openpyxl
+import pytest
+
+from conftest import assert_sections_equal
+from gstr1_converter import get_all_sections_from_json
+from gstr1_incremental import CHANGES_SHEET, build_index, convert_incremental, update_index
+
+
+@pytest.fixture
+def updated_document(gstr1_document):
+    """The synthetic return with an invoice modified, removed and added, a supplier removed and a note changed"""
+    document = copy.deepcopy(gstr1_document)
+    document["b2b"][3]["inv"][5]["val"] += 100
+    del document["b2b"][7]["inv"][2]
+    document["b2b"][9]["inv"].append(dict(document["b2b"][9]["inv"][0], inum="NEW/1"))
+    del document["b2b"][11]
+    document["cdnr"][0]["nt"][0]["val"] = 1
+    return document
+
+
+def test_update_equals_a_full_conversion(gstr1_document, updated_document):
+    index, changes = update_index(build_index(gstr1_document), updated_document)
+
+    assert_sections_equal(get_all_sections_from_json(updated_document), index.frames)
+    assert 0 < index.last_update["extracted_rows"] < sum(len(frame) for frame in index.frames.values())
+    assert set(changes["Change"]) == {"Added", "Removed", "Modified"}
+    modified = changes[changes["Change"] == "Modified"]
+    assert gstr1_document["b2b"][3]["inv"][5]["inum"] in set(modified["Document Number"])
+    assert "NEW/1" in set(changes.loc[changes["Change"] == "Added", "Document Number"])
+
+
+def test_unchanged_return_extracts_nothing(gstr1_document):
+    index, _ = update_index(build_index(gstr1_document), gstr1_document)
+    index, changes = update_index(index, copy.deepcopy(gstr1_document))
+    assert len(changes) == 0
+    assert index.last_update["extracted_rows"] == 0
+
+
+def test_another_return_is_rejected(gstr1_document):
+    other = dict(gstr1_document, gstin="29BBBBB0000B1Z5")
+    with pytest.raises(ValueError):
+        update_index(build_index(gstr1_document), other)
+
+
+def test_workbook_ends_with_the_changes_sheet(gstr1_document, updated_document):
+    output, _, changes = convert_incremental(updated_document, build_index(gstr1_document))
+    assert openpyxl.load_workbook(output).sheetnames[-1] == CHANGES_SHEET
+    assert len(changes)
@@ -0,0 +1,40 @@
+import json
+from io import BytesIO
+
+import pytest
+
+from gstr1_converter import convert_gstr1_json_to_excel_bytes, get_all_sections_from_json, merge_returns
+
+INVALID = b'{"gstin": "27AAAAA0000A1Z5", "b2b": [{"ctin": "29BBBBB0000B1Z5", "inv": [{"inum": '
+
+INPUT_MODES = {
+    "text": lambda path: INVALID.decode("utf-8"),
+    "bytes": lambda path: INVALID,
+    "path-streamed": lambda path: path,
+    "path-mapped": lambda path: path,
+    "file-streamed": lambda path: open(path, "rb"),
+    "upload": lambda path: BytesIO(INVALID),
+}
+
+ENTRY_POINTS = {
+    "sections": lambda data, stream: get_all_sections_from_json(data, stream=stream),
+    "lazy": lambda data, stream: get_all_sections_from_json(data, lazy=True),
+    "xlsx": lambda data, stream: convert_gstr1_json_to_excel_bytes(data, stream=stream),
+    "dataset": lambda data, stream: convert_gstr1_json_to_excel_bytes(data, stream=stream, output_format="csv.gz"),
+    "merge": lambda data, stream: merge_returns([data], stream=stream),
+}
+
+
+@pytest.mark.parametrize("entry_point", ENTRY_POINTS)
+@pytest.mark.parametrize("input_mode", INPUT_MODES)
+def test_invalid_json_raises_json_decode_error(tmp_path, input_mode, entry_point):
+    path = tmp_path / "invalid.json"
+    path.write_bytes(INVALID)
+    data = INPUT_MODES[input_mode](path)
+    stream = {"path-mapped": False, "path-streamed": True, "file-streamed": True}.get(input_mode)
+    try:
+        with pytest.raises(json.JSONDecodeError):
+            ENTRY_POINTS[entry_point](data, stream)
+    finally:
+        if hasattr(data, "close"):
+            data.close()
@@ -0,0 +1,14 @@
+from conftest import assert_sections_equal
+from gstr1_converter import get_all_sections_from_json
+
+
+def test_iter_frames_reports_progress_and_matches_eager(gstr1_document):
+    calls = []
+    sections = get_all_sections_from_json(gstr1_document, lazy=True)
+    row_counts = sections.row_counts()
+    frames = dict(sections.iter_frames(progress=lambda *args: calls.append(args), chunk_records=50))
+
+    assert_sections_equal(get_all_sections_from_json(gstr1_document), frames)
+    assert {sheet_name: len(df) for sheet_name, df in frames.items()} == row_counts
+    last = {sheet_name: (done, total) for sheet_name, done, total in calls}
+    assert all(done == total == row_counts[sheet_name] for sheet_name, (done, total) in last.items())
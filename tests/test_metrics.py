@@ -0,0 +1,41 @@
+import threading
+
+from gstr1_metrics import ConversionMetrics
+
+
+def test_metrics_keep_totals_beyond_max_events():
+    metrics = ConversionMetrics(max_events=3)
+    metrics.record("startup", 1.5)
+    for _ in range(10):
+        with metrics.stage("request"):
+            pass
+    metrics.merge([{"type": "stage", "stage": "write", "section": "xlsx", "seconds": 0.25, "output_rows": 7}])
+
+    assert len(metrics.events) == 3
+    exported = metrics.to_prometheus()
+    assert 'gstr1_stage_runs_total{stage="request"} 10' in exported
+    assert 'gstr1_stage_seconds_total{stage="startup"} 1.5' in exported
+    assert 'gstr1_output_rows_total{stage="write",section="xlsx"} 7' in exported
+
+
+def test_readers_are_safe_while_other_threads_record():
+    metrics = ConversionMetrics(max_events=50)
+    stop = threading.Event()
+
+    def record():
+        while not stop.is_set():
+            metrics.record("request", 0.001, output_rows=1)
+            metrics.error("request", "failed")
+
+    writer = threading.Thread(target=record)
+    writer.start()
+    try:
+        for _ in range(2000):
+            metrics.stages()
+            metrics.errors()
+            metrics.to_dict()
+            metrics.to_prometheus()
+    finally:
+        stop.set()
+        writer.join()
+    assert len(metrics.snapshot()) == 50
@@ -0,0 +1,24 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from conftest import assert_sections_equal
+from gstr1_converter import convert_gstr1_json_to_excel_bytes, get_all_sections_from_json
+from gstr1_parallel import convert_parallel, extract_frames_parallel
+
+
+def _read_excel(output):
+    return pd.read_excel(BytesIO(output.getvalue()), sheet_name=None)
+
+
+@pytest.mark.parametrize("shard_records", [1, 17, 100000], ids=["block-shards", "small-shards", "one-shard"])
+def test_parallel_extraction_equals_serial(gstr1_document, shard_records):
+    expected = get_all_sections_from_json(gstr1_document)
+    assert_sections_equal(expected, extract_frames_parallel(gstr1_document, workers=2, shard_records=shard_records))
+
+
+def test_parallel_workbook_equals_serial(gstr1_bytes):
+    expected = convert_gstr1_json_to_excel_bytes(gstr1_bytes)
+    actual = convert_parallel(gstr1_bytes, workers=2, shard_records=17)
+    assert_sections_equal(_read_excel(expected), _read_excel(actual))
@@ -0,0 +1,39 @@
+import os
+import signal
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from conftest import assert_sections_equal
+from gstr1_converter import convert_gstr1_json_to_excel_bytes, get_all_sections_from_json
+from gstr1_metrics import ConversionMetrics
+from gstr1_pool import WarmPool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = WarmPool(workers=1, metrics=ConversionMetrics())
+    assert pool.wait_ready(timeout=120)
+    yield pool
+    pool.shutdown()
+
+
+def _read_excel(data):
+    return pd.read_excel(BytesIO(data), sheet_name=None)
+
+
+def test_write_matches_a_full_conversion(pool, gstr1_document):
+    output, events = pool.write(get_all_sections_from_json(gstr1_document), "xlsx", "optimized")
+
+    expected = convert_gstr1_json_to_excel_bytes(gstr1_document, engine="optimized").getvalue()
+    assert_sections_equal(_read_excel(expected), _read_excel(output))
+    assert [event["stage"] for event in events] == ["write"]
+
+
+def test_a_dead_worker_is_replaced(pool, gstr1_document):
+    os.kill(pool._run(os.getpid), signal.SIGKILL)
+
+    output, _ = pool.write(get_all_sections_from_json(gstr1_document))
+    assert output[:2] == b"PK"
+    assert [event["stage"] for event in pool.metrics.errors()] == ["pool"]
@@ -0,0 +1,78 @@
+import copy
+
+import pytest
+
+from gstr1_converter import get_all_sections_from_json
+from gstr1_reconcile import DISCREPANCY_SHEET, add_discrepancy_sheet, reconcile
+from gstr1_synthetic import generate_gstr1
+
+
+def _reconcile(document):
+    return reconcile(get_all_sections_from_json(document))
+
+
+def _statuses(report):
+    return {(check["check"], check["section"]): check["status"] for check in report.checks}
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_synthetic_return_reconciles_clean(seed):
+    report = _reconcile(generate_gstr1(suppliers=20, invoices_per_supplier=10, seed=seed))
+    assert report.ok, report.discrepancies.to_string()
+    assert len(report.discrepancies) == 0
+    assert set(_statuses(report).values()) == {"ok"}
+
+
+def test_document_value_mismatch_is_flagged(gstr1_document):
+    document = copy.deepcopy(gstr1_document)
+    invoice = document["b2b"][2]["inv"][3]
+    invoice["val"] += 500
+
+    report = _reconcile(document)
+    assert not report.ok
+    assert _statuses(report)[("Document value", "B2B Invoices")] == "mismatch"
+    found = report.discrepancies
+    assert found["Document"].tolist() == [invoice["inum"]]
+    assert found["Recipient GSTIN"].tolist() == [document["b2b"][2]["ctin"]]
+    assert found["Difference"].tolist() == [pytest.approx(500)]
+
+
+def test_hsn_tax_mismatch_is_flagged(gstr1_document):
+    document = copy.deepcopy(gstr1_document)
+    document["hsn"]["data"][0]["iamt"] += 250
+
+    report = _reconcile(document)
+    assert _statuses(report)[("HSN summary totals", "HSN Summary")] == "mismatch"
+    found = report.discrepancies
+    assert found["Field"].tolist() == ["IGST"]
+    assert found["Difference"].tolist() == [pytest.approx(250, abs=0.01)]
+
+
+def test_documents_issued_count_mismatch_is_flagged(gstr1_document):
+    document = copy.deepcopy(gstr1_document)
+    series = next(series for series in document["doc_issue"]["doc_det"] if series["doc_num"] == 5)["docs"][0]
+    series["totnum"] += 2
+    series["net_issue"] += 2
+
+    report = _reconcile(document)
+    statuses = _statuses(report)
+    assert statuses[("Document series", "Document Issued Summary")] == "ok"
+    assert statuses[("Documents issued", "Document Issued Summary")] == "mismatch"
+    found = report.discrepancies
+    assert found["Field"].tolist() == ["Net Issued (Credit Notes)"]
+    assert found["Difference"].tolist() == [2]
+
+
+def test_inconsistent_document_series_is_flagged(gstr1_document):
+    document = copy.deepcopy(gstr1_document)
+    document["doc_issue"]["doc_det"][0]["docs"][0]["cancel"] = 3
+
+    report = _reconcile(document)
+    assert _statuses(report)[("Document series", "Document Issued Summary")] == "mismatch"
+
+
+def test_discrepancy_sheet_is_added(gstr1_document):
+    dfs = get_all_sections_from_json(gstr1_document)
+    sheets = add_discrepancy_sheet(dfs, reconcile(dfs))
+    assert list(sheets) == list(dfs) + [DISCREPANCY_SHEET]
+    assert DISCREPANCY_SHEET not in dfs
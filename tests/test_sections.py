@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from gstr1_converter import RECORD_TYPES, SCHEMAS_BY_KEY, SectionBuffer, get_all_sections_from_json
+from gstr1_metrics import ConversionMetrics
+
+B2B = [{"ctin": "29BBBBB0000B1Z5", "inv": [
+    {"inum": "A1", "idt": "01-04-2024", "pos": "29", "rchrg": "N", "val": 230.0, "itms": [
+        {"num": 1, "itm_det": {"rt": 18, "txval": 100.0, "iamt": 18.0}},
+        {"num": 2, "itm_det": {"rt": 12, "txval": 100.0, "iamt": 12.0, "csamt": 1.0}}]},
+    {"inum": "A2", "idt": "02-04-2024", "pos": "29", "rchrg": "N", "itms": [
+        {"num": 1, "itm_det": {"rt": 5, "txval": 40.0, "iamt": 2.0}}]},
+]}]
+
+
+def test_section_totals_and_value_fallback():
+    df = get_all_sections_from_json({"b2b": B2B})["B2B Invoices"]
+
+    assert df["Recipient GSTIN"].tolist() == ["29BBBBB0000B1Z5"] * 2
+    assert df["Taxable Value"].tolist() == [200.0, 40.0]
+    assert df["Total IGST"].tolist() == [30.0, 2.0]
+    assert df["Total CESS"].tolist() == [1.0, 0.0]
+    assert df["Invoice Value"].tolist() == [230.0, 42.0]  # A2 declares no value: the sum of its totals
+
+
+def test_section_dtypes_are_fixed():
+    df = get_all_sections_from_json({"b2b": B2B})["B2B Invoices"]
+
+    for column in ("Recipient GSTIN", "Place of Supply", "Reverse Charge"):
+        assert isinstance(df[column].dtype, pd.CategoricalDtype), column
+    for column in ("Taxable Value", "Total IGST", "Invoice Value"):
+        assert df[column].dtype == np.float64, column
+    assert df["Invoice Number"].dtype == object
+
+
+def test_buffer_records_and_item_frame():
+    buffer = SectionBuffer(SCHEMAS_BY_KEY["b2b"], item_rates=True)
+    buffer.extend_section(B2B)
+
+    first = buffer.records()[0]
+    assert isinstance(first, RECORD_TYPES["B2B Invoices"])
+    assert (first.invoice_number, first.taxable_value, first.invoice_value) == ("A1", 200.0, 230.0)
+    items = buffer.item_frame()
+    assert list(zip(items["Invoice Number"], items["Rate"], items["Taxable Value"])) == [
+        ("A1", 12.0, 100.0), ("A1", 18.0, 100.0), ("A2", 5.0, 40.0)]
+
+
+def test_bad_section_is_dropped_with_an_error():
+    metrics = ConversionMetrics()
+    dfs = get_all_sections_from_json({"b2b": B2B, "b2cl": [{"inum": "L1", "val": 1.0, "itms": ["x"]}]},
+                                     metrics=metrics)
+
+    assert list(dfs) == ["B2B Invoices"]
+    assert [(event["stage"], event["section"]) for event in metrics.errors()] == [
+        ("extract", "B2C Large Invoices")]
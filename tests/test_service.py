@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from gstr1_service import ConversionService
+
+
+def test_deleted_queued_job_releases_its_slot(tmp_path):
+    inputs = [tmp_path / f"upload{index}.json" for index in range(3)]
+    for path in inputs:
+        path.write_text("{}")
+
+    async def run():
+        service = ConversionService(str(tmp_path), workers=1, queue_size=1)
+        await service.start()
+        try:
+            # No awaits below, so the worker does not take the job off the queue
+            job = service.submit("client", str(inputs[0]))
+            with pytest.raises(asyncio.QueueFull):
+                service.submit("client", str(inputs[1]))
+            service.remove(job)
+            assert service.queued_jobs() == 0
+            assert service.queue_position(service.submit("client", str(inputs[2]))) == 0
+        finally:
+            await service.stop()
+
+    asyncio.run(run())
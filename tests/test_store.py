@@ -0,0 +1,30 @@
+from gstr1_store import ReturnStore
+
+
+def _note(number, date, original, original_date):
+    return {"nt_num": number, "nt_dt": date, "ntty": "C", "oinum": "INV-1", "oidt": "01-03-2024", "pos": "29",
+            "val": 118.0, "ont_num": original, "ont_dt": original_date,
+            "itms": [{"num": 1, "itm_det": {"rt": 18, "txval": 100.0, "iamt": 18.0}}]}
+
+
+def _return():
+    return {"gstin": "27AAAAA0000A1Z5", "fp": "042024",
+            "amend_cdnr": [{"ctin": "29BBBBB0000B1Z5", "nt": [_note("CN-1A", "05-04-2024", "CN-1", "15-03-2024"),
+                                                               _note("CN-2A", "06-04-2024", "CN-2", "20-02-2024")]}]}
+
+
+def test_original_note_dates_are_stored_as_iso_dates(tmp_path):
+    with ReturnStore(str(tmp_path / "store.sqlite")) as store:
+        store.add_return(_return())
+        df = store.query("amend_cdnr")
+        assert df["original_note_date"].tolist() == ["2024-03-15", "2024-02-20"]
+        assert df["note_date"].tolist() == ["2024-04-05", "2024-04-06"]
+
+
+def test_date_range_queries_leave_the_filters_unchanged(tmp_path):
+    with ReturnStore(str(tmp_path / "store.sqlite")) as store:
+        store.add_return(_return())
+        filters = {"date_from": "2024-04-06", "date_to": "2024-04-30"}
+        assert store.query("amend_cdnr", **filters)["note_number"].tolist() == ["CN-2A"]
+        assert store._where(["note_date"], filters)[1] == ["2024-04-06", "2024-04-30"]
+        assert filters == {"date_from": "2024-04-06", "date_to": "2024-04-30"}
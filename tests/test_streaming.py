@@ -0,0 +1,29 @@
+import json
+from io import BytesIO
+
+import pytest
+
+from conftest import assert_sections_equal
+from gstr1_converter import extract_sections_from_stream, get_all_sections_from_json
+from gstr1_metrics import ConversionMetrics
+
+pytest.importorskip("ijson")
+
+
+def test_streamed_sections_equal_loaded(gstr1_bytes):
+    loaded = get_all_sections_from_json(gstr1_bytes, stream=False)
+    streamed = get_all_sections_from_json(BytesIO(gstr1_bytes), stream=True)
+    assert_sections_equal(loaded, streamed)
+
+
+def test_null_section_is_empty_when_streamed(gstr1_document):
+    document = dict(gstr1_document, b2cl=None)
+    metrics = ConversionMetrics()
+    header = {}
+    buffers = extract_sections_from_stream(BytesIO(json.dumps(document).encode("utf-8")), header=header,
+                                           metrics=metrics)
+    assert metrics.errors() == []
+    assert len(buffers["B2C Large Invoices"]) == 0
+    assert "b2cl" not in header
+    assert_sections_equal(get_all_sections_from_json(document),
+                          get_all_sections_from_json(BytesIO(json.dumps(document).encode("utf-8")), stream=True))
@@ -0,0 +1,50 @@
+import copy
+
+import pytest
+
+from conftest import assert_sections_equal
+from gstr1_converter import (VALIDATION_SHEET, ValidationError, convert_gstr1_json_to_excel_bytes,
+                             get_all_sections_from_json, merge_returns)
+
+
+@pytest.fixture
+def invalid_document(gstr1_document):
+    """The synthetic return with a text amount in one item and an object as one invoice number"""
+    document = copy.deepcopy(gstr1_document)
+    document["b2b"][0]["inv"][1]["itms"][0]["itm_det"]["iamt"] = "12"
+    document["b2b"][1]["inv"][0]["inum"] = {"x": 1}
+    return document
+
+
+def test_validated_extraction_equals_unvalidated(gstr1_document):
+    expected = get_all_sections_from_json(gstr1_document)
+    for mode in ("strict", "lenient"):
+        assert_sections_equal(expected, get_all_sections_from_json(gstr1_document, validation=mode))
+
+
+@pytest.mark.parametrize("convert", [
+    lambda document: get_all_sections_from_json(document, validation="strict"),
+    lambda document: convert_gstr1_json_to_excel_bytes(document, validation="strict"),
+    lambda document: convert_gstr1_json_to_excel_bytes(document, output_format="csv.gz", validation="strict"),
+    lambda document: merge_returns([document], validation="strict"),
+], ids=["sections", "xlsx", "dataset", "merge"])
+def test_strict_mode_raises_validation_error(invalid_document, convert):
+    with pytest.raises(ValidationError) as raised:
+        convert(invalid_document)
+    assert [issue.path for issue in raised.value.issues] == ["b2b[0].inv[1].itms[0].itm_det.iamt",
+                                                            "b2b[1].inv[0].inum"]
+
+
+def test_lenient_mode_quarantines_invalid_records(gstr1_document, invalid_document):
+    expected = get_all_sections_from_json(gstr1_document)
+    dfs = get_all_sections_from_json(invalid_document, validation="lenient")
+
+    issues = dfs.pop(VALIDATION_SHEET)
+    assert issues["Path"].tolist() == ["b2b[0].inv[1].itms[0].itm_det.iamt", "b2b[1].inv[0].inum"]
+    assert set(issues["Section"]) == {"B2B Invoices"}
+    invoices = dfs["B2B Invoices"]
+    assert len(invoices) == len(expected["B2B Invoices"]) - 2
+    assert set(invoices["Invoice Number"]) == set(expected["B2B Invoices"]["Invoice Number"]) - {
+        gstr1_document["b2b"][0]["inv"][1]["inum"], gstr1_document["b2b"][1]["inv"][0]["inum"]}
+    assert_sections_equal({name: df for name, df in expected.items() if name != "B2B Invoices"},
+                          {name: df for name, df in dfs.items() if name != "B2B Invoices"})
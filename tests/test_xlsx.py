@@ -0,0 +1,62 @@
+import re
+import zipfile
+from io import BytesIO
+
+import openpyxl
+import pytest
+
+import gstr1_xlsx
+from gstr1_converter import NUMBER_FORMATS, get_all_sections_from_json
+from gstr1_xlsx import STRING_MODES, write_workbook
+
+
+def _read_back(output):
+    workbook = openpyxl.load_workbook(BytesIO(output.getvalue()))
+    return {sheet.title: [[cell.value for cell in row] for row in sheet.iter_rows()] for sheet in workbook}
+
+
+def _expected_rows(df):
+    rows = [list(df.columns)]
+    for row in df.astype(object).itertuples(index=False):
+        rows.append([None if value != value else value for value in row])  # NaN cells are empty
+    return rows
+
+
+@pytest.mark.parametrize("strings", STRING_MODES)
+def test_workbook_reads_back_the_sections(gstr1_document, monkeypatch, strings):
+    monkeypatch.setattr(gstr1_xlsx, "CHUNK_ROWS", 7)  # Several chunks per sheet
+    dfs = get_all_sections_from_json(gstr1_document)
+    output = BytesIO()
+    write_workbook(dfs.items(), output, strings=strings, number_formats=NUMBER_FORMATS)
+
+    sheets = _read_back(output)
+    assert list(sheets) == list(dfs)
+    for sheet_name, df in dfs.items():
+        assert sheets[sheet_name] == _expected_rows(df), sheet_name
+
+
+def test_shared_strings_count_every_use(gstr1_document, monkeypatch):
+    monkeypatch.setattr(gstr1_xlsx, "CHUNK_ROWS", 7)
+    output = BytesIO()
+    write_workbook(get_all_sections_from_json(gstr1_document).items(), output, strings="shared")
+
+    with zipfile.ZipFile(output) as package:
+        table = package.read("xl/sharedStrings.xml").decode("utf-8")
+        uses = sum(len(re.findall(r'<c t="s">', package.read(name).decode("utf-8")))
+                   for name in package.namelist() if name.startswith("xl/worksheets/"))
+    count, unique = map(int, re.search(r'count="(\d+)" uniqueCount="(\d+)"', table).groups())
+    assert count == uses
+    assert unique == table.count("<si>")
+
+
+def test_number_formats_are_applied(gstr1_document):
+    dfs = get_all_sections_from_json(gstr1_document)
+    output = BytesIO()
+    write_workbook(dfs.items(), output, number_formats=NUMBER_FORMATS)
+
+    sheet = openpyxl.load_workbook(BytesIO(output.getvalue()))["B2B Invoices"]
+    header = [cell.value for cell in sheet[1]]
+    for column, code in NUMBER_FORMATS.items():
+        if column in header:
+            assert sheet.cell(row=2, column=header.index(column) + 1).number_format == code, column
+    assert sheet.cell(row=2, column=header.index("Invoice Number") + 1).number_format == "General"